@@ -238,6 +238,18 @@
 			case 'activityError':
 				showActivityFeedback(message.error || 'Failed to load activity.');
 				break;
+			case 'activitySnapshot': {
+				// Full payload for a truncated feed row: cache it on the item, then open the modal
+				const item = currentActivityItems.find(it => it.id === message.activityId);
+				if (item) {
+					item.changes = message.changes;
+					item.snapshot = message.snapshot;
+					item.changes_truncated = false;
+					item.snapshot_truncated = false;
+					if (message.kind === 'changes') { window.viewChanges(item.id); } else { window.viewSnapshot(item.id); }
+				}
+				break;
+			}
 			case 'updateAuthState':
 				if (!message.authenticated) {
 					persistFsIds({ userId: '', teamId: getState().teamId || '' });
@@ -1055,6 +1067,12 @@
 			return;
 		}
 
+		// The feed only carries a preview; fetch the full snapshot first
+		if (activity.snapshot_truncated) {
+			post('loadActivitySnapshot', { activityId, kind: 'snapshot' });
+			return;
+		}
+
 		// Check if this activity has a snapshot
 		if (activity.snapshot) {
 			// Show snapshot in a modal
@@ -1075,6 +1093,12 @@
 			return;
 		}
 
+		// The feed only carries a preview; fetch the full diff first
+		if (activity.changes_truncated) {
+			post('loadActivitySnapshot', { activityId, kind: 'changes' });
+			return;
+		}
+
 		// Check if this activity has changes (from file_snapshots via source_snapshot_id)
 		if (activity.changes) {
 			// Show diff in a modal or panel (no summary, just "Git Diff")
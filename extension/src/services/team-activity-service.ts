@@ -11,25 +11,148 @@ export interface ActivityItem {
   created_at?: string;
   display_name?: string;  // User-friendly name (from user_profiles.name, email, or fallback)
   user_email?: string;    // User's email address from auth.users
+  changes?: string | null;
+  snapshot?: string | null;
+  changes_truncated?: boolean;   // Feed lists carry a preview; fetch the rest with fetchActivitySnapshot
+  snapshot_truncated?: boolean;
 }
 
+// Last feed page per URL, reused when the backend answers 304 Not Modified
+const feedCache = new Map<string, { etag: string; items: ActivityItem[] }>();
+
 export async function fetchTeamActivity(teamId: string, limit = 25): Promise<{ success: boolean; items?: ActivityItem[]; error?: string }>{
   try {
     const url = new URL(`${BASE_URL}/api/ai/feed`);
     url.searchParams.set('team_id', teamId);
     url.searchParams.set('limit', String(limit));
+    const key = url.toString();
+    const cached = feedCache.get(key);
+    const res = await fetch(key, cached ? { headers: { 'If-None-Match': cached.etag } } : undefined);
+    if (res.status === 304 && cached) {
+      return { success: true, items: cached.items };
+    }
+    if (!res.ok) {
+      const txt = await res.text();
+      return { success: false, error: `HTTP ${res.status}: ${txt}` };
+    }
+    const data = await res.json();
+    const items = Array.isArray(data) ? data : [];
+    const etag = res.headers?.get?.('ETag');
+    if (etag) {
+      feedCache.set(key, { etag, items });
+    }
+    return { success: true, items };
+  } catch (err: any) {
+    return { success: false, error: err?.message || String(err) };
+  }
+}
+
+/**
+ * Fetches the full changes/snapshot text for one activity (the feed only carries a preview)
+ * @param activityId - The team_activity_feed row id
+ */
+export async function fetchActivitySnapshot(activityId: string): Promise<{ success: boolean; changes?: string | null; snapshot?: string | null; error?: string }> {
+  try {
+    const url = new URL(`${BASE_URL}/api/ai/feed/${encodeURIComponent(activityId)}/snapshot`);
     const res = await fetch(url.toString());
     if (!res.ok) {
       const txt = await res.text();
       return { success: false, error: `HTTP ${res.status}: ${txt}` };
     }
     const data = await res.json();
-    return { success: true, items: Array.isArray(data) ? data : [] };
+    return { success: true, changes: data.changes, snapshot: data.snapshot };
   } catch (err: any) {
     return { success: false, error: err?.message || String(err) };
   }
 }
 
+/**
+ * Follows a team's activity feed over server-sent events instead of polling.
+ * Calls onActivity for every new feed row and reconnects with Last-Event-ID
+ * (so nothing is missed) until the returned function is called.
+ * Servers on sync workers do not stream: they answer 503 (or 204), and the
+ * subscription stops and calls onUnavailable so the caller can poll instead.
+ * @param teamId - The team ID
+ * @param onActivity - Called with each new team_activity_feed row
+ * @param retryMs - Delay before reconnecting when the stream drops
+ * @param onUnavailable - Called once, with the server's Retry-After in ms, when streaming is off
+ * @returns Function that closes the stream
+ */
+export function subscribeTeamActivity(
+  teamId: string,
+  onActivity: (item: ActivityItem) => void,
+  retryMs = 3000,
+  onUnavailable?: (pollMs: number) => void
+): () => void {
+  const controller = new AbortController();
+  let lastEventId: string | undefined;
+  let delay = retryMs;
+
+  const handleEvent = (block: string) => {
+    let id: string | undefined;
+    let event = 'message';
+    const data: string[] = [];
+    for (const line of block.split('\n')) {
+      if (line.startsWith(':')) { continue; }  // heartbeat
+      const sep = line.indexOf(':');
+      const field = sep === -1 ? line : line.slice(0, sep);
+      const value = sep === -1 ? '' : line.slice(sep + 1).replace(/^ /, '');
+      if (field === 'id') { id = value; }
+      else if (field === 'event') { event = value; }
+      else if (field === 'data') { data.push(value); }
+      else if (field === 'retry' && /^\d+$/.test(value)) { delay = Number(value); }
+    }
+    if (id) { lastEventId = id; }
+    if (event === 'activity' && data.length) {
+      try {
+        onActivity(JSON.parse(data.join('\n')));
+      } catch (err) {
+        console.error('[TeamActivityService] Bad activity event:', err);
+      }
+    }
+  };
+
+  const connect = async () => {
+    while (!controller.signal.aborted) {
+      try {
+        const url = new URL(`${BASE_URL}/api/ai/feed/stream`);
+        url.searchParams.set('team_id', teamId);
+        const headers: Record<string, string> = { Accept: 'text/event-stream' };
+        if (lastEventId) { headers['Last-Event-ID'] = lastEventId; }
+        const res = await fetch(url.toString(), { headers, signal: controller.signal });
+        if (res.status === 503 || res.status === 204) {
+          const retryAfter = Number(res.headers?.get('Retry-After'));
+          onUnavailable?.(retryAfter > 0 ? retryAfter * 1000 : 30000);
+          return;
+        }
+        if (!res.ok || !res.body) {
+          throw new Error(`HTTP ${res.status}`);
+        }
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        for (;;) {
+          const { done, value } = await reader.read();
+          if (done) { break; }
+          buffer = (buffer + decoder.decode(value, { stream: true })).replace(/\r\n?/g, '\n');
+          let end: number;
+          while ((end = buffer.indexOf('\n\n')) !== -1) {
+            handleEvent(buffer.slice(0, end));
+            buffer = buffer.slice(end + 2);
+          }
+        }
+      } catch (err: any) {
+        if (controller.signal.aborted) { return; }
+        console.warn('[TeamActivityService] Activity stream dropped:', err?.message || String(err));
+      }
+      await new Promise(resolve => setTimeout(resolve, delay));
+    }
+  };
+
+  void connect();
+  return () => controller.abort();
+}
+
 /**
  * Inserts a Live Share session event into the team activity feed via backend API
  * @param teamId - The team ID
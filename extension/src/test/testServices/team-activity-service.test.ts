@@ -3,6 +3,8 @@
  */
 import {
   fetchTeamActivity,
+  fetchActivitySnapshot,
+  subscribeTeamActivity,
   insertLiveShareActivity,
   updateLiveShareActivityLink,
   cleanupOrphanedPinnedEvents,
@@ -55,6 +57,22 @@ describe("Team Activity Service", () => {
     expect(result.items).toEqual([{ id: "1" }]);
   });
 
+  test("fetchTeamActivity reuses cached items on 304", async () => {
+    (fetch as jest.Mock).mockResolvedValueOnce({
+      ok: true,
+      status: 200,
+      headers: { get: () => 'W/"abc"' },
+      json: jest.fn().mockResolvedValue([{ id: "1" }])
+    });
+    await fetchTeamActivity("team-etag");
+
+    (fetch as jest.Mock).mockResolvedValueOnce({ ok: false, status: 304 });
+    const result = await fetchTeamActivity("team-etag");
+
+    expect((fetch as jest.Mock).mock.calls[1][1]).toEqual({ headers: { 'If-None-Match': 'W/"abc"' } });
+    expect(result).toEqual({ success: true, items: [{ id: "1" }] });
+  });
+
   test("fetchTeamActivity returns error on HTTP failure", async () => {
     (fetch as jest.Mock).mockResolvedValue({
       ok: false,
@@ -77,6 +95,81 @@ describe("Team Activity Service", () => {
     expect(result.error).toBe("Network down");
   });
 
+  // --------------------------------------------------------
+  // fetchActivitySnapshot
+  // --------------------------------------------------------
+  test("fetchActivitySnapshot returns the full payload", async () => {
+    (fetch as jest.Mock).mockResolvedValue({
+      ok: true,
+      json: jest.fn().mockResolvedValue({ id: "1", changes: "diff", snapshot: "file" })
+    });
+
+    const result = await fetchActivitySnapshot("1");
+
+    expect(fetch).toHaveBeenCalledWith("http://mocked-api.test/api/ai/feed/1/snapshot");
+    expect(result).toEqual({ success: true, changes: "diff", snapshot: "file" });
+  });
+
+  test("fetchActivitySnapshot returns error on HTTP failure", async () => {
+    (fetch as jest.Mock).mockResolvedValue({
+      ok: false,
+      status: 404,
+      text: jest.fn().mockResolvedValue("activity not found")
+    });
+
+    const result = await fetchActivitySnapshot("missing");
+
+    expect(result.success).toBe(false);
+    expect(result.error).toContain("HTTP 404");
+  });
+
+  // --------------------------------------------------------
+  // subscribeTeamActivity
+  // --------------------------------------------------------
+  test("subscribeTeamActivity delivers events and resumes with Last-Event-ID", async () => {
+    const encoder = new TextEncoder();
+    const streamOf = (...chunks: string[]) => {
+      const queue = chunks.map(chunk => encoder.encode(chunk));
+      return {
+        ok: true,
+        body: {
+          getReader: () => ({
+            read: jest.fn(async () => queue.length ? { done: false, value: queue.shift() } : { done: true, value: undefined })
+          })
+        }
+      };
+    };
+    (fetch as jest.Mock)
+      .mockResolvedValueOnce(streamOf("retry: 5\n\n: keep-alive\n\nid: e1\nevent: act", "ivity\ndata: {\"id\":\"1\"}\n\n"))
+      .mockResolvedValue(streamOf());
+
+    const received: any[] = [];
+    const close = subscribeTeamActivity("team1", item => received.push(item), 5);
+    await new Promise(resolve => setTimeout(resolve, 50));
+    close();
+
+    expect(received).toEqual([{ id: "1" }]);
+    const [url, init] = (fetch as jest.Mock).mock.calls[1];
+    expect(url).toBe("http://mocked-api.test/api/ai/feed/stream?team_id=team1");
+    expect(init.headers["Last-Event-ID"]).toBe("e1");
+  });
+
+  test("subscribeTeamActivity stops and reports the poll interval when streaming is off", async () => {
+    (fetch as jest.Mock).mockResolvedValue({
+      ok: false,
+      status: 503,
+      headers: { get: (name: string) => (name === "Retry-After" ? "30" : null) }
+    });
+
+    const onUnavailable = jest.fn();
+    const close = subscribeTeamActivity("team1", jest.fn(), 5, onUnavailable);
+    await new Promise(resolve => setTimeout(resolve, 50));
+    close();
+
+    expect(onUnavailable).toHaveBeenCalledWith(30000);
+    expect(fetch).toHaveBeenCalledTimes(1);
+  });
+
   // --------------------------------------------------------
   // insertLiveShareActivity
   // --------------------------------------------------------
@@ -20,6 +20,10 @@ export class AgentPanelProvider implements vscode.WebviewViewProvider {
     /** Current teams cache */
     private _userTeams: TeamWithMembership[] = [];
 
+    /** Open activity stream for the team whose feed is shown */
+    private _activityStream?: { teamId: string; close: () => void };
+    private _activityRefreshTimer?: ReturnType<typeof setTimeout>;
+
     constructor(private readonly _extensionUri: vscode.Uri, private readonly _context: vscode.ExtensionContext) {
         // Monitor workspace changes - clear team when no folder open
         vscode.workspace.onDidChangeWorkspaceFolders(() => {
@@ -48,6 +52,11 @@ export class AgentPanelProvider implements vscode.WebviewViewProvider {
         // THEN set HTML (so team data is already loaded)
         webviewView.webview.html = this._getHtmlForWebview(webviewView.webview);
 
+        webviewView.onDidDispose(() => {
+            this._activityStream?.close();
+            this._activityStream = undefined;
+        });
+
         // Listen for visibility changes - refresh team info when webview becomes visible
         webviewView.onDidChangeVisibility(() => {
             if (webviewView.visible) {
@@ -367,6 +376,7 @@ export class AgentPanelProvider implements vscode.WebviewViewProvider {
             const res = await fetchTeamActivity(effectiveTeamId, limit);
             if (res.success) {
                 this._view?.webview.postMessage({ command: 'activityFeed', items: res.items || [] });
+                this.followActivityFeed(effectiveTeamId, limit);
             } else {
                 this._view?.webview.postMessage({ command: 'activityError', error: res.error || 'Failed to load activity' });
             }
@@ -375,6 +385,48 @@ export class AgentPanelProvider implements vscode.WebviewViewProvider {
         }
     }
 
+    /**
+     * Keeps the feed current by listening to the backend's activity stream;
+     * a burst of new rows triggers one reload. When the backend does not
+     * stream (sync workers), the feed stays on-demand: it reloads when opened
+     * and on refreshActivityFeed, and the stream is not retried for this team.
+     */
+    private followActivityFeed(teamId: string, limit: number) {
+        if (this._activityStream?.teamId === teamId) {
+            return;
+        }
+        this._activityStream?.close();
+        const { subscribeTeamActivity } = require('../services/team-activity-service');
+        const close = subscribeTeamActivity(teamId, () => {
+            if (this._activityRefreshTimer) {
+                clearTimeout(this._activityRefreshTimer);
+            }
+            this._activityRefreshTimer = setTimeout(() => this.loadActivityFeed(teamId, limit), 250);
+        }, undefined, () => {
+            if (this._activityStream?.teamId === teamId) {
+                this._activityStream = { teamId, close: () => undefined };
+            }
+        });
+        this._activityStream = { teamId, close };
+    }
+
+    /**
+     * Loads the full changes/snapshot for one activity and posts it back to the webview.
+     */
+    public async loadActivitySnapshot(activityId: string, kind: 'changes' | 'snapshot') {
+        try {
+            const { fetchActivitySnapshot } = require('../services/team-activity-service');
+            const res = await fetchActivitySnapshot(activityId);
+            if (res.success) {
+                this._view?.webview.postMessage({ command: 'activitySnapshot', activityId, kind, changes: res.changes, snapshot: res.snapshot });
+            } else {
+                this._view?.webview.postMessage({ command: 'activityError', error: res.error || 'Failed to load activity details' });
+            }
+        } catch (err) {
+            this._view?.webview.postMessage({ command: 'activityError', error: String(err) });
+        }
+    }
+
     /**
      * Handles team creation with database persistence
      */
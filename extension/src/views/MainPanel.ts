@@ -164,6 +164,7 @@ export class CollabAgentPanelProvider implements vscode.WebviewViewProvider {
             'addFileSnapshot',
             // 'generateSummary' removed - edge function now handles automatic summarization
             'loadActivityFeed',
+            'loadActivitySnapshot',
             'broadcastSnapshot',
             'broadcastBlockedBySession'
         ].includes(command);
@@ -278,6 +279,9 @@ export class CollabAgentPanelProvider implements vscode.WebviewViewProvider {
             case 'loadActivityFeed':
                 await (this._agentPanel as any).loadActivityFeed?.(message.teamId, message.limit);
                 break;
+            case 'loadActivitySnapshot':
+                await (this._agentPanel as any).loadActivitySnapshot?.(message.activityId, message.kind);
+                break;
             case 'broadcastSnapshot':
                 await (this._agentPanel as any).broadcastSnapshot?.();
                 break;
@@ -0,0 +1,40 @@
+"""Bytes saved and CPU cost of response compression on realistic feed payloads.
+
+Run from the server directory:
+    python -m benchmarks.bench_compression [--rows 20] [--repeat 20]
+
+Every codec the server can negotiate is measured (gzip always; br and zstd
+when brotli/zstandard are installed), at the levels the server uses.
+"""
+import argparse
+import timeit
+
+from benchmarks.payloads import feed_rows
+from src.utils import compression, fast_json
+
+
+def _best(fn, repeat, number):
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def run(rows=20, repeat=20, number=5):
+    body = fast_json.dumps_bytes(feed_rows(rows), sort_keys=True)
+    print(f"rows: {rows}   body: {len(body) / 1024:.1f} KiB   codecs: {', '.join(compression.CODECS)}")
+
+    results = {}
+    for encoding in compression.CODECS:
+        compressed = compression.compress(body, encoding)
+        seconds = _best(lambda: compression.compress(body, encoding), repeat, number)
+        results[encoding] = {"bytes": len(compressed), "seconds": seconds}
+        print(f"{encoding:<5} {len(compressed) / 1024:8.1f} KiB   ratio {len(body) / len(compressed):5.1f}:1   "
+              f"saved {(len(body) - len(compressed)) / 1024:8.1f} KiB   "
+              f"{seconds * 1e3:7.3f} ms   {len(body) / seconds / 2**20:7.1f} MiB/s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
@@ -0,0 +1,44 @@
+"""Compare stdlib json with the fast JSON path on realistic feed payloads.
+
+Run from the server directory:
+    python -m benchmarks.bench_json [--rows 20] [--repeat 50]
+"""
+import argparse
+import json
+import timeit
+
+from benchmarks.payloads import feed_rows
+from src.utils import fast_json
+
+
+def _best(fn, repeat, number):
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def run(rows=20, repeat=50, number=5):
+    payload = feed_rows(rows)
+    # What Flask's default provider does for jsonify(rows) in production
+    stdlib_body = json.dumps(payload, sort_keys=True, ensure_ascii=True, separators=(",", ":")).encode()
+    fast_body = fast_json.dumps_bytes(payload, sort_keys=True)
+
+    results = {
+        "encode_stdlib": _best(lambda: json.dumps(payload, sort_keys=True, ensure_ascii=True, separators=(",", ":")).encode(), repeat, number),
+        "encode_fast": _best(lambda: fast_json.dumps_bytes(payload, sort_keys=True), repeat, number),
+        # requests' resp.json() decodes bytes -> str -> objects
+        "decode_stdlib": _best(lambda: json.loads(stdlib_body.decode("utf-8")), repeat, number),
+        "decode_fast": _best(lambda: fast_json.loads(fast_body), repeat, number),
+    }
+
+    print(f"backend: {fast_json.BACKEND}   rows: {rows}   body: {len(stdlib_body) / 1024:.1f} KiB")
+    for op in ("encode", "decode"):
+        slow, fast = results[f"{op}_stdlib"], results[f"{op}_fast"]
+        print(f"{op:<7} stdlib {slow * 1e3:8.3f} ms   fast {fast * 1e3:8.3f} ms   speedup {slow / fast:5.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
@@ -0,0 +1,71 @@
+"""Realistic /api/ai/feed payloads for the benchmarks in this folder.
+
+Rows mirror what get_feed returns: headers plus the flattened ``changes``
+(a unified git diff) and ``snapshot`` (a file baseline) text.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+_CODE_LINES = [
+    "export async function fetchTeamActivity(teamId: string, limit = 20) {",
+    "  const url = new URL(`${BASE_URL}/api/ai/feed`);",
+    "  url.searchParams.set('team_id', teamId);",
+    "  const response = await fetch(url.toString(), { headers: authHeaders() });",
+    "  if (!response.ok) { throw new Error(`Feed request failed: ${response.status}`); }",
+    "  return (await response.json()) as ActivityRow[];",
+    "}",
+    "def resolve_names(user_ids):",
+    "    profiles = sb_select(\"user_profiles\", {\"select\": \"user_id,name\"})",
+    "    return {p[\"user_id\"]: p.get(\"name\") for p in profiles}",
+    "    # TODO: handle missing profiles gracefully",
+    "const panel = vscode.window.createWebviewPanel('collabAgent', 'Collab Agent', column, options);",
+]
+
+
+def _file_text(rng, lines):
+    return "\n".join(rng.choice(_CODE_LINES) for _ in range(lines))
+
+
+def _diff(rng, path, hunks):
+    out = [f"diff --git a/{path} b/{path}", f"--- a/{path}", f"+++ b/{path}"]
+    line = 1
+    for _ in range(hunks):
+        line += rng.randint(5, 40)
+        out.append(f"@@ -{line},7 +{line},9 @@ export class Example {{")
+        for _ in range(3):
+            out.append(" " + rng.choice(_CODE_LINES))
+        for _ in range(2):
+            out.append("-" + rng.choice(_CODE_LINES))
+        for _ in range(4):
+            out.append("+" + rng.choice(_CODE_LINES))
+        out.append(" " + rng.choice(_CODE_LINES))
+    return "\n".join(out)
+
+
+def feed_rows(count=20, seed=7, snapshot_lines=400, hunks=12):
+    """Build ``count`` feed rows shaped like get_feed's response."""
+    rng = random.Random(seed)
+    now = datetime(2025, 10, 1, tzinfo=timezone.utc)
+    users = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(5)]
+    rows = []
+    for i in range(count):
+        path = f"src/services/module_{i % 7}.ts"
+        user_id = rng.choice(users)
+        rows.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "team_id": "6f1c2d3e-0000-4000-8000-000000000001",
+            "user_id": user_id,
+            "summary": f"Refactored feed fetching and error handling in {path}",
+            "event_header": None,
+            "file_path": path,
+            "source_snapshot_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "activity_type": "ai_summary",
+            "created_at": (now - timedelta(minutes=i * 7)).isoformat(),
+            "pinned": i == 0,
+            "changes": _diff(rng, path, hunks),
+            "snapshot": _file_text(rng, snapshot_lines),
+            "display_name": f"Developer {users.index(user_id)}",
+            "user_email": f"dev{users.index(user_id)}@example.com",
+        })
+    return rows
@@ -0,0 +1,38 @@
+-- Track when team_activity_feed rows change, so GET /api/ai/feed?since= can
+-- return only rows inserted or updated (e.g. unpinned) after a watermark
+-- Safe to run multiple times
+
+begin;
+
+alter table public.team_activity_feed
+  add column if not exists updated_at timestamptz;
+
+-- Existing rows last changed when they were created
+update public.team_activity_feed
+set updated_at = coalesce(created_at, now())
+where updated_at is null;
+
+alter table public.team_activity_feed
+  alter column updated_at set default now(),
+  alter column updated_at set not null;
+
+-- Delta polls read one team's rows in (updated_at, id) order
+create index if not exists team_activity_feed_team_updated_idx
+  on public.team_activity_feed(team_id, updated_at, id);
+
+-- =====================
+-- Trigger to update updated_at timestamp
+-- =====================
+create or replace function public.update_team_activity_feed_updated_at()
+returns trigger language plpgsql as $$
+begin
+  new.updated_at := now();
+  return new;
+end $$;
+
+drop trigger if exists update_team_activity_feed_updated_at on public.team_activity_feed;
+create trigger update_team_activity_feed_updated_at
+before update on public.team_activity_feed
+for each row execute function public.update_team_activity_feed_updated_at();
+
+commit;
@@ -0,0 +1,17 @@
+-- Persistent tier of the AI snapshot summary cache (SUMMARY_CACHE_PERSIST=1).
+-- One row per sha256(model, prompt version, file_path, normalized diff)
+-- Safe to run multiple times
+
+begin;
+
+create table if not exists public.ai_summary_cache (
+  key text primary key,
+  model text,
+  summary text not null,
+  created_at timestamptz not null default now()
+);
+
+-- Only the service role (the Flask backend) reads or writes the cache
+alter table public.ai_summary_cache enable row level security;
+
+commit;
@@ -0,0 +1,25 @@
+-- Shared records for AI jobs started with Prefer: respond-async (AI_JOBS_PERSIST=1),
+-- so GET /api/ai/jobs/<id> works whichever gunicorn worker answers the poll
+-- Safe to run multiple times
+
+begin;
+
+create table if not exists public.ai_jobs (
+  id uuid primary key,
+  kind text not null,
+  status text not null,
+  status_code int,
+  result jsonb,
+  error text,
+  created_at timestamptz not null default now(),
+  started_at timestamptz,
+  finished_at timestamptz
+);
+
+-- Finished jobs are only useful for a while; lets old rows be cleaned up by created_at
+create index if not exists ai_jobs_created_at_idx on public.ai_jobs(created_at);
+
+-- Only the service role (the Flask backend) reads or writes jobs
+alter table public.ai_jobs enable row level security;
+
+commit;
@@ -0,0 +1,24 @@
+# gunicorn.conf.py
+# Execution mode for the Flask app, picked with WORKER_MODE:
+#   sync   - one request per worker at a time (original behaviour)
+#   gevent - cooperative workers: every blueprint handler runs in a greenlet and
+#            blocking Supabase/Gemini I/O yields, so a single process can keep
+#            hundreds of upstream calls in flight without adding workers.
+import os
+
+WORKER_MODE = os.getenv("WORKER_MODE", "sync").lower()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+if WORKER_MODE == "gevent":
+    workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+    worker_class = "gevent"
+    worker_connections = int(os.getenv("WORKER_CONNECTIONS", "500"))
+    # gRPC does not yield to gevent; talk to Gemini over REST (requests) instead
+    os.environ.setdefault("GEMINI_TRANSPORT", "rest")
+    # Let many greenlets share keep-alive sockets instead of opening throwaway ones
+    os.environ.setdefault("SUPABASE_POOL_SIZE", "100")
+else:
+    workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+    worker_class = "sync"
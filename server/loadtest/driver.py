@@ -0,0 +1,328 @@
+"""End-to-end load driver: every blueprint, in process, against FakeSupabase.
+
+Requests go through the real Flask app and the real ``db.py`` stack (pooled
+session, cache, coalescing, hedging when enabled). Only the network edge is
+faked: Supabase is served by ``loadtest.fake_supabase`` with injected latency
+and Gemini by a canned model with its own latency.
+
+Run from the server directory:
+    python -m loadtest.driver [--iterations 50] [--concurrency 8] [--latency-ms 20]
+
+Prints throughput and p50/p95/p99 per route. ``--json`` prints the same
+report as JSON for comparing runs.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# The app reads its configuration at import time; point it at the fake
+os.environ.setdefault("SUPABASE_URL", "https://loadtest.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "fake-service-key")
+os.environ.setdefault("GEMINI_API_KEY", "fake-gemini-key")
+os.environ.setdefault("SIMPLE_MODEL", "fake-simple")
+os.environ.setdefault("ADVANCE_MODEL", "fake-advance")
+
+from loadtest.fake_supabase import FakeSupabase, installed, seed
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Stands in for genai.GenerativeModel with a fixed think time."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def generate_content(self, prompt, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        if "TASK_KEY|MEMBER_NAME|REASON" in prompt:
+            keys = re.findall(r"Task \d+: \[([^\]]+)\]", prompt)
+            names = re.findall(r"^\s*- ([^:\n]+):", prompt, re.M) or ["Someone"]
+            return _FakeResponse("\n".join(
+                f"{key}|{names[i % len(names)]}|Their skills match this task" for i, key in enumerate(keys)
+            ))
+        packed = re.findall(r"^=== DIFF (\d+) ===", prompt, re.M)
+        if packed:
+            return _FakeResponse("\n".join(f"[[{n}]] Updated the module's request handling." for n in packed))
+        return _FakeResponse("Updated the module's request handling.")
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def _bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _session_id():
+    return uuid.uuid4().hex[:12]
+
+
+class Scenario:
+    """Builds one request per call from the seeded fixture."""
+
+    def __init__(self, fake, fixture, rng):
+        self.fake = fake
+        self.fixture = fixture
+        self.rng = rng
+
+    def _team(self):
+        return self.rng.choice(self.fixture["teams"])
+
+    def _member(self, team):
+        user_id = self.rng.choice(team["members"])
+        return user_id, self.fixture["tokens"][user_id]
+
+    def _snapshot_id(self, team):
+        rows = [r for r in self.fake.tables["file_snapshots"] if r.get("team_id") == team["id"]]
+        return self.rng.choice(rows)["id"]
+
+    def _activity_id(self, team):
+        rows = [r for r in self.fake.tables["team_activity_feed"] if r.get("team_id") == team["id"]]
+        return self.rng.choice(rows)["id"]
+
+    def _disposable_user(self, team):
+        """A fresh member (with a team-mate to inherit admin) for the delete-account route."""
+        user_id, token = self.fake.add_user()
+        self.fake.insert("user_profiles", {"user_id": user_id, "name": "Leaving Dev"})
+        self.fake.insert("team_membership", {"team_id": team["id"], "user_id": user_id, "role": "member"})
+        return token
+
+    # ---- one method per route: each returns (method, path, client kwargs) ----
+
+    def notes_list(self):
+        return "GET", "/api/notes/", {}
+
+    def notes_add(self):
+        return "POST", "/api/notes/", {"json": {"title": "Standup", "body": "Notes"}}
+
+    def profile_get(self):
+        user_id, token = self._member(self._team())
+        return "GET", f"/api/profile?user_id={user_id}", {"headers": _bearer(token)}
+
+    def profile_save(self):
+        user_id, token = self._member(self._team())
+        body = {"user_id": user_id, "name": "Dev", "interests": ["Python"], "custom_skills": ["SQL"]}
+        return "POST", "/api/profile", {"headers": _bearer(token), "json": body}
+
+    def user_get(self):
+        return "GET", f"/users/{self._member(self._team())[1]}", {}
+
+    def account_delete(self):
+        return "POST", "/api/account/delete", {"headers": _bearer(self._disposable_user(self._team()))}
+
+    def jira_save(self):
+        team = self._team()
+        body = {"team_id": team["id"], "jira_url": "https://example.atlassian.net", "jira_project_key": "CA",
+                "access_token": "jira-token", "admin_user_id": team["admin"]}
+        return "POST", "/api/jira/config", {"json": body}
+
+    def jira_get(self):
+        return "GET", f"/api/jira/config/{self._team()['id']}", {}
+
+    def jira_delete(self):
+        return "DELETE", f"/api/jira/config/{self._team()['id']}", {}
+
+    def feed(self):
+        return "GET", f"/api/ai/feed?team_id={self._team()['id']}&limit=20", {}
+
+    def feed_snapshot(self):
+        return "GET", f"/api/ai/feed/{self._activity_id(self._team())}/snapshot", {}
+
+    def process_snapshot(self):
+        team = self._team()
+        return "POST", "/api/ai/process_snapshot", {"json": {"snapshot_id": self._snapshot_id(team), "team_id": team["id"]}}
+
+    def process_snapshots(self):
+        team = self._team()
+        ids = list({self._snapshot_id(team) for _ in range(5)})
+        return "POST", "/api/ai/process_snapshots", {"json": {"snapshot_ids": ids, "team_id": team["id"]}}
+
+    def live_share_event(self):
+        team = self._team()
+        body = {"event_type": self.rng.choice(["started", "ended"]), "session_id": _session_id(),
+                "team_id": team["id"], "user_id": team["admin"], "display_name": "Dev", "duration_minutes": 42,
+                "session_link": "https://prod.liveshare.vsengsaas.visualstudio.com/join?ABC"}
+        return "POST", "/api/ai/live_share_event", {"json": body}
+
+    def participant_status(self):
+        team = self._team()
+        body = {"team_id": team["id"], "user_id": team["admin"], "joined": team["members"][1:2], "left": []}
+        return "POST", "/api/ai/participant_status_event", {"json": body}
+
+    def live_share_update_link(self):
+        body = {"team_id": self._team()["id"], "session_id": _session_id(), "session_link": "https://example.com/join"}
+        return "POST", "/api/ai/live_share_update_link", {"json": body}
+
+    def cleanup_orphaned_pins(self):
+        return "POST", "/api/ai/cleanup_orphaned_pins", {"json": {"team_id": self._team()["id"]}}
+
+    def live_share_summary(self):
+        team = self._team()
+        body = {"session_id": _session_id(), "team_id": team["id"], "user_id": team["admin"],
+                "changes": "diff --git a/x b/x\n+print('hi')"}
+        return "POST", "/api/ai/live_share_summary", {"json": body}
+
+    def task_recommendations(self):
+        team = self._team()
+        tasks = [{"key": f"CA-{n}", "summary": f"Task {n}", "description": "Build it"} for n in range(5)]
+        body = {"team_id": team["id"], "user_id": team["admin"], "unassigned_tasks": tasks}
+        return "POST", "/api/ai/task_recommendations", {"json": body}
+
+    def mark_assigned(self):
+        return "POST", "/api/ai/activity/mark-assigned", {"json": {"activity_id": self._activity_id(self._team()), "is_assigned": True}}
+
+    def routes(self):
+        """Map route label -> request factory."""
+        return {
+            "GET /health": lambda: ("GET", "/health", {}),
+            "GET /metrics": lambda: ("GET", "/metrics", {}),
+            "GET /api/notes/": self.notes_list,
+            "POST /api/notes/": self.notes_add,
+            "GET /api/profile": self.profile_get,
+            "POST /api/profile": self.profile_save,
+            "GET /users/<token>": self.user_get,
+            "POST /api/account/delete": self.account_delete,
+            "POST /api/jira/config": self.jira_save,
+            "GET /api/jira/config/<team>": self.jira_get,
+            "DELETE /api/jira/config/<team>": self.jira_delete,
+            "GET /api/ai/feed": self.feed,
+            "GET /api/ai/feed/<id>/snapshot": self.feed_snapshot,
+            "POST /api/ai/process_snapshot": self.process_snapshot,
+            "POST /api/ai/process_snapshots": self.process_snapshots,
+            "POST /api/ai/live_share_event": self.live_share_event,
+            "POST /api/ai/participant_status_event": self.participant_status,
+            "POST /api/ai/live_share_update_link": self.live_share_update_link,
+            "POST /api/ai/cleanup_orphaned_pins": self.cleanup_orphaned_pins,
+            "POST /api/ai/live_share_summary": self.live_share_summary,
+            "POST /api/ai/task_recommendations": self.task_recommendations,
+            "POST /api/ai/activity/mark-assigned": self.mark_assigned,
+        }
+
+
+def run(iterations=20, concurrency=8, latency=0.02, jitter=0.0, tail_ratio=0.0, tail_latency=0.0,
+        model_latency=0.2, teams=3, feed_rows=100, routes=None, seed_value=7, quiet=True):
+    """Drive every route ``iterations`` times; return a report dict.
+
+    ``quiet`` silences the routes' print logging while the load runs.
+    """
+    from src.app import app
+    from src.routes import api_route
+
+    fake = FakeSupabase(latency=latency, jitter=jitter, tail_ratio=tail_ratio, tail_latency=tail_latency, seed=seed_value)
+    fixture = seed(fake, teams=teams, feed_rows=feed_rows, seed=seed_value)
+    scenario = Scenario(fake, fixture, random.Random(seed_value))
+    factories = scenario.routes()
+    if routes:
+        factories = {label: f for label, f in factories.items() if any(r in label for r in routes)}
+
+    jobs = [label for _ in range(iterations) for label in factories]
+    random.Random(seed_value).shuffle(jobs)
+    samples = {label: [] for label in factories}
+    statuses = {label: {} for label in factories}
+    local = threading.local()
+    record_lock = threading.Lock()
+
+    def one(label):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        with record_lock:
+            method, path, kwargs = factories[label]()
+        started = time.perf_counter()
+        try:
+            status = client.open(path, method=method, **kwargs).status_code
+        except Exception as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - started
+        with record_lock:
+            samples[label].append(elapsed)
+            statuses[label][status] = statuses[label].get(status, 0) + 1
+
+    saved_models = api_route.simple_model, api_route.advance_model
+    api_route.simple_model = api_route.advance_model = FakeModel(model_latency)
+    try:
+        with contextlib.ExitStack() as stack:
+            if quiet:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+            stack.enter_context(installed(fake))
+            started = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as pool:
+                list(pool.map(one, jobs))
+            wall = time.perf_counter() - started
+    finally:
+        api_route.simple_model, api_route.advance_model = saved_models
+
+    report = {"requests": len(jobs), "seconds": wall, "throughput": len(jobs) / wall if wall else 0.0,
+              "concurrency": concurrency, "upstream_calls": dict(fake.calls), "routes": {}}
+    for label, times in samples.items():
+        errors = sum(n for s, n in statuses[label].items() if not isinstance(s, int) or s >= 500)
+        report["routes"][label] = {
+            "count": len(times),
+            "errors": errors,
+            "statuses": {str(s): n for s, n in statuses[label].items()},
+            "p50_ms": _percentile(times, 50) * 1000,
+            "p95_ms": _percentile(times, 95) * 1000,
+            "p99_ms": _percentile(times, 99) * 1000,
+        }
+    return report
+
+
+def format_report(report) -> str:
+    width = max(len(label) for label in report["routes"]) if report["routes"] else 10
+    lines = [
+        f"{report['requests']} requests in {report['seconds']:.2f}s "
+        f"({report['throughput']:.1f} req/s, concurrency {report['concurrency']})",
+        f"{'route':<{width}}  {'count':>6}  {'errors':>6}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  statuses",
+    ]
+    for label, r in report["routes"].items():
+        lines.append(
+            f"{label:<{width}}  {r['count']:>6}  {r['errors']:>6}  {r['p50_ms']:>8.1f}  {r['p95_ms']:>8.1f}  {r['p99_ms']:>8.1f}  "
+            + ",".join(f"{s}x{n}" for s, n in sorted(r["statuses"].items()))
+        )
+    lines.append("upstream calls: " + ", ".join(f"{k}={v}" for k, v in sorted(report["upstream_calls"].items())))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test every route against a fake Supabase.")
+    parser.add_argument("--iterations", type=int, default=20, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="injected Supabase latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--tail-ratio", type=float, default=0.0, help="share of Supabase calls that are slow")
+    parser.add_argument("--tail-ms", type=float, default=0.0, help="extra latency for slow calls")
+    parser.add_argument("--model-latency-ms", type=float, default=200.0, help="fake Gemini think time")
+    parser.add_argument("--teams", type=int, default=3)
+    parser.add_argument("--feed-rows", type=int, default=100, help="activity rows seeded per team")
+    parser.add_argument("--route", action="append", help="only run routes whose label contains this (repeatable)")
+    parser.add_argument("--verbose", action="store_true", help="keep the routes' log output")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = run(
+        iterations=args.iterations, concurrency=args.concurrency, latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000, tail_ratio=args.tail_ratio, tail_latency=args.tail_ms / 1000,
+        model_latency=args.model_latency_ms / 1000, teams=args.teams, feed_rows=args.feed_rows, routes=args.route,
+        quiet=not args.verbose,
+    )
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
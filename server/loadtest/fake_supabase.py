@@ -0,0 +1,491 @@
+"""In-process stand-in for the parts of Supabase the backend talks to.
+
+Covers the PostgREST subset used by ``src/database/db.py`` (select lists with
+many-to-one embeds such as ``file_snapshots(changes,snapshot)``, eq/neq/gt/
+gte/lt/lte/like/ilike/in/is filters, ``order`` with nulls handling,
+``limit``/``offset``, inserts of one or many rows, PATCH, DELETE and
+``Prefer: return=representation``) plus the ``/auth/v1`` endpoints the routes
+call (``GET /user`` and ``GET``/``DELETE /admin/users/<id>``).
+
+Three ways to plug it in:
+
+* ``installed(fake)`` mounts it on the backend's pooled requests session, so
+  every ``sb_*`` call in this process is served from memory;
+* ``fake.httpx_transport()`` for an ``httpx.AsyncClient`` (the async helpers);
+* ``python -m loadtest.fake_supabase --port 54321`` serves it over HTTP so a
+  real gunicorn server can run against it with
+  ``SUPABASE_URL=http://127.0.0.1:54321``.
+
+Every request can be delayed by a configurable latency (base + uniform jitter,
+plus an optional slow tail) to mimic a remote database.
+"""
+import argparse
+import contextlib
+import copy
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+TABLES = (
+    "teams", "team_membership", "user_profiles", "team_activity_feed", "file_snapshots",
+    "team_jira_configs", "notes", "session_participants",
+)
+
+# parent table -> {embedded table: (foreign key column, referenced column)}
+RELATIONS = {
+    "team_activity_feed": {"file_snapshots": ("source_snapshot_id", "id")},
+}
+
+_TIMESTAMP_DEFAULTS = {
+    "team_membership": ("joined_at",),
+    "team_activity_feed": ("updated_at",),
+    "file_snapshots": ("updated_at",),
+    "user_profiles": ("updated_at",),
+}
+
+# Tables whose updated_at is bumped by a trigger on every UPDATE (see db/*.sql)
+_UPDATED_AT_TRIGGERS = {"team_activity_feed", "team_jira_configs"}
+
+_EMBED_RE = re.compile(r"^(?:(\w+):)?(\w+)(?:!\w+)?\((.*)\)$", re.S)
+_STATUS_TEXT = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found"}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _text(value) -> str:
+    """Render a column value the way it appears in a PostgREST filter."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _split_top_level(spec: str, sep: str = ","):
+    """Split on ``sep`` outside parentheses and double quotes."""
+    parts, depth, quoted, current = [], 0, False, []
+    for ch in spec:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == sep and depth == 0 and not quoted:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    if current or parts:
+        parts.append("".join(current))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _compare(left, right):
+    """Order two filter operands, numerically when both look like numbers."""
+    try:
+        a, b = float(left), float(right)
+    except (TypeError, ValueError):
+        a, b = str(left), str(right)
+    return (a > b) - (a < b)
+
+
+def _like(pattern: str, value: str, ignore_case: bool) -> bool:
+    regex = "^" + re.escape(pattern).replace(r"\*", ".*").replace("%", ".*").replace("_", ".") + "$"
+    return re.match(regex, value, re.I if ignore_case else 0) is not None
+
+
+def _matches(row: dict, column: str, expr: str) -> bool:
+    negate = expr.startswith("not.")
+    if negate:
+        expr = expr[4:]
+    op, _, operand = expr.partition(".")
+    if len(operand) >= 2 and operand[0] == operand[-1] == '"':
+        operand = operand[1:-1].replace('\\"', '"')
+    value = row.get(column)
+    if op == "is":
+        result = _text(value) == operand.lower()
+    elif op == "in":
+        allowed = {v.strip().strip('"') for v in operand.strip("()").split(",") if v.strip()}
+        result = value is not None and _text(value) in allowed
+    elif value is None:
+        result = False
+    elif op == "eq":
+        result = _text(value) == operand
+    elif op == "neq":
+        result = _text(value) != operand
+    elif op in ("gt", "gte", "lt", "lte"):
+        cmp = _compare(_text(value), operand)
+        result = {"gt": cmp > 0, "gte": cmp >= 0, "lt": cmp < 0, "lte": cmp <= 0}[op]
+    elif op in ("like", "ilike"):
+        result = _like(operand, _text(value), op == "ilike")
+    else:
+        raise ValueError(f"unsupported operator {op!r}")
+    return result != negate
+
+
+def _matches_logic(row: dict, op: str, spec: str) -> bool:
+    """Evaluate an ``or=(a.eq.1,and(b.gt.2,c.is.null))`` style group."""
+    conditions = []
+    for term in _split_top_level(spec.strip()[1:-1]):
+        nested = re.match(r"^(not\.)?(and|or)(\(.*\))$", term, re.S)
+        if nested:
+            result = _matches_logic(row, nested.group(2), nested.group(3))
+            conditions.append(result != bool(nested.group(1)))
+        else:
+            column, _, expr = term.partition(".")
+            conditions.append(_matches(row, column, expr))
+    return any(conditions) if op == "or" else all(conditions)
+
+
+def _parse_order(spec: str):
+    orders = []
+    for item in _split_top_level(spec or ""):
+        parts = item.split(".")
+        descending = "desc" in parts[1:]
+        # Postgres puts NULLs first for DESC and last for ASC unless told otherwise
+        nulls_first = descending
+        if "nullsfirst" in parts[1:]:
+            nulls_first = True
+        elif "nullslast" in parts[1:]:
+            nulls_first = False
+        orders.append((parts[0], descending, nulls_first))
+    return orders
+
+
+def _sort(rows, orders):
+    for column, descending, nulls_first in reversed(orders):
+        # With reverse=True the group order flips too, so pick the null group accordingly
+        null_group = (1 if nulls_first else -1) if descending else (-1 if nulls_first else 1)
+        rows.sort(
+            key=lambda r: (null_group, "") if r.get(column) is None else (0, r[column]),
+            reverse=descending,
+        )
+    return rows
+
+
+class FakeSupabase:
+    def __init__(self, latency=0.0, jitter=0.0, tail_ratio=0.0, tail_latency=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.tail_ratio = tail_ratio
+        self.tail_latency = tail_latency
+        self.tables = {name: [] for name in TABLES}
+        self.users = {}   # user id -> auth user json
+        self.tokens = {}  # access token -> user id
+        self.calls = {}   # "METHOD path" -> count
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+
+    # ---- fixtures ----
+
+    def add_user(self, email=None, full_name=None, user_id=None, token=None):
+        """Register an auth user and return ``(user_id, access_token)``."""
+        user_id = user_id or str(uuid.uuid4())
+        token = token or f"token-{user_id}"
+        with self._lock:
+            self.users[user_id] = {
+                "id": user_id,
+                "email": email or f"{user_id[:8]}@example.com",
+                "role": "authenticated",
+                "user_metadata": {"full_name": full_name} if full_name else {},
+                "created_at": _now(),
+            }
+            self.tokens[token] = user_id
+        return user_id, token
+
+    def insert(self, table: str, rows):
+        """Insert rows directly (no latency, no call accounting) and return copies."""
+        with self._lock:
+            return self._insert(table, rows if isinstance(rows, list) else [rows])
+
+    def rows(self, table: str) -> list:
+        with self._lock:
+            return copy.deepcopy(self.tables.get(table, []))
+
+    # ---- request handling ----
+
+    def _delay(self):
+        with self._lock:
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            if self.tail_ratio and self._rng.random() < self.tail_ratio:
+                delay += self.tail_latency
+        if delay > 0:
+            time.sleep(delay)
+
+    def handle(self, method: str, url: str, headers=None, body=None):
+        """Serve one request; returns ``(status, headers, body_bytes)``."""
+        headers = CaseInsensitiveDict(headers or {})
+        parts = urlsplit(url)
+        path = unquote(parts.path)
+        params = dict(parse_qsl(parts.query, keep_blank_values=True))
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        payload = json.loads(body) if body else None
+
+        self._delay()
+        with self._lock:
+            key = f"{method} {re.sub(r'/[0-9a-fA-F-]{16,}$', '/:id', path)}"
+            self.calls[key] = self.calls.get(key, 0) + 1
+            try:
+                if path.startswith("/rest/v1/"):
+                    return self._rest(method, path[len("/rest/v1/"):], params, headers, payload)
+                if path.startswith("/auth/v1/"):
+                    return self._auth(method, path[len("/auth/v1"):], headers)
+                return self._json(404, {"message": f"no route for {path}"})
+            except ValueError as e:
+                return self._json(400, {"code": "PGRST100", "message": str(e)})
+
+    def _json(self, status, obj, extra_headers=None):
+        headers = {"Content-Type": "application/json; charset=utf-8"}
+        headers.update(extra_headers or {})
+        if status == 204:
+            return status, headers, b""
+        return status, headers, json.dumps(obj).encode("utf-8")
+
+    # ---- PostgREST ----
+
+    def _rest(self, method, table, params, headers, payload):
+        if table not in self.tables:
+            return self._json(404, {"code": "PGRST205", "message": f"Could not find the table 'public.{table}'"})
+        represent = "return=representation" in headers.get("Prefer", "")
+
+        if method == "GET":
+            rows = self._select(table, params)
+            return self._json(200, rows, {"Content-Range": f"0-{max(0, len(rows) - 1)}/*"})
+        if method == "POST":
+            rows = payload if isinstance(payload, list) else [payload or {}]
+            inserted = self._insert(table, rows)
+            return self._json(201, inserted) if represent else (201, {}, b"")
+        if method == "PATCH":
+            changed = []
+            for row in self._filter(self.tables[table], params):
+                row.update(payload or {})
+                if table in _UPDATED_AT_TRIGGERS:
+                    row["updated_at"] = _now()
+                changed.append(copy.deepcopy(row))
+            return self._json(200, changed) if represent else (204, {}, b"")
+        if method == "DELETE":
+            doomed = self._filter(self.tables[table], params)
+            ids = {id(r) for r in doomed}
+            self.tables[table] = [r for r in self.tables[table] if id(r) not in ids]
+            return self._json(200, copy.deepcopy(doomed)) if represent else (204, {}, b"")
+        return self._json(405, {"message": f"method {method} not allowed"})
+
+    def _insert(self, table, rows):
+        out = []
+        for row in rows:
+            row = dict(row)
+            row.setdefault("id", str(uuid.uuid4()))
+            row.setdefault("created_at", _now())
+            for column in _TIMESTAMP_DEFAULTS.get(table, ()):
+                row.setdefault(column, _now())
+            self.tables.setdefault(table, []).append(row)
+            out.append(copy.deepcopy(row))
+        return out
+
+    def _filter(self, rows, params):
+        result = []
+        for row in rows:
+            ok = True
+            for column, expr in params.items():
+                if column in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+                    continue
+                if column in ("or", "and"):
+                    ok = _matches_logic(row, column, expr)
+                elif column in ("not.or", "not.and"):
+                    ok = not _matches_logic(row, column[4:], expr)
+                else:
+                    ok = _matches(row, column, expr)
+                if not ok:
+                    break
+            if ok:
+                result.append(row)
+        return result
+
+    def _project(self, table, row, select):
+        out = {}
+        for item in _split_top_level(select or "*"):
+            embed = _EMBED_RE.match(item)
+            if embed:
+                alias, target, inner = embed.groups()
+                fk, ref = RELATIONS.get(table, {}).get(target, (None, None))
+                if fk is None:
+                    raise ValueError(f"Could not find a relationship between '{table}' and '{target}'")
+                key = row.get(fk)
+                match = None if key is None else next((r for r in self.tables.get(target, []) if r.get(ref) == key), None)
+                out[alias or target] = self._project(target, match, inner) if match is not None else None
+            elif item == "*":
+                out.update(copy.deepcopy(row))
+            else:
+                alias, _, column = item.rpartition(":")
+                out[alias or column] = copy.deepcopy(row.get(column))
+        return out
+
+    def _select(self, table, params):
+        rows = _sort(list(self._filter(self.tables[table], params)), _parse_order(params.get("order")))
+        offset = int(params.get("offset") or 0)
+        limit = params.get("limit")
+        rows = rows[offset:offset + int(limit)] if limit not in (None, "") else rows[offset:]
+        return [self._project(table, row, params.get("select")) for row in rows]
+
+    # ---- GoTrue ----
+
+    def _auth(self, method, path, headers):
+        token = headers.get("Authorization", "").replace("Bearer ", "", 1).strip()
+        if path == "/user" and method == "GET":
+            user_id = self.tokens.get(token)
+            if user_id is None or user_id not in self.users:
+                return self._json(401, {"code": 401, "msg": "invalid JWT"})
+            return self._json(200, self.users[user_id])
+        match = re.match(r"^/admin/users/([^/]+)$", path)
+        if match:
+            user = self.users.get(match.group(1))
+            if user is None:
+                return self._json(404, {"code": 404, "msg": "User not found"})
+            if method == "GET":
+                return self._json(200, user)
+            if method == "DELETE":
+                del self.users[user["id"]]
+                for t in [t for t, uid in self.tokens.items() if uid == user["id"]]:
+                    del self.tokens[t]
+                return self._json(200, {})
+        return self._json(404, {"code": 404, "msg": f"no auth route for {method} {path}"})
+
+    # ---- transports ----
+
+    def httpx_transport(self):
+        """An ``httpx.MockTransport`` serving this fake (works for sync and async clients)."""
+        import httpx
+
+        def handler(request):
+            status, headers, body = self.handle(request.method, str(request.url), dict(request.headers), request.content)
+            return httpx.Response(status, headers=headers, content=body)
+
+        return httpx.MockTransport(handler)
+
+    def __call__(self, environ, start_response):
+        """WSGI entry point for serving the fake over real HTTP."""
+        from werkzeug.wrappers import Request
+        request = Request(environ)
+        url = request.full_path if request.query_string else request.path
+        status, headers, body = self.handle(request.method, url, dict(request.headers), request.get_data())
+        start_response(f"{status} {_STATUS_TEXT.get(status, 'OK')}", list(headers.items()))
+        return [body]
+
+
+class FakeSupabaseAdapter(BaseAdapter):
+    """requests transport adapter that answers from a FakeSupabase instead of the network."""
+
+    def __init__(self, fake: FakeSupabase):
+        super().__init__()
+        self.fake = fake
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        status, headers, body = self.fake.handle(request.method, request.url, request.headers, request.body)
+        resp = requests.Response()
+        resp.status_code = status
+        resp.reason = _STATUS_TEXT.get(status, "")
+        resp.headers = CaseInsensitiveDict(headers)
+        resp._content = body
+        resp.encoding = "utf-8"
+        resp.url = request.url
+        resp.request = request
+        return resp
+
+    def close(self):
+        pass
+
+
+@contextlib.contextmanager
+def installed(fake: FakeSupabase, session=None):
+    """Route this process's Supabase traffic to ``fake`` for the duration of the block."""
+    from src.database import db
+    session = session or db._http()
+    prefix = db.SUPABASE_URL + "/"
+    session.mount(prefix, FakeSupabaseAdapter(fake))
+    try:
+        yield fake
+    finally:
+        session.adapters.pop(prefix, None)
+
+
+def seed(fake: FakeSupabase, teams=2, members=4, feed_rows=100, seed=7):
+    """Populate ``fake`` with teams, users, profiles and an activity history.
+
+    Returns a dict with the ids the load driver needs: ``teams`` (list of
+    {id, admin, members}) and ``tokens`` (user id -> access token).
+    """
+    from benchmarks.payloads import feed_rows as sample_rows
+
+    rng = random.Random(seed)
+    skills = ["Python", "React", "SQL", "Security", "UI/UX", "DevOps", "Testing", "TypeScript"]
+    now = datetime.now(timezone.utc)
+    fixture = {"teams": [], "tokens": {}}
+    for t in range(teams):
+        users = []
+        for m in range(members):
+            user_id, token = fake.add_user(email=f"dev{t}-{m}@example.com", full_name=f"Dev {t}-{m}")
+            fixture["tokens"][user_id] = token
+            users.append(user_id)
+            fake.insert("user_profiles", {
+                "user_id": user_id,
+                "name": f"Dev {t}-{m}",
+                "interests": rng.sample(skills, 2),
+                "custom_skills": rng.sample(skills, 1),
+            })
+        team = fake.insert("teams", {"lobby_name": f"Team {t}", "created_by": users[0]})[0]
+        for m, user_id in enumerate(users):
+            fake.insert("team_membership", {
+                "team_id": team["id"], "user_id": user_id, "role": "admin" if m == 0 else "member",
+                "joined_at": (now - timedelta(days=30 - m)).isoformat(),
+            })
+        for i, sample in enumerate(sample_rows(feed_rows, seed=seed + t)):
+            user_id = rng.choice(users)
+            fake.insert("file_snapshots", {
+                "id": sample["source_snapshot_id"], "user_id": user_id, "team_id": team["id"],
+                "file_path": sample["file_path"], "changes": sample["changes"], "snapshot": sample["snapshot"],
+            })
+            created_at = (now - timedelta(minutes=i * 7)).isoformat()
+            fake.insert("team_activity_feed", {
+                "team_id": team["id"], "user_id": user_id, "summary": sample["summary"],
+                "event_header": None, "file_path": sample["file_path"],
+                "source_snapshot_id": sample["source_snapshot_id"], "activity_type": "ai_summary",
+                "pinned": False, "created_at": created_at, "updated_at": created_at,
+            })
+        fixture["teams"].append({"id": team["id"], "admin": users[0], "members": users})
+    return fixture
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a fake Supabase (PostgREST + auth) over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--teams", type=int, default=2)
+    parser.add_argument("--feed-rows", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    from werkzeug.serving import run_simple
+
+    fake = FakeSupabase(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000)
+    fixture = seed(fake, teams=args.teams, feed_rows=args.feed_rows)
+    for team in fixture["teams"]:
+        print(f"team {team['id']} admin token {fixture['tokens'][team['admin']]}")
+    run_simple(args.host, args.port, fake, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,21 @@
 import os
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+from .utils.fast_json import FastJSONProvider
+from .utils.compression import init_compression
+from .services.model_usage import init_model_usage
+from .utils.metrics import REGISTRY
+
 app = Flask(__name__)
-CORS(app)  # allow cross-origin for development
+app.json = FastJSONProvider(app)  # orjson-backed when installed
+CORS(app, expose_headers=["ETag", "X-Next-Cursor", "X-Feed-Watermark", "X-Model-Usage"])  # allow cross-origin for development
+init_compression(app)  # gzip/br/zstd for large JSON bodies
+init_model_usage(app)  # X-Model-Usage debug header (MODEL_USAGE_HEADER=1)
 
 
 from .routes.notes_route import notes_bp
@@ -29,6 +37,11 @@ app.register_blueprint(account_bp)
 def health_check():
     return jsonify({"status": "healthy", "service": "collab-agent-backend"}), 200
 
+# Prometheus scrape endpoint (per worker process)
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=True)
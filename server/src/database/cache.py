@@ -0,0 +1,197 @@
+# backend/cache.py
+"""Read-through TTL cache for sb_select.
+
+Entries are keyed by table plus normalized PostgREST params and live in one
+bounded LRU shared by every table. Only tables listed in SB_CACHE_TTLS are
+cached, e.g. ``SB_CACHE_TTLS=user_profiles=60,team_membership=30``.
+
+Writes through sb_insert/sb_update/sb_delete drop every cached read that the
+write could have changed. An entry survives only if one of its eq./in. filters
+is provably disjoint from the rows the write touched.
+"""
+import os, re, threading, time
+from collections import OrderedDict
+
+# PostgREST query params that shape the response but do not filter rows
+NON_FILTER_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+_EMBED_RE = re.compile(r"([A-Za-z_][\w]*)(?:!\w+)?\s*\(")
+
+
+def _norm_value(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def parse_filter(value):
+    """Return the set of values an eq./in. filter allows, or None if it can't be pinned down."""
+    if not isinstance(value, str):
+        return None
+    if value.startswith("eq."):
+        return {value[3:]}
+    if value.startswith("in.(") and value.endswith(")"):
+        return {v.strip().strip('"') for v in value[4:-1].split(",") if v.strip()}
+    if value.startswith("is."):
+        return {value[3:]}
+    return None
+
+
+def _normalize_param(key, value):
+    value = _norm_value(value)
+    if key not in NON_FILTER_PARAMS and value.startswith("in.(") and value.endswith(")"):
+        value = "in.(" + ",".join(sorted(v.strip() for v in value[4:-1].split(","))) + ")"
+    return value
+
+
+def make_key(table: str, params: dict) -> tuple:
+    return (table,) + tuple(sorted((k, _normalize_param(k, v)) for k, v in (params or {}).items()))
+
+
+def embedded_tables(params: dict) -> set:
+    """Tables pulled in through resource embedding in the select list, e.g. file_snapshots(changes)."""
+    return set(_EMBED_RE.findall((params or {}).get("select") or ""))
+
+
+def write_constraints(where_qs=None, body=None, insert=False) -> dict:
+    """Map column -> set of values the written rows are known to have (missing column = unknown)."""
+    if insert:
+        rows = body if isinstance(body, list) else [body or {}]
+        if not rows:
+            return {}
+        columns = set(rows[0]).intersection(*rows[1:])
+        return {c: {_norm_value(r[c]) for r in rows} for c in columns}
+
+    constraints = {}
+    for column, value in (where_qs or {}).items():
+        allowed = parse_filter(value)
+        if allowed is not None:
+            constraints[column] = set(allowed)
+    # An update also moves rows *into* whatever filter matches the new value
+    for column, value in (body or {}).items() if isinstance(body, dict) else ():
+        if column in constraints:
+            constraints[column].add(_norm_value(value))
+    return constraints
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "filters", "depends_on")
+
+    def __init__(self, value, expires_at, filters, depends_on):
+        self.value = value
+        self.expires_at = expires_at
+        self.filters = filters
+        self.depends_on = depends_on
+
+
+class SelectCache:
+    def __init__(self, ttls: dict, max_entries: int = 1024, clock=time.monotonic):
+        self.ttls = dict(ttls)
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def enabled_for(self, table: str) -> bool:
+        return self.ttls.get(table, 0) > 0
+
+    def _table_stats(self, table):
+        return self._stats.setdefault(table, {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0})
+
+    def generation(self, table: str, params: dict) -> tuple:
+        """Write counters for every table a read depends on; pass back to put()."""
+        tables = sorted({table} | embedded_tables(params))
+        with self._lock:
+            return tuple(self._generations.get(t, 0) for t in tables)
+
+    def get(self, table: str, params: dict):
+        """Return ``(True, value)`` on a fresh hit, otherwise ``(False, None)``."""
+        key = make_key(table, params)
+        with self._lock:
+            stats = self._table_stats(table)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > self._clock():
+                self._entries.move_to_end(key)
+                stats["hits"] += 1
+                return True, entry.value
+            if entry is not None:
+                del self._entries[key]
+            stats["misses"] += 1
+            return False, None
+
+    def put(self, table: str, params: dict, value, generation: tuple = None):
+        """Store a value read at ``generation``; skipped if a write to the table landed meanwhile."""
+        ttl = self.ttls.get(table, 0)
+        if ttl <= 0:
+            return
+        key = make_key(table, params)
+        filters = {}
+        for column, raw in (params or {}).items():
+            if column in NON_FILTER_PARAMS:
+                continue
+            allowed = parse_filter(_norm_value(raw))
+            if allowed is not None:
+                filters[column] = allowed
+        depends_on = {table} | embedded_tables(params)
+        with self._lock:
+            if generation is not None and generation != tuple(self._generations.get(t, 0) for t in sorted(depends_on)):
+                return
+            self._entries[key] = _Entry(value, self._clock() + ttl, filters, depends_on)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._table_stats(evicted_key[0])["evictions"] += 1
+
+    def invalidate(self, table: str, constraints: dict):
+        """Drop cached reads of ``table`` (or embedding it) that rows matching ``constraints`` could affect."""
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            doomed = []
+            for key, entry in self._entries.items():
+                if table not in entry.depends_on:
+                    continue
+                # Embedded reads filter on the parent table's columns, so they can't be ruled out
+                if key[0] == table and any(
+                    column in constraints and not (entry.filters[column] & constraints[column])
+                    for column in entry.filters
+                ):
+                    continue
+                doomed.append(key)
+            for key in doomed:
+                self._table_stats(key[0])["invalidations"] += 1
+                del self._entries[key]
+            return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {}
+            for table, stats in self._stats.items():
+                lookups = stats["hits"] + stats["misses"]
+                out[table] = dict(stats, hit_ratio=(stats["hits"] / lookups) if lookups else 0.0)
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "tables": out}
+
+
+def parse_ttls(spec: str) -> dict:
+    """Parse ``table=seconds,table=seconds`` into a dict, ignoring malformed items."""
+    ttls = {}
+    for item in (spec or "").split(","):
+        table, _, seconds = item.partition("=")
+        try:
+            ttls[table.strip()] = float(seconds)
+        except ValueError:
+            continue
+    return {t: s for t, s in ttls.items() if t}
+
+
+select_cache = SelectCache(
+    parse_ttls(os.getenv("SB_CACHE_TTLS", "")),
+    max_entries=int(os.getenv("SB_CACHE_MAX_ENTRIES") or 1024),
+)
@@ -1,9 +1,32 @@
 # backend/db.py
-import os, requests
+import os, re, time, socket, threading, asyncio, weakref, requests
+import httpx
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from .cache import select_cache, write_constraints, make_key
+from .singleflight import SingleFlight
+from .hedging import Hedger
+from ..utils.fast_json import loads as json_loads
+from ..utils.metrics import Counter, Gauge, Histogram, DEFAULT_SIZE_BUCKETS
 
 SUPABASE_URL = (os.getenv("SUPABASE_URL") or "").rstrip("/")
 SERVICE_KEY  = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or ""  # Fixed: use correct env var name
 REST = f"{SUPABASE_URL}/rest/v1"
+AUTH = f"{SUPABASE_URL}/auth/v1"
+
+# Connection pool tuning (per worker process)
+POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE") or 10)
+KEEPALIVE_SECONDS = int(os.getenv("SUPABASE_KEEPALIVE_SECONDS") or 60)
+# Upper bound on concurrent connections for the asyncio client (per event loop)
+ASYNC_POOL_SIZE = int(os.getenv("SUPABASE_ASYNC_POOL_SIZE") or 200)
+# Share one upstream GET between identical concurrent sb_select calls
+COALESCE_READS = (os.getenv("SB_COALESCE_READS") or "1") != "0"
+# Tail-latency mode: per-table adaptive timeouts and hedged reads (see hedging.py)
+TAIL_LATENCY_MODE = (os.getenv("SB_TAIL_LATENCY_MODE") or "0") == "1"
+# Rows per POST for sb_insert_many
+INSERT_CHUNK_SIZE = int(os.getenv("SB_INSERT_CHUNK_SIZE") or 500)
+# Rows per request for sb_select_iter
+PAGE_SIZE = int(os.getenv("SB_PAGE_SIZE") or 1000)
 
 HEADERS = {
     "apikey": SERVICE_KEY,
@@ -14,41 +37,483 @@ HEADERS = {
     "Prefer": "return=representation",
 }
 
+
+OPERATIONS = {"GET": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+SB_REQUESTS = Counter("supabase_requests_total", "Upstream Supabase calls by table, operation and HTTP status.",
+                      ("table", "operation", "status"))
+SB_LATENCY = Histogram("supabase_request_duration_seconds", "Upstream Supabase call latency.",
+                       ("table", "operation"))
+SB_RESPONSE_BYTES = Histogram("supabase_response_size_bytes", "Upstream Supabase response body size.",
+                              ("table", "operation"), buckets=DEFAULT_SIZE_BUCKETS)
+
+
+def _observe(table, operation, started, resp=None):
+    # status "error" means no HTTP response at all (timeout, connection reset, ...)
+    status = str(resp.status_code) if resp is not None else "error"
+    SB_REQUESTS.inc(table=table, operation=operation, status=status)
+    SB_LATENCY.observe(time.perf_counter() - started, table=table, operation=operation)
+    if resp is not None:
+        SB_RESPONSE_BYTES.observe(len(resp.content or b""), table=table, operation=operation)
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter that turns on TCP keep-alive so idle pooled sockets survive between requests."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        options = list(HTTPConnection.default_socket_options)
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, KEEPALIVE_SECONDS))
+        if hasattr(socket, "TCP_KEEPINTVL"):
+            options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(1, KEEPALIVE_SECONDS // 4)))
+        kwargs["socket_options"] = options
+        super().init_poolmanager(*args, **kwargs)
+
+
+_reads = SingleFlight()
+_hedger = Hedger()
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+# httpx.AsyncClient is bound to the loop that created it, so keep one per loop
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _reset_session():
+    # gunicorn forks workers after import; never share sockets (or a held lock) with the parent
+    global _session, _session_pid, _session_lock, _async_clients, _reads
+    _session, _session_pid = None, None
+    _reads = SingleFlight()
+    _session_lock = threading.Lock()
+    _async_clients = weakref.WeakKeyDictionary()
+    _hedger.reset()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_session)
+
+
+def _http() -> requests.Session:
+    """Return this worker's pooled keep-alive session, creating it on first use."""
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                session = requests.Session()
+                adapter = _KeepAliveAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session, _session_pid = session, pid
+    return _session
+
+
+def _ahttp() -> httpx.AsyncClient:
+    """Return the pooled async client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=20,
+            limits=httpx.Limits(
+                max_connections=ASYNC_POOL_SIZE,
+                max_keepalive_connections=POOL_SIZE,
+                keepalive_expiry=KEEPALIVE_SECONDS,
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def aclose_async_client():
+    """Close the running loop's async client (call before the loop shuts down)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def pool_stats() -> dict:
+    """Connection reuse counters for this worker: a hit is a request served on an already-open socket."""
+    requests_made = connections_opened = 0
+    session = _session if _session_pid == os.getpid() else None
+    if session is not None:
+        for adapter in {id(a): a for a in session.adapters.values()}.values():
+            pools = getattr(getattr(adapter, "poolmanager", None), "pools", None)
+            if pools is None:
+                continue  # not a urllib3-backed adapter (e.g. the load-test fake)
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                requests_made += pool.num_requests
+                connections_opened += pool.num_connections
+    hits = max(0, requests_made - connections_opened)
+    return {
+        "pool_size": POOL_SIZE,
+        "requests": requests_made,
+        "hits": hits,
+        "misses": connections_opened,
+        "hit_ratio": (hits / requests_made) if requests_made else 0.0,
+    }
+
+
 def _check_config():
     problems = []
-    if not SUPABASE_URL.startswith("https://") or not SUPABASE_URL.endswith(".supabase.co"):
+    hosted = SUPABASE_URL.startswith("https://") and SUPABASE_URL.endswith(".supabase.co")
+    # `supabase start` and the load-test fake listen on localhost over plain HTTP
+    local = re.match(r"^http://(localhost|127\.0\.0\.1)(:\d+)?$", SUPABASE_URL) is not None
+    if not (hosted or local):
         problems.append(f"Bad SUPABASE_URL: {SUPABASE_URL!r}")
     if not SERVICE_KEY:
         problems.append("Missing SUPABASE_SERVICE_ROLE_KEY.")
     if problems:
         raise RuntimeError(" | ".join(problems))
 
-def _handle(resp: requests.Response):
+class SupabaseHTTPError(RuntimeError):
+    """PostgREST answered with an error status (kept on ``status_code``)."""
+
+    def __init__(self, status_code, text):
+        super().__init__(f"Supabase REST {status_code}: {text}")
+        self.status_code = status_code
+
+
+def _rejected(error) -> bool:
+    """True when PostgREST definitely did not apply the write (a 4xx answer).
+
+    Timeouts, dropped connections and 5xx answers are ambiguous: the write
+    may have been committed before the failure reached us.
+    """
+    return isinstance(error, SupabaseHTTPError) and 400 <= error.status_code < 500
+
+
+def _body(resp: requests.Response):
     try:
         resp.raise_for_status()
     except requests.HTTPError as e:
         # show upstream body so you see *why*
-        raise RuntimeError(f"Supabase REST {resp.status_code}: {resp.text}") from e
-    return resp.json() if resp.text else []
+        raise SupabaseHTTPError(resp.status_code, resp.text) from e
+    return resp.content
+
+def _decode(body):
+    # Decode straight from the response bytes (no intermediate str)
+    return json_loads(body) if body else []
+
+def _handle(resp: requests.Response):
+    return _decode(_body(resp))
+
+def _send(method: str, table: str, hedge: bool = False, **kwargs):
+    """One PostgREST round trip returning the raw body.
 
-def sb_select(table: str, params: dict):
+    In tail-latency mode the timeout adapts to the table's observed latency, and
+    ``hedge=True`` calls (reads, or writes the caller marks idempotent) may race a duplicate.
+    """
+    send = getattr(_http(), method.lower())
+    url = f"{REST}/{table}"
+    headers = {**HEADERS, **kwargs.pop("headers", {})}
+
+    def attempt(timeout):
+        started, resp = time.perf_counter(), None
+        try:
+            resp = send(url, headers=headers, timeout=timeout, **kwargs)
+            return _body(resp)
+        finally:
+            _observe(table, OPERATIONS[method], started, resp)
+
+    if not TAIL_LATENCY_MODE:
+        return attempt(20)
+    return _hedger.call(f"{table}:{method}", attempt, hedge=hedge)
+
+def sb_select(table: str, params: dict, cache: bool = True):
+    """Read rows from a table; served from the TTL cache when the table is configured for it."""
     _check_config()
-    r = requests.get(f"{REST}/{table}", headers=HEADERS, params=params, timeout=20)
-    return _handle(r)
+    use_cache = cache and select_cache.enabled_for(table)
+    if use_cache:
+        hit, text = select_cache.get(table, params)
+        if hit:
+            return _decode(text)
+    generation = select_cache.generation(table, params)
+
+    def fetch():
+        return _send("GET", table, hedge=True, params=params)
+
+    # Keying flights on the write generation keeps read-your-writes: a read issued
+    # after a local write never joins a flight that started before it
+    text = _reads.do((generation,) + make_key(table, params), fetch) if COALESCE_READS else fetch()
+    if use_cache:
+        select_cache.put(table, params, text, generation)
+    # Cached and shared bodies are decoded per caller, so callers may mutate rows freely
+    return _decode(text)
+
+def _keyset_filter(params: dict, column: str, last) -> dict:
+    value = str(last).replace('"', '\\"')
+    condition = f'{column}.gt."{value}"'
+    existing = params.get("and")
+    # Keep any caller-supplied and=(...) filter alongside the cursor condition
+    combined = f"({existing[1:-1]},{condition})" if existing else f"({condition})"
+    return dict(params, **{"and": combined})
+
+def sb_select_iter(table: str, params: dict, page_size: int = None, keyset: str = None):
+    """Yield rows one page at a time, so memory stays flat however big the table is.
+
+    Pages with limit/offset by default; include a unique column in ``order`` for a
+    stable walk. Pass ``keyset="id"`` (any unique, sortable column) to page on
+    ``<column> > last seen`` instead, where every page costs the same however deep
+    the walk goes. A ``limit`` in ``params`` caps the total number of rows yielded.
+    """
+    page_size = max(1, page_size or PAGE_SIZE)
+    params = dict(params or {})
+    remaining = int(params.pop("limit")) if params.get("limit") else None
+    params.pop("offset", None)
+    if keyset:
+        params["order"] = f"{keyset}.asc"
+        columns = (params.get("select") or "*").split(",")
+        if keyset not in columns and "*" not in columns:
+            params["select"] = f"{params['select']},{keyset}"
+
+    offset, last = 0, None
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        page_params = dict(params, limit=str(size))
+        if keyset and last is not None:
+            page_params = _keyset_filter(page_params, keyset, last)
+        elif not keyset and offset:
+            page_params["offset"] = str(offset)
+
+        # Pages are one-off reads; keep them out of the select cache
+        rows = sb_select(table, page_params, cache=False)
+        yield from rows
+        if len(rows) < size:
+            return
+        offset += len(rows)
+        if remaining is not None:
+            remaining -= len(rows)
+        if keyset:
+            last = rows[-1].get(keyset)
+
+_write_listeners = []
 
-def sb_insert(table, json_body):
+def add_write_listener(fn):
+    """Call ``fn(table, operation, rows)`` after every successful insert/update.
+
+    ``rows`` are the rows PostgREST handed back (return=representation).
+    Listeners run inline on the writing request, so they must be quick;
+    a listener that raises is logged and never fails the write.
+    """
+    _write_listeners.append(fn)
+    return fn
+
+def remove_write_listener(fn):
+    if fn in _write_listeners:
+        _write_listeners.remove(fn)
+
+def _notify(table, operation, rows):
+    if not _write_listeners or not rows:
+        return
+    if isinstance(rows, dict):
+        rows = [rows]
+    for fn in list(_write_listeners):
+        try:
+            fn(table, operation, rows)
+        except Exception as e:
+            print(f"[db] Write listener failed for {table}: {e}")
+
+def sb_insert(table, json_body, on_conflict=None):
+    _check_config()
+    kwargs = {}
+    if on_conflict:
+        # Rows whose on_conflict columns already exist are skipped (and not returned) instead of a 409,
+        # so the write is also safe to hedge
+        kwargs = {"hedge": True, "params": {"on_conflict": on_conflict},
+                  "headers": {"Prefer": "resolution=ignore-duplicates,return=representation"}}
+    try:
+        rows = _decode(_send("POST", table, json=json_body, **kwargs))
+        _notify(table, "insert", rows)
+        return rows
+    finally:
+        select_cache.invalidate(table, write_constraints(body=json_body, insert=True))
+
+def sb_insert_many(table, rows, chunk_size=None):
+    """Insert many rows with one POST per chunk instead of one per row.
+
+    Returns ``(inserted, errors)``: the rows PostgREST created, and one
+    ``{"index", "row", "error"}`` dict per input row that could not be inserted.
+    A chunk is atomic upstream, so when PostgREST rejects one (4xx) its rows
+    are retried one by one to pin the failure on the offending rows. After a
+    timeout, dropped connection or 5xx the chunk may already be committed, so
+    it is not retried; all its rows are reported as failed instead.
+    """
     _check_config()
-    r = requests.post(f"{REST}/{table}", headers=HEADERS, json=json_body, timeout=20)
-    return _handle(r)
+    rows = list(rows or [])
+    chunk_size = max(1, chunk_size or INSERT_CHUNK_SIZE)
+    inserted, errors = [], []
+    try:
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            try:
+                inserted.extend(_decode(_send("POST", table, json=chunk)))
+                continue
+            except (RuntimeError, requests.RequestException) as e:
+                if len(chunk) == 1 or not _rejected(e):
+                    errors.extend({"index": start + offset, "row": row, "error": str(e)}
+                                  for offset, row in enumerate(chunk))
+                    continue
+            for offset, row in enumerate(chunk):
+                try:
+                    inserted.extend(_decode(_send("POST", table, json=row)))
+                except (RuntimeError, requests.RequestException) as e:
+                    errors.append({"index": start + offset, "row": row, "error": str(e)})
+    finally:
+        if rows:
+            select_cache.invalidate(table, write_constraints(body=rows, insert=True))
+    _notify(table, "insert", inserted)
+    return inserted, errors
 
-def sb_update(table, where_qs, json_body):
+def sb_update(table, where_qs, json_body, idempotent=False):
     _check_config()
     # where_qs example: {"id": "eq.<uuid>"}
-    r = requests.patch(f"{REST}/{table}", headers=HEADERS, params=where_qs, json=json_body, timeout=20)
-    return _handle(r)
+    # idempotent=True lets tail-latency mode hedge this write (repeating it must be harmless)
+    try:
+        rows = _decode(_send("PATCH", table, hedge=idempotent, params=where_qs, json=json_body))
+        _notify(table, "update", rows)
+        return rows
+    finally:
+        select_cache.invalidate(table, write_constraints(where_qs, json_body))
 
-def sb_delete(table, where_qs):
+def sb_delete(table, where_qs, idempotent=False):
     _check_config()
     # where_qs example: {"id": "eq.<uuid>"}
-    r = requests.delete(f"{REST}/{table}", headers=HEADERS, params=where_qs, timeout=20)
-    return _handle(r)
+    try:
+        return _decode(_send("DELETE", table, hedge=idempotent, params=where_qs))
+    finally:
+        select_cache.invalidate(table, write_constraints(where_qs))
+
+def latency_stats() -> dict:
+    """Hedging counters and per-table latency percentiles (tail-latency mode only)."""
+    return _hedger.stats()
+
+def coalesce_stats() -> dict:
+    """How many sb_select calls were served by another caller's in-flight request."""
+    return _reads.stats()
+
+def cache_stats() -> dict:
+    """Per-table hit/miss/invalidation counters and hit ratios for the sb_select cache."""
+    return select_cache.stats()
+
+
+# ---- asyncio flavor: same contract as the sync helpers, for use inside an event loop ----
+
+async def _asend(method: str, table: str, **kwargs):
+    send = getattr(_ahttp(), method.lower())
+    started, resp = time.perf_counter(), None
+    try:
+        resp = await send(f"{REST}/{table}", headers=HEADERS, **kwargs)
+        return resp
+    finally:
+        _observe(table, OPERATIONS[method], started, resp)
+
+def _handle_async(resp: httpx.Response):
+    if resp.is_error:
+        raise SupabaseHTTPError(resp.status_code, resp.text)
+    return _decode(resp.content)
+
+async def sb_select_async(table: str, params: dict, cache: bool = True):
+    _check_config()
+    use_cache = cache and select_cache.enabled_for(table)
+    if use_cache:
+        hit, text = select_cache.get(table, params)
+        if hit:
+            return _decode(text)
+        generation = select_cache.generation(table, params)
+    r = await _asend("GET", table, params=params)
+    rows = _handle_async(r)
+    if use_cache:
+        select_cache.put(table, params, r.content, generation)
+    return rows
+
+async def sb_insert_async(table, json_body):
+    _check_config()
+    try:
+        r = await _asend("POST", table, json=json_body)
+        rows = _handle_async(r)
+        _notify(table, "insert", rows)
+        return rows
+    finally:
+        select_cache.invalidate(table, write_constraints(body=json_body, insert=True))
+
+async def sb_update_async(table, where_qs, json_body):
+    _check_config()
+    try:
+        r = await _asend("PATCH", table, params=where_qs, json=json_body)
+        rows = _handle_async(r)
+        _notify(table, "update", rows)
+        return rows
+    finally:
+        select_cache.invalidate(table, write_constraints(where_qs, json_body))
+
+async def sb_delete_async(table, where_qs):
+    _check_config()
+    try:
+        r = await _asend("DELETE", table, params=where_qs)
+        return _handle_async(r)
+    finally:
+        select_cache.invalidate(table, write_constraints(where_qs))
+
+
+def _auth_headers(token=None):
+    return {
+        "apikey": SERVICE_KEY,
+        "Authorization": f"Bearer {token or SERVICE_KEY}",
+        "Content-Type": "application/json",
+    }
+
+_ID_SEGMENT = re.compile(r"/[0-9a-fA-F-]{16,}(?=/|$)")
+
+def _auth_call(method, path, token=None, timeout=10):
+    # Label by route template ("/admin/users/:id"), never by user id
+    table = "auth" + _ID_SEGMENT.sub("/:id", path.split("?")[0])
+    started, resp = time.perf_counter(), None
+    try:
+        resp = getattr(_http(), method)(f"{AUTH}{path}", headers=_auth_headers(token), timeout=timeout)
+        return resp
+    finally:
+        _observe(table, method, started, resp)
+
+def sb_auth_get(path, token=None, timeout=10):
+    """GET a Supabase Auth endpoint (e.g. "/user") and return the raw response.
+
+    Pass the caller's access token to act as that user; defaults to the service key.
+    """
+    return _auth_call("get", path, token, timeout)
+
+def sb_auth_delete(path, timeout=10):
+    """DELETE a Supabase Auth admin endpoint with the service key and return the raw response."""
+    return _auth_call("delete", path, timeout=timeout)
+
+
+# ---- scrape-time gauges for the pool, cache, coalescing and hedging layers ----
+
+def _pool_samples():
+    stats = pool_stats()
+    return {("hits",): stats["hits"], ("misses",): stats["misses"], ("requests",): stats["requests"]}
+
+def _cache_samples():
+    samples = {}
+    for table, stats in cache_stats()["tables"].items():
+        for field in ("hits", "misses", "evictions", "invalidations", "hit_ratio"):
+            samples[(table, field)] = stats[field]
+    return samples
+
+def _coalesce_samples():
+    stats = coalesce_stats()
+    return {("upstream_calls",): stats["upstream_calls"], ("deduplicated",): stats["deduplicated"],
+            ("in_flight",): stats["in_flight"]}
+
+def _hedge_samples():
+    stats = latency_stats()
+    return {(field,): stats[field] for field in ("calls", "hedges", "hedge_wins", "budget_denied")}
+
+Gauge("supabase_pool_connections", "Keep-alive pool counters for this worker.", ("kind",)).set_function(_pool_samples)
+Gauge("supabase_select_cache", "sb_select cache counters and hit ratio per table.", ("table", "kind")).set_function(_cache_samples)
+Gauge("supabase_coalesced_reads", "sb_select singleflight counters.", ("kind",)).set_function(_coalesce_samples)
+Gauge("supabase_hedged_calls", "Tail-latency mode hedging counters.", ("kind",)).set_function(_hedge_samples)
@@ -0,0 +1,173 @@
+# backend/hedging.py
+"""Tail-latency mode for PostgREST calls: adaptive timeouts and hedged requests.
+
+Every call's latency is recorded per ``table:METHOD``. Once a key has enough
+samples:
+
+* its timeout becomes ``p99 * TIMEOUT_MULTIPLIER``, clamped to
+  [TIMEOUT_MIN, TIMEOUT_MAX]; and
+* a hedged call sends a duplicate request if the first has not answered by the
+  key's HEDGE_PERCENTILE latency. The first successful response wins, and the
+  loser is cancelled if it has not started yet or ignored if it has.
+
+A token bucket caps the hedges. Each primary call earns HEDGE_BUDGET tokens
+(at most 1.0) and each hedge spends one, so hedging can never more than double
+upstream load.
+"""
+import os, threading, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+TIMEOUT_DEFAULT = float(os.getenv("SB_TIMEOUT_SECONDS") or 20)
+TIMEOUT_MIN = float(os.getenv("SB_TIMEOUT_MIN_SECONDS") or 2)
+TIMEOUT_MAX = float(os.getenv("SB_TIMEOUT_MAX_SECONDS") or 20)
+TIMEOUT_MULTIPLIER = float(os.getenv("SB_TIMEOUT_MULTIPLIER") or 4)
+HEDGE_PERCENTILE = float(os.getenv("SB_HEDGE_PERCENTILE") or 95)
+HEDGE_MIN_DELAY = float(os.getenv("SB_HEDGE_MIN_DELAY_SECONDS") or 0.05)
+HEDGE_BUDGET = min(1.0, float(os.getenv("SB_HEDGE_BUDGET") or 0.1))
+MIN_SAMPLES = int(os.getenv("SB_LATENCY_MIN_SAMPLES") or 20)
+WINDOW = int(os.getenv("SB_LATENCY_WINDOW") or 256)
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies per key."""
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, key: str, pct: float, min_samples: int = MIN_SAMPLES):
+        """Return the pct-th percentile latency, or None until min_samples are recorded."""
+        with self._lock:
+            samples = list(self._samples.get(key, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        return _percentile(samples, pct)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            keys = list(self._samples)
+        return {
+            key: {"p50": self.percentile(key, 50, 1), "p95": self.percentile(key, 95, 1), "p99": self.percentile(key, 99, 1)}
+            for key in keys
+        }
+
+
+class HedgeBudget:
+    """Token bucket: each primary call earns ``ratio`` tokens, each hedge spends one."""
+
+    def __init__(self, ratio: float = HEDGE_BUDGET, burst: float = 10.0):
+        self.ratio = min(1.0, max(0.0, ratio))
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def take(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+class Hedger:
+    def __init__(self, tracker: LatencyTracker = None, budget: HedgeBudget = None, max_workers: int = 32):
+        self.tracker = tracker or LatencyTracker()
+        self.budget = budget or HedgeBudget()
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._stats = {"calls": 0, "hedges": 0, "hedge_wins": 0, "budget_denied": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="sb-hedge")
+        return self._executor
+
+    def reset(self):
+        """Forget the executor (its threads do not survive fork)."""
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def timeout_for(self, key: str) -> float:
+        p99 = self.tracker.percentile(key, 99)
+        if p99 is None:
+            return TIMEOUT_DEFAULT
+        return min(TIMEOUT_MAX, max(TIMEOUT_MIN, p99 * TIMEOUT_MULTIPLIER))
+
+    def hedge_delay(self, key: str):
+        delay = self.tracker.percentile(key, HEDGE_PERCENTILE)
+        return None if delay is None else max(HEDGE_MIN_DELAY, delay)
+
+    def _timed(self, key, fn, timeout):
+        started = time.monotonic()
+        try:
+            return fn(timeout)
+        finally:
+            # Failures still count: a timed-out call is a (censored) slow sample
+            self.tracker.record(key, time.monotonic() - started)
+
+    def call(self, key: str, fn, hedge: bool = True):
+        """Run ``fn(timeout)`` with the key's adaptive timeout, hedging it when allowed."""
+        self._count("calls")
+        self.budget.earn()
+        timeout = self.timeout_for(key)
+        delay = self.hedge_delay(key) if hedge else None
+        if delay is None:
+            return self._timed(key, fn, timeout)
+
+        primary = self._pool().submit(self._timed, key, fn, timeout)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        if not self.budget.take():
+            self._count("budget_denied")
+            return primary.result()
+
+        self._count("hedges")
+        backup = self._pool().submit(self._timed, key, fn, timeout)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if future is backup:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["latency"] = self.tracker.snapshot()
+        stats["budget_ratio"] = self.budget.ratio
+        return stats
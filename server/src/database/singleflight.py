@@ -0,0 +1,62 @@
+# backend/singleflight.py
+"""Coalesce identical concurrent reads into one upstream call.
+
+The first caller for a key (the leader) runs the call; anyone asking for the
+same key while it is in flight waits and receives the leader's result (or
+exception). Nothing is kept once the call finishes - this is not a cache.
+"""
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._deduplicated = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._leaders += 1
+            else:
+                self._deduplicated += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._leaders + self._deduplicated
+            return {
+                "upstream_calls": self._leaders,
+                "deduplicated": self._deduplicated,
+                "in_flight": len(self._calls),
+                "dedup_ratio": (self._deduplicated / total) if total else 0.0,
+            }
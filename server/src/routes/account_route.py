@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 import os
-import requests
-from ..database.db import sb_select, sb_update, sb_delete, sb_insert
+from ..database.db import sb_select, sb_update, sb_delete, sb_insert, sb_auth_get, sb_auth_delete
+from ..services.user_directory import display_names, user_directory
 
 account_bp = Blueprint("account", __name__, url_prefix="/api/account")
 
@@ -11,18 +11,7 @@ SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or ""
 
 def get_user_display_name(user_id):
     """Get a user's display name from their profile, or fallback to shortened user_id."""
-    try:
-        profiles = sb_select("user_profiles", {
-            "select": "name",
-            "user_id": f"eq.{user_id}",
-            "limit": "1"
-        })
-        if profiles and profiles[0].get("name"):
-            return profiles[0].get("name")
-    except Exception as e:
-        print(f"[get_user_display_name] Error fetching profile for {user_id}: {e}")
-    # Fallback to shortened user_id
-    return user_id[:8] + "…"
+    return display_names([user_id]).get(user_id, user_id[:8] + "…")
 
 
 @account_bp.route("/delete", methods=["POST"], strict_slashes=False)
@@ -47,17 +36,7 @@ def delete_account():
 
         # Get user ID from access token
         print("[DELETE ACCOUNT] Fetching user info from access token")
-        headers = {
-            "apikey": SERVICE_KEY,
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
-
-        response = requests.get(
-            f"{SUPABASE_URL}/auth/v1/user",
-            headers=headers,
-            timeout=10
-        )
+        response = sb_auth_get("/user", token=access_token)
 
         if response.status_code != 200:
             print(f"[DELETE ACCOUNT] ERROR: Failed to authenticate user - {response.status_code}")
@@ -177,20 +156,11 @@ def delete_account():
             sb_delete("user_profiles", {"user_id": f"eq.{user_id}"})
         except Exception as e:
             print(f"[DELETE ACCOUNT] Note: No profile to delete or error: {e}")
+        user_directory.invalidate(user_id)
 
         # Delete user from Supabase Auth
         print("[DELETE ACCOUNT] Deleting user from Supabase Auth")
-        admin_headers = {
-            "apikey": SERVICE_KEY,
-            "Authorization": f"Bearer {SERVICE_KEY}",
-            "Content-Type": "application/json"
-        }
-
-        delete_response = requests.delete(
-            f"{SUPABASE_URL}/auth/v1/admin/users/{user_id}",
-            headers=admin_headers,
-            timeout=10
-        )
+        delete_response = sb_auth_delete(f"/admin/users/{user_id}")
 
         if delete_response.status_code not in [200, 204]:
             print(f"[DELETE ACCOUNT] ERROR: Failed to delete user from auth - {delete_response.status_code}")
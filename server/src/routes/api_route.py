@@ -1,17 +1,45 @@
-from flask import Blueprint, request, jsonify
-import os, textwrap
+from flask import Blueprint, Response, request, jsonify, make_response
+import os, re, textwrap
+from datetime import datetime
 import google.generativeai as genai
-from ..database.db import sb_select, sb_insert
+from ..database.db import sb_select, sb_insert, sb_insert_many, sb_update
+from ..services.user_directory import lookup_users, display_names
+from ..services.feed_stream import feed_broker, parse_event_id, streaming_available, UNAVAILABLE_RETRY_SECONDS
+from ..services.summary_cache import summary_cache, summary_key
+from ..services.jobs import job_queue, runs_as_job, POLL_AFTER_SECONDS
+from ..services.model_limiter import ModelUnavailable
+from ..services.model_usage import generate_content
+from ..utils.cursor import encode_cursor, decode_cursor
+from ..utils.http_cache import content_etag, client_has, conditional
+from ..utils.snapshot_codec import encode_text, decode_text
+from ..utils.diff_compaction import compact_diff
 
 ai_bp = Blueprint("ai", __name__, url_prefix="/api/ai")
 
 SIMPLE_MODEL = os.getenv("SIMPLE_MODEL")
 ADVANCE_MODEL = os.getenv("ADVANCE_MODEL")
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+genai.configure(api_key=os.getenv("GEMINI_API_KEY"), transport=os.getenv("GEMINI_TRANSPORT") or None)
 simple_model = genai.GenerativeModel(SIMPLE_MODEL)
 advance_model = genai.GenerativeModel(ADVANCE_MODEL)
+# task_recommendations prompts are larger and go to the slower model
+ADVANCE_DEADLINE_SECONDS = float(os.getenv("GEMINI_ADVANCE_DEADLINE_SECONDS") or 60)
+
+# Feed rows: team_activity_feed columns, plus fields derived from file_snapshots and profiles
+FEED_COLUMNS = ("id", "team_id", "user_id", "summary", "event_header", "file_path",
+                "source_snapshot_id", "activity_type", "created_at", "pinned")
+FEED_SNAPSHOT_FIELDS = ("changes", "snapshot")
+FEED_FIELDS = FEED_COLUMNS + FEED_SNAPSHOT_FIELDS + ("display_name", "user_email")
+# Feed lists carry at most this many characters of changes/snapshot; the rest is fetched on demand
+FEED_PREVIEW_CHARS = int(os.getenv("FEED_PREVIEW_CHARS") or 2000)
+# Bump whenever the process_snapshot prompt changes, so cached summaries are not reused
+SNAPSHOT_PROMPT_VERSION = "1"
+# process_snapshots: snapshots per request, and diffs / prompt characters per model call
+BATCH_MAX_SNAPSHOTS = int(os.getenv("BATCH_MAX_SNAPSHOTS") or 50)
+BATCH_PACK_FILES = int(os.getenv("BATCH_PACK_FILES") or 10)
+BATCH_PACK_CHARS = int(os.getenv("BATCH_PACK_CHARS") or 24000)
 
 @ai_bp.post("/process_snapshot")
+@runs_as_job("process_snapshot")
 def process_snapshot():
   """
   Create an AI summary for a single file_snapshot and write it
@@ -38,39 +66,21 @@ def process_snapshot():
     return jsonify({"error": "snapshot not found"}), 404
 
   snap = rows[0]
-  diff = (snap.get("changes") or "").strip()
+  diff = (decode_text(snap.get("changes")) or "").strip()
   file_path = snap.get("file_path") or "(unknown file)"
   user_id = snap.get("user_id")
 
   # If team_id not provided, try to infer from user's most recent membership
   if not team_id:
-    memberships = sb_select("team_membership", {
-      "select": "team_id,joined_at",
-      "user_id": f"eq.{user_id}",
-      "order": "joined_at.desc",
-      "limit": "1"
-    })
-    if memberships:
-      team_id = memberships[0].get("team_id")
-    else:
-      # fallback: a team the user created most recently
-      teams = sb_select("teams", {
-        "select": "id,created_at",
-        "created_by": f"eq.{user_id}",
-        "order": "created_at.desc",
-        "limit": "1"
-      })
-      if teams:
-        team_id = teams[0].get("id")
+    team_id = _infer_team_id(user_id)
 
   if not team_id:
     return jsonify({
       "error": "Unable to infer team_id for this user; pass team_id explicitly."
     }), 400
 
-  # Cap the prompt size for reliability
-  if len(diff) > max_chars:
-    diff = diff[:max_chars] + "\n... (truncated)"
+  # Keep the highest-signal hunks within max_chars (drops lockfile/generated/whitespace noise)
+  diff = compact_diff(diff, max_chars)
 
   # 2) Ask the model for a short, plain summary
   prompt = textwrap.dedent(f"""
@@ -84,11 +94,17 @@ def process_snapshot():
     {diff}
   """).strip()
 
+  def generate():
+    resp = generate_content(simple_model, prompt, SIMPLE_MODEL, team_id=team_id)
+    return (resp.text or "").strip()
+
+  key = summary_key(SIMPLE_MODEL, SNAPSHOT_PROMPT_VERSION, file_path, diff)
+  cached = False
   try:
-    resp = simple_model.generate_content(prompt)
-    summary = ((resp.text or "").strip()) or f"Updated {file_path}"
+    summary, cached = summary_cache.get_or_create(key, generate, SIMPLE_MODEL)
+    summary = summary or f"Updated {file_path}"
   except Exception as e:
-    # Fall back to a deterministic message for demo resilience
+    # Fall back to a deterministic message for demo resilience (and when Gemini is saturated)
     summary = f"Updated {file_path} (AI unavailable)"
 
   # 3) Insert into team_activity_feed
@@ -105,85 +121,346 @@ def process_snapshot():
   return jsonify({
     "inserted": out,
     "summary": summary,
+    "model": SIMPLE_MODEL,
+    "cached": cached
+  }), 201
+
+
+@ai_bp.get("/jobs/<job_id>")
+def get_job(job_id):
+  """
+  Status of an AI job started with Prefer: respond-async; finished jobs
+  carry the body and status code of the synchronous call.
+  """
+  job = job_queue.get(job_id)
+  if job is None:
+    return jsonify({"error": "job not found"}), 404
+  response = jsonify(job)
+  if job.get("status") in ("queued", "running"):
+    response.headers["Retry-After"] = str(POLL_AFTER_SECONDS)
+  return response
+
+
+def _infer_team_id(user_id):
+  """The user's most recently joined team, else the team they created last."""
+  memberships = sb_select("team_membership", {
+    "select": "team_id,joined_at",
+    "user_id": f"eq.{user_id}",
+    "order": "joined_at.desc",
+    "limit": "1"
+  })
+  if memberships:
+    return memberships[0].get("team_id")
+  # fallback: a team the user created most recently
+  teams = sb_select("teams", {
+    "select": "id,created_at",
+    "created_by": f"eq.{user_id}",
+    "order": "created_at.desc",
+    "limit": "1"
+  })
+  return teams[0].get("id") if teams else None
+
+
+_PACKED_LINE = re.compile(r"^\s*\[\[(\d+)\]\]\s*(.+?)\s*$", re.M)
+
+def _summarize_pack(items, team_id=None):
+  """One model call for several (file_path, diff) pairs -> {index: summary}.
+
+  Diffs are numbered in the prompt and the model answers one
+  ``[[n]] summary`` line per diff; lines that are missing or do not
+  parse are simply absent from the result.
+  """
+  sections = "\n\n".join(
+    f"=== DIFF {n} ===\nFILE: {file_path}\n{diff}" for n, (file_path, diff) in enumerate(items, 1)
+  )
+  prompt = textwrap.dedent("""
+    You are summarizing several code diffs for an activity feed.
+    For each diff write one short sentence (<= 25 words), past tense, plain language,
+    no code blocks. Mention the file when helpful.
+    Answer with exactly one line per diff and nothing else, in this format:
+    [[1]] Added array sum and mean utilities in src/utils/math.js
+    [[2]] Fixed off-by-one error in pagination in src/api/list.py
+  """).strip() + "\n\n" + sections
+  resp = generate_content(simple_model, prompt, SIMPLE_MODEL, team_id=team_id)
+  summaries = {}
+  for number, text in _PACKED_LINE.findall(resp.text or ""):
+    index = int(number) - 1
+    if 0 <= index < len(items) and index not in summaries:
+      summaries[index] = text.strip().strip('"')
+  return summaries
+
+
+def _packs(items, max_files, max_chars):
+  """Split (key, file_path, diff) items into model calls of bounded size."""
+  pack, size = [], 0
+  for item in items:
+    if pack and (len(pack) >= max_files or size + len(item[2]) > max_chars):
+      yield pack
+      pack, size = [], 0
+    pack.append(item)
+    size += len(item[2])
+  if pack:
+    yield pack
+
+
+@ai_bp.post("/process_snapshots")
+def process_snapshots():
+  """
+  Summarize several file_snapshots at once (e.g. save-all or a commit):
+  one snapshot select, packed model calls and one feed insert.
+  """
+  body = request.get_json(force=True) or {}
+  snapshot_ids = body.get("snapshot_ids")
+  team_id = body.get("team_id")
+  activity_type = body.get("activity_type", "ai_summary")
+  max_chars = int(body.get("max_chars", 4000))
+
+  if not isinstance(snapshot_ids, list) or not snapshot_ids:
+    return jsonify({"error": "snapshot_ids must be a non-empty list"}), 400
+  snapshot_ids = list(dict.fromkeys(str(i) for i in snapshot_ids if i))
+  if len(snapshot_ids) > BATCH_MAX_SNAPSHOTS:
+    return jsonify({"error": f"At most {BATCH_MAX_SNAPSHOTS} snapshot_ids per request"}), 400
+
+  # 1) Load every snapshot in one round trip
+  rows = sb_select("file_snapshots", {
+    "select": "id,user_id,file_path,changes,updated_at",
+    "id": f"in.({','.join(_quote(i) for i in snapshot_ids)})",
+  })
+  by_id = {str(r.get("id")): r for r in rows}
+  missing = [i for i in snapshot_ids if i not in by_id]
+  snaps = [by_id[i] for i in snapshot_ids if i in by_id]
+  if not snaps:
+    return jsonify({"error": "snapshots not found", "missing": missing}), 404
+
+  # Team per author, looked up once per distinct user when not given
+  teams = {}
+  errors = []
+  items = []
+  for snap in snaps:
+    user_id = snap.get("user_id")
+    if team_id:
+      teams[user_id] = team_id
+    elif user_id not in teams:
+      teams[user_id] = _infer_team_id(user_id)
+    if not teams[user_id]:
+      errors.append({"snapshot_id": snap.get("id"), "error": "Unable to infer team_id for this user; pass team_id explicitly."})
+      continue
+    diff = (decode_text(snap.get("changes")) or "").strip()
+    diff = compact_diff(diff, max_chars)
+    file_path = snap.get("file_path") or "(unknown file)"
+    items.append((snap, file_path, diff, summary_key(SIMPLE_MODEL, SNAPSHOT_PROMPT_VERSION, file_path, diff)))
+
+  # 2) Cached summaries first; the rest go to the model a pack at a time
+  summaries, cached = {}, set()
+  for _, _, _, key in items:
+    if key not in summaries:
+      hit = summary_cache.get(key)
+      if hit is not None:
+        summaries[key] = hit
+        cached.add(key)
+  pending = list({key: (key, file_path, diff) for _, file_path, diff, key in items if key not in summaries}.values())
+  # Model calls are accounted to the team when the whole batch has one
+  batch_team = team_id or (next(iter(set(teams.values()))) if len(set(teams.values())) == 1 else None)
+  model_calls = 0
+  for pack in _packs(pending, BATCH_PACK_FILES, BATCH_PACK_CHARS):
+    model_calls += 1
+    try:
+      answers = _summarize_pack([(file_path, diff) for _, file_path, diff in pack], batch_team)
+    except Exception as e:
+      print(f"Batch summary failed for {len(pack)} diffs: {e}")
+      for key, file_path, _ in pack:
+        summaries[key] = f"Updated {file_path} (AI unavailable)"
+      continue
+    for n, (key, file_path, _) in enumerate(pack):
+      if answers.get(n):
+        summaries[key] = answers[n]
+        summary_cache.put(key, answers[n], SIMPLE_MODEL)
+      else:
+        summaries[key] = f"Updated {file_path}"
+
+  # 3) All feed rows in one insert
+  feed_rows = [{
+    "team_id": teams[snap.get("user_id")],
+    "user_id": snap.get("user_id"),
+    "summary": summaries[key],
+    "file_path": file_path,
+    "source_snapshot_id": snap.get("id"),
+    "activity_type": activity_type,
+  } for snap, file_path, _, key in items]
+  inserted, failed = sb_insert_many("team_activity_feed", feed_rows)
+  for failure in failed:
+    errors.append({"snapshot_id": failure["row"]["source_snapshot_id"], "error": failure["error"]})
+
+  return jsonify({
+    "inserted": inserted,
+    "summaries": [{
+      "snapshot_id": snap.get("id"),
+      "file_path": file_path,
+      "summary": summaries[key],
+      "cached": key in cached
+    } for snap, file_path, _, key in items],
+    "missing": missing,
+    "errors": errors,
+    "model_calls": model_calls,
     "model": SIMPLE_MODEL
   }), 201
 
 
+def _quote(value):
+  return '"' + str(value).replace('"', '\\"') + '"'
+
+def _feed_after(position):
+  """PostgREST or=(...) filter for rows after ``position`` in pinned/created_at/id order."""
+  created_at, row_id = _quote(position["c"]), _quote(position["i"])
+  later = f"or(created_at.lt.{created_at},and(created_at.eq.{created_at},id.lt.{row_id}))"
+  # pinned.desc.nullslast: true, then false, then null
+  if position.get("p") is True:
+    return f"(pinned.eq.false,pinned.is.null,and(pinned.eq.true,{later}))"
+  if position.get("p") is False:
+    return f"(pinned.is.null,and(pinned.eq.false,{later}))"
+  return f"(and(pinned.is.null,{later}))"
+
+
+def _feed_since(since):
+  """(param, value) filter for rows inserted or updated after a ``since`` watermark.
+
+  Accepts a watermark from ``X-Feed-Watermark`` or a plain ISO timestamp
+  (e.g. the newest ``created_at`` the client already has).
+  """
+  try:
+    position = decode_cursor(since)
+  except ValueError:
+    position = {}
+  if position.get("u") and position.get("i"):
+    updated_at, row_id = _quote(position["u"]), _quote(position["i"])
+    return "or", f"(updated_at.gt.{updated_at},and(updated_at.eq.{updated_at},id.gt.{row_id}))"
+  datetime.fromisoformat(since.replace("Z", "+00:00"))  # ValueError if it is neither
+  return "updated_at", f"gt.{since}"
+
+
 @ai_bp.get("/feed")
 def get_feed():
-  """Return recent team activity feed rows for a team with changes from file_snapshots."""
+  """Return recent team activity feed rows for a team with changes from file_snapshots.
+
+  Pages with keyset pagination: pass the returned cursor back as ``?cursor=`` to
+  continue. With ``cursor`` present (empty for the first page) the response is
+  ``{"items": [...], "next_cursor": ...}``; without it the rows are returned as a
+  bare array and the cursor is sent in the ``X-Next-Cursor`` header.
+
+  ``changes`` and ``snapshot`` are cut to FEED_PREVIEW_CHARS, with
+  ``changes_truncated``/``snapshot_truncated`` flags; fetch the full text from
+  ``/feed/<id>/snapshot`` or pass ``full=1``. ``fields=a,b`` returns only those
+  fields and skips the lookups the others need.
+
+  ``since=<watermark>`` returns only rows inserted or updated (e.g. unpinned)
+  after the watermark, oldest change first, with the next watermark in the
+  ``X-Feed-Watermark`` header; nothing new is a 204 with an empty body.
+  """
   team_id = request.args.get("team_id")
   limit = request.args.get("limit", "20")
+  cursor = request.args.get("cursor")
+  # An unescaped "+00:00" offset arrives as a space; watermarks never contain either
+  since = (request.args.get("since") or "").replace(" ", "+")
+  full = request.args.get("full") in ("1", "true")
   if not team_id:
     return jsonify({"error": "team_id is required"}), 400
+  if since and cursor is not None:
+    return jsonify({"error": "since cannot be combined with cursor"}), 400
+  try:
+    page_size = int(limit)
+  except ValueError:
+    return jsonify({"error": "limit must be an integer"}), 400
+
+  fields = FEED_FIELDS
+  projected = bool(request.args.get("fields"))
+  if projected:
+    fields = tuple(dict.fromkeys(f.strip() for f in request.args["fields"].split(",") if f.strip()))
+    unknown = [f for f in fields if f not in FEED_FIELDS]
+    if unknown:
+      return jsonify({"error": f"Unknown fields: {', '.join(unknown)}", "allowed": list(FEED_FIELDS)}), 400
+  wants_names = "display_name" in fields or "user_email" in fields
+  # id/pinned/created_at are always read: the cursor is built from them
+  base_columns = [c for c in FEED_COLUMNS if c in fields or c in ("id", "pinned", "created_at") or (c == "user_id" and wants_names)]
+  if since:
+    base_columns.append("updated_at")  # the next watermark is built from it
+  embedded = [f for f in FEED_SNAPSHOT_FIELDS if f in fields]
+  columns = base_columns + ([f"file_snapshots({','.join(embedded)})"] if embedded else [])
 
   # Select from team_activity_feed and join with file_snapshots to get changes and snapshot
-  # Sort by pinned status first (pinned items on top), then by created_at descending
-  rows = sb_select("team_activity_feed", {
-    "select": "id,team_id,user_id,summary,event_header,file_path,source_snapshot_id,activity_type,created_at,pinned,file_snapshots(changes,snapshot)",
+  # Sort by pinned status first (pinned items on top), then by created_at descending;
+  # id breaks ties so the cursor position is unique
+  params = {
+    "select": ",".join(columns),
     "team_id": f"eq.{team_id}",
-    "order": "pinned.desc.nullslast,created_at.desc",
+    "order": "pinned.desc.nullslast,created_at.desc,id.desc",
     "limit": str(limit)
-  })
-
-  # Flatten the nested file_snapshots data
+  }
+  if cursor:
+    try:
+      params["or"] = _feed_after(decode_cursor(cursor))
+    except (ValueError, KeyError):
+      return jsonify({"error": "invalid cursor"}), 400
+  if since:
+    try:
+      key, value = _feed_since(since)
+    except ValueError:
+      return jsonify({"error": "invalid since watermark"}), 400
+    params[key] = value
+    params["order"] = "updated_at.asc,id.asc"
+
+  # The page's version is its feed columns plus the query. Snapshots are immutable per
+  # source_snapshot_id; names and emails are not covered, hence a weak ETag.
+  def feed_etag(feed_rows):
+    return content_etag([sorted(request.args.items(multi=True)), [[r.get(c) for c in base_columns] for r in feed_rows]])
+
+  # Revalidation: a light probe (no snapshots, no name/email lookups) decides "unchanged"
+  if request.if_none_match and not since:
+    etag = feed_etag(sb_select("team_activity_feed", dict(params, select=",".join(base_columns))))
+    if client_has(etag):
+      response = make_response("", 304)
+      response.set_etag(etag, weak=True)
+      return response
+
+  rows = sb_select("team_activity_feed", params)
+  etag = feed_etag(rows)
+
+  # A full page may have more behind it; a short one is the end
+  next_cursor = None
+  if since:
+    last = rows[-1] if rows else None
+    watermark = encode_cursor({"u": last.get("updated_at"), "i": last.get("id")}) if last else since
+  elif rows and len(rows) >= page_size:
+    last = rows[-1]
+    next_cursor = encode_cursor({"p": last.get("pinned"), "c": last.get("created_at"), "i": last.get("id")})
+
+  # Flatten the nested file_snapshots data, trimming it to a preview unless full=1
   for row in rows:
-    if row.get("file_snapshots") and isinstance(row["file_snapshots"], dict):
-      row["changes"] = row["file_snapshots"].get("changes")
-      row["snapshot"] = row["file_snapshots"].get("snapshot")
-    else:
-      row["changes"] = None
-      row["snapshot"] = None
-    # Remove the nested object
-    row.pop("file_snapshots", None)
+    nested = row.pop("file_snapshots", None)
+    for field in embedded:
+      value = decode_text(nested.get(field)) if isinstance(nested, dict) else None
+      truncated = not full and isinstance(value, str) and len(value) > FEED_PREVIEW_CHARS
+      row[field] = value[:FEED_PREVIEW_CHARS] if truncated else value
+      row[f"{field}_truncated"] = truncated
 
   # Get unique user_ids from the activity feed
-  user_ids = list(set(row.get("user_id") for row in rows if row.get("user_id")))
-
-  # Fetch user profiles for display names (name field)
-  user_profiles = {}
-  if user_ids:
-    try:
-      profiles = sb_select("user_profiles", {
-        "select": "user_id,name",
-        "user_id": f"in.({','.join(user_ids)})"
-      })
-      user_profiles = {p["user_id"]: p.get("name") for p in profiles if p.get("name")}
-    except Exception as e:
-      print(f"Warning: Could not fetch user profiles: {e}")
+  user_ids = list(set(row.get("user_id") for row in rows if row.get("user_id"))) if wants_names else []
 
-  # Fetch user emails from auth.users using Supabase Admin API
-  user_emails = {}
-  if user_ids:
-    try:
-      from supabase import create_client, Client
-      supabase_url = os.getenv("SUPABASE_URL")
-      service_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")  # Fixed: use correct env var name
-      if supabase_url and service_key:
-        supabase: Client = create_client(supabase_url, service_key)
-        # Fetch users using admin API
-        for user_id in user_ids:
-          try:
-            user_response = supabase.auth.admin.get_user_by_id(user_id)
-            if user_response and user_response.user:
-              user_emails[user_id] = user_response.user.email
-          except Exception as e:
-            print(f"Warning: Could not fetch user {user_id}: {e}")
-    except Exception as e:
-      print(f"Warning: Could not initialize Supabase client for user emails: {e}")
+  # Names from user_profiles and emails from auth.users, via the shared TTL-cached directory
+  users = lookup_users(user_ids) if user_ids else {}
 
   # Add display_name to each row with fallback priority: name -> email -> user_id
   for row in rows:
     user_id = row.get("user_id")
     if user_id:
+      user = users.get(user_id) or {}
       # Try name from user_profiles first
-      if user_id in user_profiles and user_profiles[user_id]:
-        row["display_name"] = user_profiles[user_id]
-        row["user_email"] = user_emails.get(user_id)
+      if user.get("name"):
+        row["display_name"] = user["name"]
+        row["user_email"] = user.get("email")
       # Fallback to email
-      elif user_id in user_emails and user_emails[user_id]:
-        row["display_name"] = user_emails[user_id]
-        row["user_email"] = user_emails[user_id]
+      elif user.get("email"):
+        row["display_name"] = user["email"]
+        row["user_email"] = user["email"]
       # Final fallback to shortened user_id
       else:
         row["display_name"] = user_id[:8] + "…"
@@ -192,7 +469,74 @@ def get_feed():
       row["display_name"] = "Unknown"
       row["user_email"] = None
 
-  return jsonify(rows)
+  if projected:
+    keep = set(fields) | {f"{f}_truncated" for f in embedded} | ({"updated_at"} if since else set())
+    rows = [{k: v for k, v in row.items() if k in keep} for row in rows]
+
+  if since:
+    response = jsonify(rows) if rows else make_response("", 204)
+    response.headers["X-Feed-Watermark"] = watermark
+    return response
+  if cursor is not None:
+    return conditional(jsonify({"items": rows, "next_cursor": next_cursor}), etag, weak=True)
+  response = jsonify(rows)
+  if next_cursor:
+    response.headers["X-Next-Cursor"] = next_cursor
+  return conditional(response, etag, weak=True)
+
+
+@ai_bp.get("/feed/<activity_id>/snapshot")
+def get_feed_snapshot(activity_id):
+  """Return the full changes/snapshot text behind one feed row (the list only carries a preview)."""
+  params = {
+    "select": "id,team_id,source_snapshot_id,file_snapshots(changes,snapshot)",
+    "id": f"eq.{activity_id}",
+    "limit": "1"
+  }
+  if request.args.get("team_id"):
+    params["team_id"] = f"eq.{request.args['team_id']}"
+  rows = sb_select("team_activity_feed", params)
+  if not rows:
+    return jsonify({"error": "activity not found"}), 404
+
+  row = rows[0]
+  nested = row.get("file_snapshots") if isinstance(row.get("file_snapshots"), dict) else {}
+  return jsonify({
+    "id": row.get("id"),
+    "source_snapshot_id": row.get("source_snapshot_id"),
+    "changes": decode_text(nested.get("changes")),
+    "snapshot": decode_text(nested.get("snapshot")),
+  })
+
+
+@ai_bp.get("/feed/stream")
+def stream_feed():
+  """Server-sent events for a team's feed: one ``activity`` event per new row.
+
+  Reconnect with the ``Last-Event-ID`` header (or ``?last_event_id=``) to be
+  replayed the rows written in between. Comment lines are sent as heartbeats.
+  On sync workers the answer is 503 with Retry-After: load ``/feed`` instead.
+  """
+  team_id = request.args.get("team_id")
+  if not team_id:
+    return jsonify({"error": "team_id is required"}), 400
+  last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+  if last_event_id:
+    try:
+      parse_event_id(last_event_id)
+    except ValueError:
+      return jsonify({"error": "invalid Last-Event-ID"}), 400
+  if not streaming_available():
+    resp = jsonify({"error": "feed streaming needs cooperative workers; load /feed instead"})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = str(UNAVAILABLE_RETRY_SECONDS)
+    return resp
+
+  resp = Response(feed_broker.stream(team_id, last_event_id), mimetype="text/event-stream")
+  resp.headers["Cache-Control"] = "no-cache"
+  # Stop nginx-style proxies from buffering the stream
+  resp.headers["X-Accel-Buffering"] = "no"
+  return resp
 
 
 @ai_bp.post("/live_share_event")
@@ -236,7 +580,7 @@ def live_share_event():
         "file_path": f"eq.session:{session_id}"
       }, {
         "pinned": False
-      })
+      }, idempotent=True)
       print(f"[live_share_event] Unpinned Live Share Started event for session {session_id}")
     except Exception as e:
       print(f"[live_share_event] Warning: Could not unpin started event: {e}")
@@ -330,23 +674,10 @@ def participant_status_event():
   if len(joined_ids) == 0 and len(left_ids) == 0:
     return jsonify({"error": "Provide at least one joined or left user id"}), 400
 
-  # Helper to resolve display names for provided user IDs
-  def resolve_names(user_ids):
-    if not user_ids:
-      return []
-    try:
-      profiles = sb_select("user_profiles", {
-        "select": "user_id,name",
-        "user_id": f"in.({','.join(user_ids)})"
-      }) or []
-      name_map = {p.get("user_id"): (p.get("name") or p.get("user_id")[:8] + "…") for p in profiles}
-      return [name_map.get(uid, uid[:8] + "…") for uid in user_ids]
-    except Exception as e:
-      print(f"[participant_status_event] Failed to resolve names: {e}")
-      return [uid[:8] + "…" for uid in user_ids]
-
-  joined_names = resolve_names(joined_ids)
-  left_names = resolve_names(left_ids)
+  # One directory lookup for everyone mentioned; falls back to shortened ids
+  names = display_names(joined_ids + left_ids)
+  joined_names = [names.get(uid, uid[:8] + "…") for uid in joined_ids]
+  left_names = [names.get(uid, uid[:8] + "…") for uid in left_ids]
 
   parts = []
   if joined_names:
@@ -409,7 +740,7 @@ def live_share_update_link():
       "activity_type": "eq.live_share_started"
     }, {
       "summary": session_link
-    })
+    }, idempotent=True)
 
     print(f"[live_share_update_link] Updated Live Share Started event with session link for session {session_id}")
 
@@ -446,7 +777,7 @@ def cleanup_orphaned_pins():
       "pinned": "eq.true"
     }, {
       "pinned": False
-    })
+    }, idempotent=True)
 
     print(f"[cleanup_orphaned_pins] Unpinned all orphaned Live Share Started events for team {team_id}")
 
@@ -482,7 +813,7 @@ def live_share_summary():
     "team_id": team_id,
     "file_path": f"Live Share Session {session_id}",
     "snapshot": "(Live Share session baseline)",
-    "changes": changes,  # Store git diff - edge function will summarize this
+    "changes": encode_text(changes),  # Store git diff (compressed if SNAPSHOT_COMPRESSION) - edge function will summarize this
   }
   snapshot_result = sb_insert("file_snapshots", snapshot_row)
 
@@ -498,6 +829,7 @@ def live_share_summary():
 
 
 @ai_bp.post("/task_recommendations")
+@runs_as_job("task_recommendations")
 def task_recommendations():
     """
     AI-powered task recommendations: analyzes unassigned Jira tasks and suggests
@@ -619,15 +951,23 @@ def task_recommendations():
             Provide recommendations for all tasks listed above.
         """).strip()
 
-        # Call AI model
-        resp = advance_model.generate_content(prompt)
+        # Call AI model; fail fast when Gemini is saturated or too slow
+        try:
+            resp = generate_content(advance_model, prompt, ADVANCE_MODEL, team_id=team_id,
+                                    deadline=ADVANCE_DEADLINE_SECONDS)
+        except ModelUnavailable as e:
+            print(f"AI model unavailable for task_recommendations: {e}")
+            response = jsonify({"error": "AI is busy right now, please try again shortly"})
+            response.status_code = 503
+            response.headers["Retry-After"] = "10"
+            return response
         ai_response = (resp.text or "").strip()
 
         if not ai_response:
             return jsonify({"error": "AI model returned empty response"}), 500
 
-        # Parse AI response and post to timeline
-        recommendations_posted = 0
+        # Parse AI response into timeline rows
+        feed_rows = []
         lines = ai_response.split('\n')
 
         for line in lines:
@@ -653,22 +993,20 @@ def task_recommendations():
             summary = f"AI suggests {recommended_member} for task {task_key}: {task_summary}"
             event_header = f"Task Recommendation: {task_key}: {task_summary} → {recommended_member}"
 
-            # Post to team activity feed
-            feed_row = {
+            feed_rows.append({
                 "team_id": team_id,
                 "user_id": user_id,  # User who triggered the analysis
                 "event_header": event_header,
                 "summary": reason,  # The AI's reasoning
                 "file_path": task_key,  # Store task key for reference
                 "activity_type": "ai_task_recommendation"
-            }
+            })
 
-            try:
-                sb_insert("team_activity_feed", feed_row)
-                recommendations_posted += 1
-            except Exception as e:
-                print(f"Failed to insert recommendation for {task_key}: {e}")
-                continue
+        # Post all recommendations to the team activity feed in one round trip
+        _, failed = sb_insert_many("team_activity_feed", feed_rows)
+        for failure in failed:
+            print(f"Failed to insert recommendation for {failure['row'].get('file_path')}: {failure['error']}")
+        recommendations_posted = len(feed_rows) - len(failed)
 
         # Prepare response with information about task limits
         total_tasks = len(unassigned_tasks)
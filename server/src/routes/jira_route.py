@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from ..database.db import sb_select, sb_insert, sb_update, sb_delete
+from ..utils.http_cache import conditional
 
 jira_bp = Blueprint("jira", __name__, url_prefix="/api/jira")
 
@@ -71,7 +72,7 @@ def get_jira_config(team_id):
         })
 
         if configs and len(configs) > 0:
-            return jsonify(configs[0]), 200
+            return conditional(jsonify(configs[0]))
         else:
             return jsonify({"error": "Jira configuration not found"}), 404
 
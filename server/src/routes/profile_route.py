@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from ..database.db import sb_select, sb_insert, sb_update
+from ..services.user_directory import user_directory
+from ..utils.http_cache import conditional
 
 profile_bp = Blueprint("profile", __name__, url_prefix="/api/profile")
 
@@ -30,9 +32,9 @@ def get_profile():
                 "message": "No profile found"
             }), 200
         
-        return jsonify({
+        return conditional(jsonify({
             "profile": profiles[0]
-        }), 200
+        }))
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -79,12 +81,14 @@ def save_profile():
                 {"user_id": f"eq.{user_id}"}, 
                 profile_data
             )
+            user_directory.invalidate(user_id)
             return jsonify({
                 "profile": result[0] if result else profile_data,
                 "message": "Profile updated successfully"
             }), 200
         else:
             result = sb_insert("user_profiles", profile_data)
+            user_directory.invalidate(user_id)
             return jsonify({
                 "profile": result[0] if result else profile_data,
                 "message": "Profile created successfully"
@@ -1,6 +1,6 @@
 from flask import Blueprint, jsonify, request
 import os
-import requests
+from ..database.db import sb_auth_get
 
 user_bp = Blueprint("users", __name__, url_prefix="/users")
 
@@ -20,19 +20,8 @@ def get_user_by_id(user_id):
             return jsonify({"error": "Backend configuration error"}), 500
 
         # The user_id parameter is actually an access token
-        # Use it to get the user from Supabase Auth API
-        headers = {
-            "apikey": SERVICE_KEY,
-            "Authorization": f"Bearer {user_id}",  # Use the access token
-            "Content-Type": "application/json"
-        }
-
-        # Get user from Supabase Auth
-        response = requests.get(
-            f"{SUPABASE_URL}/auth/v1/user",
-            headers=headers,
-            timeout=10
-        )
+        # Use it to get the user from Supabase Auth API (pooled connection)
+        response = sb_auth_get("/user", token=user_id)
 
         if response.status_code != 200:
             print(f"Supabase auth error: {response.status_code} - {response.text}")
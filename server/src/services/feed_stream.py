@@ -0,0 +1,287 @@
+# backend/feed_stream.py
+"""Server-sent events for the team activity feed.
+
+Open editors subscribe to ``/api/ai/feed/stream`` instead of polling ``/feed``.
+New ``team_activity_feed`` rows reach subscribers two ways:
+
+* rows inserted by this worker are pushed the moment the insert returns, via
+  the db write-listener hook (process_snapshot, live_share_event,
+  participant_status_event, task_recommendations, ...);
+* rows written anywhere else (other workers, the edge function, clients
+  talking to Supabase directly) are picked up by one poller per worker that
+  asks for rows after each watched team's newest row every
+  FEED_STREAM_POLL_SECONDS. That is one query per team per worker, however
+  many editors are connected.
+
+Event ids are the row's (created_at, id) packed like a feed cursor, so a
+client that reconnects with ``Last-Event-ID`` is replayed what it missed.
+Only inserts are streamed; later edits to a row (e.g. the summary the edge
+function fills in) still need a ``/feed`` refresh.
+
+On sync workers each open stream would hold a whole worker, so the stream
+is only served under WORKER_MODE=gevent; elsewhere ``/feed/stream`` answers
+503 with Retry-After and clients load ``/feed`` on demand. FEED_STREAM_ON_SYNC=1
+serves it anyway (e.g. one editor against a local server). Streams end after
+FEED_STREAM_MAX_SECONDS and EventSource reconnects with Last-Event-ID, which
+also stops sync workers from being held past gunicorn's timeout.
+"""
+import os, queue, threading, time
+from collections import deque
+
+from ..database.db import sb_select, add_write_listener
+from ..utils.cursor import encode_cursor, decode_cursor
+from ..utils.fast_json import dumps_bytes
+from ..utils.metrics import Gauge
+
+FEED_TABLE = "team_activity_feed"
+HEARTBEAT_SECONDS = float(os.getenv("FEED_STREAM_HEARTBEAT_SECONDS") or 15)
+POLL_SECONDS = float(os.getenv("FEED_STREAM_POLL_SECONDS") or 5)
+# Rows replayed on resume / fetched per poll
+BACKLOG_LIMIT = int(os.getenv("FEED_STREAM_BACKLOG") or 100)
+# Events buffered per subscriber before a slow client is dropped (it resumes from Last-Event-ID)
+QUEUE_SIZE = int(os.getenv("FEED_STREAM_QUEUE_SIZE") or 256)
+RETRY_MS = int(os.getenv("FEED_STREAM_RETRY_MS") or 3000)
+ON_SYNC = (os.getenv("FEED_STREAM_ON_SYNC") or "0") == "1"
+# Sent as Retry-After when streaming is unavailable; how long clients should wait before trying again
+UNAVAILABLE_RETRY_SECONDS = int(os.getenv("FEED_STREAM_UNAVAILABLE_RETRY_SECONDS") or 30)
+# Watermark for a team with no rows yet: everything is new
+EPOCH = {"c": "1970-01-01T00:00:00+00:00", "i": "00000000-0000-0000-0000-000000000000"}
+
+
+def cooperative_workers() -> bool:
+    """True under gevent, where an idle stream costs a greenlet rather than a worker."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("socket")
+
+
+def streaming_available() -> bool:
+    """Whether this worker may hold streams open (see the module docstring)."""
+    return ON_SYNC or cooperative_workers()
+
+
+def max_stream_seconds() -> float:
+    configured = os.getenv("FEED_STREAM_MAX_SECONDS")
+    if configured:
+        return float(configured)
+    # Sync workers must hand the stream back well inside gunicorn's timeout
+    return 600.0 if cooperative_workers() else 55.0
+
+
+def event_id(row) -> str:
+    return encode_cursor({"c": row.get("created_at"), "i": row.get("id")})
+
+
+def parse_event_id(value) -> dict:
+    """Inverse of event_id; raises ValueError for anything it did not produce."""
+    position = decode_cursor(value)
+    if not position.get("c") or not position.get("i"):
+        raise ValueError("invalid event id")
+    return position
+
+
+def _quote(value):
+    return '"' + str(value).replace('"', '\\"') + '"'
+
+
+def select_after(team_id, position, limit=BACKLOG_LIMIT):
+    """Rows for ``team_id`` after ``position`` in (created_at, id) order, oldest first.
+
+    With no position, returns just the newest row (the starting watermark).
+    """
+    params = {"select": "*", "team_id": f"eq.{team_id}"}
+    if position is None:
+        params.update(order="created_at.desc,id.desc", limit="1")
+    else:
+        created_at, row_id = _quote(position["c"]), _quote(position["i"])
+        params.update({
+            "or": f"(created_at.gt.{created_at},and(created_at.eq.{created_at},id.gt.{row_id}))",
+            "order": "created_at.asc,id.asc",
+            "limit": str(limit),
+        })
+    return sb_select(FEED_TABLE, params, cache=False)
+
+
+def format_event(row) -> bytes:
+    return b"id: " + event_id(row).encode("ascii") + b"\nevent: activity\ndata: " + dumps_bytes(row) + b"\n\n"
+
+
+class Subscription:
+    def __init__(self, team_id, maxsize=QUEUE_SIZE):
+        self.team_id = team_id
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def put(self, row):
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Next row, or None if nothing arrived within ``timeout`` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class _Team:
+    def __init__(self):
+        self.subscribers = set()
+        self.position = None   # newest (created_at, id) the poller has seen
+        self.recent = deque(maxlen=QUEUE_SIZE)  # ids already delivered, newest last
+
+
+class FeedBroker:
+    def __init__(self, fetch=select_after, poll_interval=POLL_SECONDS, queue_size=QUEUE_SIZE):
+        self.fetch = fetch
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self._teams = {}
+        self._lock = threading.Lock()
+        self._poller = None
+        self._stats = {"published": 0, "polled": 0, "dropped": 0}
+
+    def subscribe(self, team_id) -> Subscription:
+        sub = Subscription(team_id, self.queue_size)
+        with self._lock:
+            team = self._teams.get(team_id)
+            first = team is None
+            if first:
+                team = self._teams[team_id] = _Team()
+            team.subscribers.add(sub)
+        if first:
+            try:
+                self._start_at(team_id, self.fetch(team_id, None))
+            except Exception as e:
+                print(f"[feed_stream] Could not read newest row for team {team_id}: {e}")
+        self._ensure_poller()
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            team = self._teams.get(sub.team_id)
+            if team is None:
+                return
+            team.subscribers.discard(sub)
+            if not team.subscribers:
+                del self._teams[sub.team_id]
+
+    def publish(self, rows, advance=False):
+        """Hand new rows to their team's subscribers, skipping rows already delivered."""
+        delivered = 0
+        with self._lock:
+            for row in rows:
+                team = self._teams.get(row.get("team_id"))
+                if team is None:
+                    continue
+                if advance and row.get("created_at") and row.get("id"):
+                    team.position = {"c": row["created_at"], "i": row["id"]}
+                if row.get("id") in team.recent:
+                    continue
+                team.recent.append(row.get("id"))
+                for sub in team.subscribers:
+                    if not sub.overflowed:
+                        sub.put(row)
+                        self._stats["dropped"] += sub.overflowed
+                delivered += 1
+            self._stats["published"] += delivered
+        return delivered
+
+    def on_write(self, table, operation, rows):
+        # Local inserts do not move the poll watermark: a row another worker
+        # wrote earlier may not be visible yet and would be skipped
+        if table == FEED_TABLE and operation == "insert":
+            self.publish([r for r in rows if isinstance(r, dict)])
+
+    def poll_once(self):
+        """Fetch rows other writers added since the last poll, for every watched team."""
+        with self._lock:
+            watched = [(team_id, team.position) for team_id, team in self._teams.items()]
+        for team_id, position in watched:
+            try:
+                rows = self.fetch(team_id, position)
+            except Exception as e:
+                print(f"[feed_stream] Poll failed for team {team_id}: {e}")
+                continue
+            if position is None:
+                # The subscribe-time read failed: the newest row is the starting point, not news
+                self._start_at(team_id, rows)
+                continue
+            with self._lock:
+                self._stats["polled"] += 1
+            self.publish(rows, advance=True)
+
+    def _start_at(self, team_id, newest):
+        with self._lock:
+            team = self._teams.get(team_id)
+            if team is not None and team.position is None:
+                team.position = {"c": newest[0].get("created_at"), "i": newest[0].get("id")} if newest else EPOCH
+
+    def _ensure_poller(self):
+        if not self.poll_interval:
+            return  # polling disabled: only this worker's own writes are streamed
+        with self._lock:
+            if self._poller is not None and self._poller.is_alive():
+                return
+            self._poller = threading.Thread(target=self._run, name="feed-stream-poller", daemon=True)
+            self._poller.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                if not self._teams:
+                    self._poller = None
+                    return
+            self.poll_once()
+
+    def reset(self):
+        """Drop subscribers and the poller thread (neither survives fork)."""
+        self._teams = {}
+        self._lock = threading.Lock()
+        self._poller = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscribers = sum(len(t.subscribers) for t in self._teams.values())
+            return dict(self._stats, teams=len(self._teams), subscribers=subscribers)
+
+    def stream(self, team_id, last_event_id=None, heartbeat=HEARTBEAT_SECONDS, max_seconds=None):
+        """Yield the text/event-stream body for one client."""
+        max_seconds = max_stream_seconds() if max_seconds is None else max_seconds
+        sub = self.subscribe(team_id)
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode("ascii")
+            sent = set()
+            if last_event_id:
+                position = parse_event_id(last_event_id)
+                # Replay is read after subscribing, so nothing falls in between; `sent` drops overlaps
+                for row in self.fetch(team_id, position):
+                    sent.add(row.get("id"))
+                    yield format_event(row)
+            deadline = time.monotonic() + max_seconds
+            while not sub.overflowed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                row = sub.get(min(heartbeat, remaining))
+                if row is None:
+                    yield b": keep-alive\n\n"
+                elif row.get("id") not in sent:
+                    yield format_event(row)
+        finally:
+            self.unsubscribe(sub)
+
+
+feed_broker = FeedBroker()
+add_write_listener(feed_broker.on_write)
+
+Gauge("feed_stream_subscribers", "Open activity feed event streams in this worker.").set_function(
+    lambda: feed_broker.stats()["subscribers"])
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=feed_broker.reset)
@@ -0,0 +1,278 @@
+# backend/jobs.py
+"""In-process job queue for slow AI endpoints.
+
+``process_snapshot`` and ``task_recommendations`` spend most of their time
+waiting on Gemini. A client that sends ``Prefer: respond-async`` (or every
+client, with AI_JOBS_ASYNC=always) gets ``202 Accepted`` with a job id
+straight away; the handler then runs on one of AI_JOB_WORKERS background
+threads (greenlets under gevent) and ``GET /api/ai/jobs/<id>`` reports the
+job's status and, once finished, the body and status code the synchronous
+call would have returned.
+
+At most AI_JOB_QUEUE_SIZE jobs wait at a time; past that, submissions get
+503 with Retry-After, so a Gemini slowdown backs up here instead of in the
+web workers. Finished jobs are kept for AI_JOB_RESULT_TTL_SECONDS.
+
+Jobs live in the worker that accepted them. With more than one gunicorn
+worker, set AI_JOBS_PERSIST=1 (and run db/005_ai_jobs.sql) so job records
+are mirrored to the ``ai_jobs`` table and any worker can answer a poll.
+Without it, a poll could land on a worker that never saw the job, so with
+several workers (WEB_CONCURRENCY, defaulting as in gunicorn.conf.py) the
+preference is ignored and calls are answered synchronously.
+"""
+import functools, os, queue, threading, time, uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import copy_current_request_context, current_app, jsonify, request, url_for
+
+from ..database.db import sb_select, sb_insert, sb_update
+from ..utils.metrics import Gauge, Histogram
+
+WORKERS = int(os.getenv("AI_JOB_WORKERS") or 4)
+QUEUE_SIZE = int(os.getenv("AI_JOB_QUEUE_SIZE") or 100)
+RESULT_TTL_SECONDS = float(os.getenv("AI_JOB_RESULT_TTL_SECONDS") or 3600)
+# "prefer": only for Prefer: respond-async, "always": every call, "off": never
+ASYNC_MODE = (os.getenv("AI_JOBS_ASYNC") or "prefer").lower()
+PERSIST = (os.getenv("AI_JOBS_PERSIST") or "0") == "1"
+STORE_TABLE = "ai_jobs"
+# gunicorn worker processes; same defaults as gunicorn.conf.py
+WEB_WORKERS = int(os.getenv("WEB_CONCURRENCY") or (2 if (os.getenv("WORKER_MODE") or "sync").lower() == "gevent" else 4))
+# Suggested client poll interval, sent as Retry-After on 202 and unfinished polls
+POLL_AFTER_SECONDS = 2
+
+WAIT_SECONDS = Histogram("ai_job_wait_seconds", "Time AI jobs spent queued before a worker picked them up.", ("kind",))
+RUN_SECONDS = Histogram("ai_job_run_seconds", "Time AI jobs spent running.", ("kind", "status"))
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Job:
+    def __init__(self, kind, fn):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.fn = fn
+        self.status = "queued"
+        self.status_code = None
+        self.result = None
+        self.error = None
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.enqueued = None
+        self.done_at = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "status_code": self.status_code,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class SupabaseJobStore:
+    """Shared tier: one ai_jobs row per job, so any worker can answer a poll."""
+
+    def create(self, job):
+        sb_insert(STORE_TABLE, job.to_dict())
+
+    def update(self, job):
+        fields = job.to_dict()
+        fields.pop("id")
+        sb_update(STORE_TABLE, {"id": f"eq.{job.id}"}, fields, idempotent=True)
+
+    def get(self, job_id):
+        rows = sb_select(STORE_TABLE, {"select": "*", "id": f"eq.{job_id}", "limit": "1"}, cache=False)
+        return rows[0] if rows else None
+
+
+class JobQueue:
+    def __init__(self, workers: int = WORKERS, queue_size: int = QUEUE_SIZE,
+                 result_ttl: float = RESULT_TTL_SECONDS, store=None, clock=time.monotonic):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.result_ttl = result_ttl
+        self.store = store
+        self._clock = clock
+        self._jobs = OrderedDict()
+        self._stats = {"submitted": 0, "rejected": 0, "succeeded": 0, "failed": 0}
+        self.reset()
+
+    def reset(self):
+        """Drop queued work and worker threads (neither survives fork)."""
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._threads = []
+        self._running = 0
+
+    def _ensure_workers(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"ai-job-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _store(self, method, job):
+        if self.store is None:
+            return
+        try:
+            getattr(self.store, method)(job)
+        except Exception as e:
+            print(f"[jobs] Could not {method} job {job.id} in the store: {e}")
+
+    def _prune(self):
+        cutoff = self._clock() - self.result_ttl
+        with self._lock:
+            expired = [j.id for j in self._jobs.values() if j.done_at is not None and j.done_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def submit(self, kind, fn) -> Job:
+        """Queue ``fn() -> (body, status_code)``; raises QueueFull when the backlog is full."""
+        self._prune()
+        if self._queue.full():
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise QueueFull(f"{self.queue_size} AI jobs already queued")
+        job = Job(kind, fn)
+        job.enqueued = self._clock()
+        with self._lock:
+            self._jobs[job.id] = job
+            self._stats["submitted"] += 1
+        # Stored before a worker can pick it up, so "running" never lands before the insert
+        self._store("create", job)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:  # filled up while we were storing
+            with self._lock:
+                self._stats["rejected"] += 1
+            job.fn, job.status, job.status_code = None, "failed", 503
+            job.error, job.finished_at, job.done_at = "AI job queue is full", _now(), self._clock()
+            self._store("update", job)
+            raise QueueFull(f"{self.queue_size} AI jobs already queued")
+        self._ensure_workers()
+        return job
+
+    def _work(self):
+        while True:
+            self.run_one(self._queue.get())
+
+    def run_one(self, job):
+        started = self._clock()
+        WAIT_SECONDS.observe(started - job.enqueued, kind=job.kind)
+        with self._lock:
+            self._running += 1
+        job.status, job.started_at = "running", _now()
+        self._store("update", job)
+        try:
+            job.result, job.status_code = job.fn()
+            job.status = "succeeded" if job.status_code < 400 else "failed"
+        except Exception as e:
+            print(f"[jobs] {job.kind} job {job.id} failed: {e}")
+            job.status, job.status_code, job.error = "failed", 500, str(e)
+        finally:
+            job.fn = None
+            job.finished_at = _now()
+            job.done_at = self._clock()
+            RUN_SECONDS.observe(job.done_at - started, kind=job.kind, status=job.status)
+            with self._lock:
+                self._running -= 1
+                self._stats[job.status] += 1
+        self._store("update", job)
+
+    def get(self, job_id):
+        """The job as a dict, from this worker or the shared store; None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.store is None:
+            return None
+        try:
+            return self.store.get(job_id)
+        except Exception as e:
+            print(f"[jobs] Store lookup for job {job_id} failed: {e}")
+            return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, queued=self._queue.qsize(), running=self._running, kept=len(self._jobs))
+
+
+job_queue = JobQueue(store=SupabaseJobStore() if PERSIST else None)
+
+
+_warned_unshared = False
+
+
+def jobs_shared() -> bool:
+    """Whether a poll for a job can be answered by whichever worker receives it."""
+    return job_queue.store is not None or WEB_WORKERS <= 1
+
+
+def wants_async() -> bool:
+    global _warned_unshared
+    if ASYNC_MODE == "always":
+        wanted = True
+    elif ASYNC_MODE == "off":
+        wanted = False
+    else:
+        prefer = request.headers.get("Prefer", "")
+        wanted = any(p.split(";")[0].strip().lower() == "respond-async" for p in prefer.split(","))
+    if wanted and not jobs_shared():
+        if not _warned_unshared:
+            _warned_unshared = True
+            print(f"[jobs] {WEB_WORKERS} workers and AI_JOBS_PERSIST is off; answering AI calls synchronously")
+        return False
+    return wanted
+
+
+def _as_result(rv):
+    response = current_app.make_response(rv)
+    return response.get_json(silent=True), response.status_code
+
+
+def runs_as_job(kind):
+    """Let a view run on the job queue when the client prefers an async answer."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not wants_async():
+                return view(*args, **kwargs)
+            request.get_json(force=True, silent=True)  # read the body while the request is still open
+            run = copy_current_request_context(lambda: _as_result(view(*args, **kwargs)))
+            try:
+                job = job_queue.submit(kind, run)
+            except QueueFull as e:
+                response = jsonify({"error": str(e)})
+                response.status_code = 503
+                response.headers["Retry-After"] = str(POLL_AFTER_SECONDS * 5)
+                return response
+            response = jsonify(job.to_dict())
+            response.status_code = 202
+            response.headers["Location"] = url_for("ai.get_job", job_id=job.id)
+            response.headers["Preference-Applied"] = "respond-async"
+            response.headers["Retry-After"] = str(POLL_AFTER_SECONDS)
+            return response
+        return wrapper
+    return decorator
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=job_queue.reset)
+
+Gauge("ai_job_queue", "AI jobs waiting, running and finished in this worker.", ("kind",)).set_function(
+    lambda: {(k,): v for k, v in job_queue.stats().items()})
@@ -0,0 +1,123 @@
+# backend/model_limiter.py
+"""Per-process limit and deadlines for Gemini calls.
+
+Every ``generate_content`` call goes through ``model_limiter.generate``:
+
+* at most GEMINI_MAX_IN_FLIGHT calls run at once in this worker;
+* up to GEMINI_MAX_WAITING more wait for a slot, each for at most
+  GEMINI_WAIT_TIMEOUT_SECONDS; anyone past that is turned away at once;
+* each call has its own deadline (queue wait included), passed to the
+  client as the request timeout.
+
+Turned-away and timed-out calls raise ``ModelUnavailable``, so callers
+fall back straight away (process_snapshot's "AI unavailable" summary)
+instead of pinning the web worker for the whole Gemini slowdown.
+"""
+import os, threading, time
+
+from ..utils.metrics import Counter, Gauge
+
+MAX_IN_FLIGHT = int(os.getenv("GEMINI_MAX_IN_FLIGHT") or 8)
+MAX_WAITING = int(os.getenv("GEMINI_MAX_WAITING") or 16)
+WAIT_TIMEOUT_SECONDS = float(os.getenv("GEMINI_WAIT_TIMEOUT_SECONDS") or 5)
+DEADLINE_SECONDS = float(os.getenv("GEMINI_DEADLINE_SECONDS") or 30)
+
+REJECTED = Counter("gemini_calls_rejected_total", "Gemini calls failed fast by the limiter.", ("reason",))
+
+
+class ModelUnavailable(Exception):
+    """The call was not made (or given up on) because of the limiter."""
+
+
+class ModelBusy(ModelUnavailable):
+    pass
+
+
+class ModelDeadlineExceeded(ModelUnavailable):
+    pass
+
+
+def _timed_out(error) -> bool:
+    # google.api_core DeadlineExceeded / requests and socket timeouts, without importing them
+    return isinstance(error, TimeoutError) or "Timeout" in type(error).__name__ or "DeadlineExceeded" in type(error).__name__
+
+
+class ModelLimiter:
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, max_waiting: int = MAX_WAITING,
+                 wait_timeout: float = WAIT_TIMEOUT_SECONDS, deadline: float = DEADLINE_SECONDS,
+                 clock=time.monotonic):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_waiting = max(0, max_waiting)
+        self.wait_timeout = wait_timeout
+        self.deadline = deadline
+        self._clock = clock
+        self._stats = {"calls": 0, "busy": 0, "wait_timeout": 0, "deadline": 0}
+        self.reset()
+
+    def reset(self):
+        """Forget slots held by threads of the parent process (they do not survive fork)."""
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._in_flight = 0
+        self._waiting = 0
+
+    def _reject(self, reason, error_type, message):
+        with self._lock:
+            self._stats[reason] += 1
+        REJECTED.inc(reason=reason)
+        raise error_type(message)
+
+    def _acquire(self, wait):
+        if self._slots.acquire(blocking=False):
+            return True
+        with self._lock:
+            if self._waiting >= self.max_waiting:
+                full = True
+            else:
+                full = False
+                self._waiting += 1
+        if full:
+            self._reject("busy", ModelBusy, f"{self.max_in_flight} Gemini calls running and {self.max_waiting} waiting")
+        try:
+            return self._slots.acquire(timeout=max(0.0, wait))
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def generate(self, model, prompt, deadline: float = None, **kwargs):
+        """``model.generate_content(prompt)`` within the limits; raises ModelUnavailable past them."""
+        deadline = self.deadline if deadline is None else deadline
+        started = self._clock()
+        if not self._acquire(min(self.wait_timeout, deadline)):
+            self._reject("wait_timeout", ModelBusy, f"No Gemini slot free within {min(self.wait_timeout, deadline):g}s")
+        try:
+            with self._lock:
+                self._in_flight += 1
+                self._stats["calls"] += 1
+            remaining = deadline - (self._clock() - started)
+            if remaining <= 0:
+                self._reject("deadline", ModelDeadlineExceeded, f"Gemini deadline of {deadline:g}s spent waiting")
+            options = dict(kwargs.pop("request_options", None) or {}, timeout=remaining)
+            try:
+                return model.generate_content(prompt, request_options=options, **kwargs)
+            except Exception as e:
+                if _timed_out(e):
+                    self._reject("deadline", ModelDeadlineExceeded, f"Gemini call exceeded {deadline:g}s: {e}")
+                raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, in_flight=self._in_flight, waiting=self._waiting)
+
+
+model_limiter = ModelLimiter()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=model_limiter.reset)
+
+Gauge("gemini_limiter", "Gemini calls in flight, waiting and rejected in this worker.", ("kind",)).set_function(
+    lambda: {(k,): v for k, v in model_limiter.stats().items()})
@@ -0,0 +1,126 @@
+# backend/model_usage.py
+"""Accounting for every Gemini call.
+
+``generate_content(model, prompt, model_name, team_id=...)`` runs the call
+through the limiter and records, per endpoint, model and team:
+
+* input tokens: Gemini's ``usage_metadata.prompt_token_count`` when the
+  response has it, else an estimate of one token per CHARS_PER_TOKEN
+  characters of prompt;
+* output tokens and characters;
+* latency, and whether the call succeeded (ok), was turned away by the
+  limiter (rejected), ran past its deadline (timeout) or failed (error).
+
+Totals go to ``/metrics`` (``gemini_*``). With MODEL_USAGE_HEADER=1 every
+response that made model calls also carries ``X-Model-Usage``, one entry
+per call, for tuning prompt templates:
+
+    X-Model-Usage: gemini-1.5-flash;in=812;out=19;chars=71;ms=930;ok
+"""
+import os, time
+
+from flask import g, has_request_context, request
+
+from .model_limiter import model_limiter, ModelBusy, ModelDeadlineExceeded
+from ..utils.metrics import Counter, Histogram, DEFAULT_SIZE_BUCKETS
+
+CHARS_PER_TOKEN = 4
+HEADER_ENABLED = (os.getenv("MODEL_USAGE_HEADER") or "0") == "1"
+# Team is a label on the totals; turn it off if there are too many teams to scrape
+TEAM_LABELS = (os.getenv("MODEL_USAGE_TEAM_LABELS") or "1") == "1"
+HEADER = "X-Model-Usage"
+
+CALLS = Counter("gemini_calls_total", "Gemini calls by outcome.", ("endpoint", "model", "team", "outcome"))
+INPUT_TOKENS = Counter("gemini_input_tokens_total", "Prompt tokens sent to Gemini (reported or estimated).",
+                       ("endpoint", "model", "team"))
+OUTPUT_TOKENS = Counter("gemini_output_tokens_total", "Tokens Gemini answered with (reported or estimated).",
+                        ("endpoint", "model", "team"))
+OUTPUT_CHARS = Counter("gemini_output_chars_total", "Characters of Gemini answers.", ("endpoint", "model", "team"))
+LATENCY = Histogram("gemini_call_duration_seconds", "Gemini call latency, limiter wait included.", ("endpoint", "model"))
+PROMPT_TOKENS = Histogram("gemini_prompt_tokens", "Prompt size per Gemini call, in tokens.", ("endpoint", "model"),
+                          buckets=tuple(b // CHARS_PER_TOKEN for b in DEFAULT_SIZE_BUCKETS))
+
+
+def estimate_tokens(text) -> int:
+    return -(-len(text or "") // CHARS_PER_TOKEN)
+
+
+def _reported(resp, field):
+    value = getattr(getattr(resp, "usage_metadata", None), field, None)
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def _text(resp) -> str:
+    try:
+        return resp.text or ""
+    except Exception:  # blocked or empty candidates raise on .text
+        return ""
+
+
+def _endpoint() -> str:
+    if has_request_context() and request.endpoint:
+        return request.endpoint.rsplit(".", 1)[-1]
+    return "background"
+
+
+def record(model_name, prompt, resp, seconds, outcome, team_id=None, endpoint=None):
+    endpoint = endpoint or _endpoint()
+    team = str(team_id or "unknown") if TEAM_LABELS else "all"
+    text = _text(resp) if resp is not None else ""
+    in_tokens = _reported(resp, "prompt_token_count") or estimate_tokens(prompt)
+    out_tokens = _reported(resp, "candidates_token_count") or estimate_tokens(text)
+
+    CALLS.inc(endpoint=endpoint, model=model_name, team=team, outcome=outcome)
+    LATENCY.observe(seconds, endpoint=endpoint, model=model_name)
+    if outcome != "rejected":  # rejected prompts never reached Gemini
+        INPUT_TOKENS.inc(in_tokens, endpoint=endpoint, model=model_name, team=team)
+        PROMPT_TOKENS.observe(in_tokens, endpoint=endpoint, model=model_name)
+    if resp is not None:
+        OUTPUT_TOKENS.inc(out_tokens, endpoint=endpoint, model=model_name, team=team)
+        OUTPUT_CHARS.inc(len(text), endpoint=endpoint, model=model_name, team=team)
+
+    usage = {"model": model_name, "in": in_tokens, "out": out_tokens if resp is not None else 0,
+             "chars": len(text), "ms": round(seconds * 1000), "outcome": outcome}
+    if has_request_context():
+        g.setdefault("model_usage", []).append(usage)
+    return usage
+
+
+def generate_content(model, prompt, model_name, team_id=None, **kwargs):
+    """``model_limiter.generate`` plus accounting; raises whatever the call raised."""
+    started = time.monotonic()
+    resp, outcome = None, "error"
+    try:
+        resp = model_limiter.generate(model, prompt, **kwargs)
+        outcome = "ok"
+        return resp
+    except ModelBusy:
+        outcome = "rejected"
+        raise
+    except ModelDeadlineExceeded:
+        outcome = "timeout"
+        raise
+    finally:
+        try:
+            record(model_name, prompt, resp, time.monotonic() - started, outcome, team_id)
+        except Exception as e:
+            print(f"[model_usage] Could not record model call: {e}")
+
+
+def format_header(calls) -> str:
+    return ", ".join(
+        f"{u['model']};in={u['in']};out={u['out']};chars={u['chars']};ms={u['ms']};{u['outcome']}" for u in calls
+    )
+
+
+def add_usage_header(response):
+    calls = g.get("model_usage")
+    if calls:
+        response.headers[HEADER] = format_header(calls)
+    return response
+
+
+def init_model_usage(app):
+    if HEADER_ENABLED:
+        app.after_request(add_usage_header)
+    return app
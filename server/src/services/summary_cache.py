@@ -0,0 +1,146 @@
+# backend/summary_cache.py
+"""Content-addressed cache for AI snapshot summaries.
+
+The key is a SHA-256 of (model, prompt template version, file_path, diff),
+with the diff normalized first (line endings, trailing whitespace and the
+``index <blob>..<blob>`` lines that change when a patch is re-applied), so
+re-runs, reverted-and-reapplied changes and the same patch in several teams
+share one Gemini call.
+
+Summaries live in a per-process LRU of SUMMARY_CACHE_SIZE entries. With
+SUMMARY_CACHE_PERSIST=1 they are also stored in the ``ai_summary_cache``
+table (db/004_ai_summary_cache.sql), which every worker and restart shares.
+Identical requests that arrive together wait for one model call. Only real
+model answers are cached, never the "AI unavailable" fallback.
+"""
+import hashlib, os, re, threading
+from collections import OrderedDict
+
+from ..database.db import sb_select, sb_insert
+from ..database.singleflight import SingleFlight
+from ..utils.metrics import Gauge
+
+CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE") or 2048)
+PERSIST = (os.getenv("SUMMARY_CACHE_PERSIST") or "0") == "1"
+STORE_TABLE = "ai_summary_cache"
+
+_INDEX_LINE = re.compile(r"^index [0-9a-f]+\.\.[0-9a-f]+( \d+)?$")
+
+
+def normalize_diff(diff: str) -> str:
+    lines = (diff or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines if not _INDEX_LINE.match(line)).strip()
+
+
+def summary_key(model, prompt_version, file_path, diff) -> str:
+    material = "\0".join([str(model), str(prompt_version), str(file_path), normalize_diff(diff)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class SupabaseSummaryStore:
+    """Persistent tier: one ai_summary_cache row per key."""
+
+    def get(self, key):
+        rows = sb_select(STORE_TABLE, {"select": "summary", "key": f"eq.{key}", "limit": "1"}, cache=False)
+        return rows[0].get("summary") if rows else None
+
+    def put(self, key, summary, model=None):
+        # A duplicate key just means another worker stored the same summary first
+        sb_insert(STORE_TABLE, {"key": key, "model": model, "summary": summary}, on_conflict="key")
+
+
+class SummaryCache:
+    def __init__(self, max_entries: int = CACHE_SIZE, store=None):
+        self.max_entries = max_entries
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._stats = {"hits": 0, "store_hits": 0, "misses": 0, "store_errors": 0}
+
+    def _remember(self, key, summary):
+        with self._lock:
+            self._entries[key] = summary
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            summary = self._entries.get(key)
+            if summary is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return summary
+        if self.store is None:
+            return None
+        try:
+            summary = self.store.get(key)
+        except Exception as e:
+            print(f"[summary_cache] Store lookup failed: {e}")
+            with self._lock:
+                self._stats["store_errors"] += 1
+            return None
+        if summary:
+            self._remember(key, summary)
+            with self._lock:
+                self._stats["store_hits"] += 1
+        return summary or None
+
+    def put(self, key, summary, model=None):
+        self._remember(key, summary)
+        if self.store is not None:
+            try:
+                self.store.put(key, summary, model)
+            except Exception as e:
+                print(f"[summary_cache] Store write failed: {e}")
+                with self._lock:
+                    self._stats["store_errors"] += 1
+
+    def get_or_create(self, key, generate, model=None):
+        """Return (summary, cached). ``generate()`` runs at most once per key at a time.
+
+        Empty answers are returned but not cached; exceptions propagate uncached.
+        """
+        summary = self.get(key)
+        if summary is not None:
+            return summary, True
+
+        def produce():
+            with self._lock:
+                again = self._entries.get(key)  # stored by a caller that finished just before us
+                if again is not None:
+                    return again, True
+                self._stats["misses"] += 1
+            created = generate()
+            if created:
+                self.put(key, created, model)
+            return created, False
+
+        return self._flight.do(key, produce)
+
+    def invalidate(self, key=None):
+        """Drop one in-memory entry, or all of them. The persistent tier is left alone."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def reset(self):
+        """Forget in-flight calls (they do not survive fork)."""
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+
+summary_cache = SummaryCache(store=SupabaseSummaryStore() if PERSIST else None)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=summary_cache.reset)
+
+Gauge("ai_summary_cache", "Snapshot summary cache counters.", ("kind",)).set_function(
+    lambda: {(k,): v for k, v in summary_cache.stats().items()})
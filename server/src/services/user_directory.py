@@ -0,0 +1,129 @@
+# backend/user_directory.py
+"""Process-wide user_id -> name/email directory.
+
+Names come from ``user_profiles`` in one ``in.(...)`` query per batch of
+missing ids; emails come from the Auth admin API through ``user_emails``.
+Both are kept for USER_DIRECTORY_TTL_SECONDS, so feed polls, participant
+events and account flows resolve names without reaching Supabase once warm.
+Users without a profile name are cached as None. ``save_profile`` calls
+``invalidate`` so a rename shows up at once in this worker; other workers
+pick it up when their entry expires.
+"""
+import os, threading, time
+from collections import OrderedDict
+
+from ..database.db import sb_select
+from .user_emails import email_resolver
+
+TTL_SECONDS = float(os.getenv("USER_DIRECTORY_TTL_SECONDS") or 300)
+MAX_ENTRIES = int(os.getenv("USER_DIRECTORY_MAX_ENTRIES") or 10000)
+# ids per user_profiles query, keeps the in.() list well inside URL limits
+BATCH_SIZE = int(os.getenv("USER_DIRECTORY_BATCH_SIZE") or 100)
+
+
+def short_id(user_id: str) -> str:
+    return user_id[:8] + "…"
+
+
+def fetch_names(user_ids) -> dict:
+    """{user_id: name or None} for every id, one query per BATCH_SIZE ids."""
+    names = dict.fromkeys(user_ids)
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        batch = user_ids[start:start + BATCH_SIZE]
+        profiles = sb_select("user_profiles", {
+            "select": "user_id,name",
+            "user_id": f"in.({','.join(batch)})"
+        }) or []
+        for p in profiles:
+            if p.get("user_id") in names:
+                names[p["user_id"]] = p.get("name") or None
+    return names
+
+
+class UserDirectory:
+    def __init__(self, fetch=fetch_names, emails=email_resolver, ttl: float = TTL_SECONDS,
+                 max_entries: int = MAX_ENTRIES, clock=time.monotonic):
+        self.fetch = fetch
+        self.emails = emails
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._names = OrderedDict()  # user_id -> (name, expires_at)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "errors": 0}
+
+    def names(self, user_ids) -> dict:
+        """Return {user_id: name or None}; ids whose lookup failed are left out."""
+        names, missing = {}, []
+        now = self._clock()
+        with self._lock:
+            for user_id in dict.fromkeys(u for u in user_ids if u):
+                entry = self._names.get(user_id)
+                if entry is not None and entry[1] > now:
+                    self._names.move_to_end(user_id)
+                    names[user_id] = entry[0]
+                    self._stats["hits"] += 1
+                else:
+                    missing.append(user_id)
+                    self._stats["misses"] += 1
+        if not missing:
+            return names
+
+        try:
+            fetched = self.fetch(missing)
+        except Exception as e:
+            print(f"Warning: Could not fetch user profiles: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+            return names
+
+        expires_at = self._clock() + self.ttl
+        with self._lock:
+            for user_id in missing:
+                name = fetched.get(user_id)
+                names[user_id] = name
+                if self.ttl > 0:
+                    self._names[user_id] = (name, expires_at)
+                    self._names.move_to_end(user_id)
+            while len(self._names) > self.max_entries:
+                self._names.popitem(last=False)
+        return names
+
+    def lookup(self, user_ids) -> dict:
+        """Return {user_id: {"name": ..., "email": ...}} for every id."""
+        user_ids = list(dict.fromkeys(u for u in user_ids if u))
+        names = self.names(user_ids)
+        try:
+            emails = self.emails.resolve(user_ids)
+        except Exception as e:
+            print(f"Warning: Could not resolve user emails: {e}")
+            emails = {}
+        return {uid: {"name": names.get(uid), "email": emails.get(uid)} for uid in user_ids}
+
+    def display_names(self, user_ids) -> dict:
+        """{user_id: profile name, or the shortened id when there is none}."""
+        names = self.names(user_ids)
+        return {uid: names.get(uid) or short_id(uid) for uid in user_ids if uid}
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._names.clear()
+            else:
+                self._names.pop(user_id, None)
+        self.emails.invalidate(user_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, entries=len(self._names))
+
+
+user_directory = UserDirectory()
+
+
+def lookup_users(user_ids) -> dict:
+    return user_directory.lookup(user_ids)
+
+
+def display_names(user_ids) -> dict:
+    return user_directory.display_names(user_ids)
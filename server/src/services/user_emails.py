@@ -0,0 +1,121 @@
+# backend/user_emails.py
+"""user_id -> email lookups for the activity feed.
+
+Emails come from the Supabase Auth admin API (``GET /admin/users/<id>``) over
+the pooled service-key session, so there is no per-request client to build.
+Distinct ids are fetched concurrently on a small bounded pool and answers are
+kept for USER_EMAIL_TTL_SECONDS, so repeated polls of the same team never
+reach the admin API. Unknown users (404) are cached as None; failed lookups
+are not cached and are retried on the next request.
+"""
+import os, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ..database.db import sb_auth_get
+from ..database.singleflight import SingleFlight
+
+TTL_SECONDS = float(os.getenv("USER_EMAIL_TTL_SECONDS") or 300)
+CONCURRENCY = int(os.getenv("USER_EMAIL_CONCURRENCY") or 8)
+MAX_ENTRIES = int(os.getenv("USER_EMAIL_MAX_ENTRIES") or 10000)
+
+
+def fetch_email(user_id: str):
+    """Ask the Auth admin API for one user's email; None if the user does not exist."""
+    resp = sb_auth_get(f"/admin/users/{user_id}")
+    if resp.status_code == 404:
+        return None
+    if resp.status_code != 200:
+        raise RuntimeError(f"Supabase auth {resp.status_code}: {resp.text}")
+    return resp.json().get("email")
+
+
+class EmailResolver:
+    def __init__(self, fetch=fetch_email, ttl: float = TTL_SECONDS, max_workers: int = CONCURRENCY,
+                 max_entries: int = MAX_ENTRIES, clock=time.monotonic):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_workers = max(1, max_workers)
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()  # user_id -> (email, expires_at)
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._executor = None
+        self._stats = {"hits": 0, "misses": 0, "errors": 0}
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="user-email")
+            return self._executor
+
+    def reset(self):
+        """Forget the executor and in-flight calls (neither survives fork)."""
+        self._executor = None
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def _lookup(self, user_id):
+        try:
+            email = self._flight.do(user_id, lambda: self.fetch(user_id))
+        except Exception as e:
+            print(f"Warning: Could not fetch user {user_id}: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+            return user_id, False, None
+        return user_id, True, email
+
+    def resolve(self, user_ids) -> dict:
+        """Return {user_id: email} for every id that could be resolved (email may be None)."""
+        emails, missing = {}, []
+        now = self._clock()
+        with self._lock:
+            for user_id in dict.fromkeys(u for u in user_ids if u):
+                entry = self._entries.get(user_id)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(user_id)
+                    emails[user_id] = entry[0]
+                    self._stats["hits"] += 1
+                else:
+                    missing.append(user_id)
+                    self._stats["misses"] += 1
+
+        if len(missing) == 1:
+            results = [self._lookup(missing[0])]
+        else:
+            results = list(self._pool().map(self._lookup, missing))
+
+        expires_at = self._clock() + self.ttl
+        with self._lock:
+            for user_id, ok, email in results:
+                if not ok:
+                    continue
+                emails[user_id] = email
+                if self.ttl > 0:
+                    self._entries[user_id] = (email, expires_at)
+                    self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return emails
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+
+email_resolver = EmailResolver()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=email_resolver.reset)
+
+
+def resolve_emails(user_ids) -> dict:
+    return email_resolver.resolve(user_ids)
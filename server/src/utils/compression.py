@@ -0,0 +1,163 @@
+# backend/compression.py
+"""Negotiated response compression (gzip, plus brotli/zstd when installed).
+
+``init_compression(app)`` adds an after_request hook that picks the best
+encoding from Accept-Encoding (zstd > br > gzip on equal quality) and
+compresses JSON/text bodies of at least COMPRESSION_MIN_BYTES. Bodies up to
+COMPRESSION_BUFFER_MAX_BYTES are compressed in one go and keep a
+Content-Length; larger or streamed bodies go through a streaming compressor,
+so the full compressed copy is never held next to the original. Event
+streams, 204/304 answers and already-encoded bodies pass through untouched.
+
+Compressed responses get ``Vary: Accept-Encoding`` and a weak ETag, so
+If-None-Match revalidation keeps working across encodings.
+
+brotli and zstandard are pinned in requirements.txt but still imported
+optionally; an install without them offers gzip only.
+Set RESPONSE_COMPRESSION=0 to turn the hook off.
+"""
+import os, zlib
+from flask import request
+
+from .metrics import Counter
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+ENABLED = (os.getenv("RESPONSE_COMPRESSION") or "1") != "0"
+MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES") or 1024)
+BUFFER_MAX_BYTES = int(os.getenv("COMPRESSION_BUFFER_MAX_BYTES") or 1024 * 1024)
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL") or 6)
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY") or 4)
+ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL") or 3)
+# Streamed bodies are compressed this many bytes at a time
+CHUNK_BYTES = 64 * 1024
+
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+BYTES_IN = Counter("http_compression_input_bytes_total", "Response bytes handed to the compressor.", ("encoding",))
+BYTES_OUT = Counter("http_compression_output_bytes_total", "Compressed response bytes sent.", ("encoding",))
+
+
+class _Brotli:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._c.process(data)
+
+    def flush(self):
+        return self._c.finish()
+
+
+def _gzip():
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def _zstd():
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+
+# encoding -> factory for an object with compress(bytes) / flush(), best first
+CODECS = {}
+if zstandard is not None:
+    CODECS["zstd"] = _zstd
+if brotli is not None:
+    CODECS["br"] = _Brotli
+CODECS["gzip"] = _gzip
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    c = CODECS[encoding]()
+    return c.compress(data) + c.flush()
+
+
+def choose_encoding(accept_encodings):
+    """Best codec the client accepts (highest q, then our preference), or None."""
+    if not CODECS:
+        return None
+    return accept_encodings.best_match(list(CODECS))
+
+
+def _compressible(response) -> bool:
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if response.direct_passthrough or "Content-Encoding" in response.headers:
+        return False
+    mimetype = response.mimetype or ""
+    if mimetype == "text/event-stream":
+        return False  # each event must reach the client as soon as it is written
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_TYPES or mimetype.endswith("+json")
+
+
+def _stream(chunks, encoding, close):
+    c = CODECS[encoding]()
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            BYTES_IN.inc(len(chunk), encoding=encoding)
+            for start in range(0, len(chunk), CHUNK_BYTES):
+                out = c.compress(chunk[start:start + CHUNK_BYTES])
+                if out:
+                    BYTES_OUT.inc(len(out), encoding=encoding)
+                    yield out
+        out = c.flush()
+        BYTES_OUT.inc(len(out), encoding=encoding)
+        yield out
+    finally:
+        if close is not None:
+            close()
+
+
+def _weaken_etag(response):
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def compress_response(response):
+    if not _compressible(response):
+        return response
+    response.vary.add("Accept-Encoding")
+    if request.method == "HEAD":
+        return response
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    if not response.is_streamed:
+        size = response.content_length if response.content_length is not None else len(response.get_data())
+        if size < MIN_BYTES:
+            return response
+        if size <= BUFFER_MAX_BYTES:
+            body = response.get_data()
+            data = compress(body, encoding)
+            BYTES_IN.inc(len(body), encoding=encoding)
+            BYTES_OUT.inc(len(data), encoding=encoding)
+            response.set_data(data)
+            response.headers["Content-Encoding"] = encoding
+            _weaken_etag(response)
+            return response
+
+    # Large or streamed body: compress chunk by chunk as the server sends it
+    response.response = _stream(response.response, encoding, getattr(response.response, "close", None))
+    response.headers.pop("Content-Length", None)
+    response.headers["Content-Encoding"] = encoding
+    _weaken_etag(response)
+    return response
+
+
+def init_compression(app):
+    if ENABLED:
+        app.after_request(compress_response)
+    return app
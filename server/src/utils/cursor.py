@@ -0,0 +1,24 @@
+# backend/cursor.py
+"""Opaque pagination cursors.
+
+A cursor is the sort key of the last row a client has seen, packed as
+URL-safe base64 JSON. Clients must treat it as an opaque string.
+"""
+import base64, binascii, json
+
+
+def encode_cursor(position: dict) -> str:
+    raw = json.dumps(position, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(position, dict):
+        raise ValueError("invalid cursor")
+    return position
@@ -0,0 +1,247 @@
+# backend/diff_compaction.py
+"""Shrink a unified diff to the hunks worth showing the model.
+
+``compact_diff(diff, max_chars)`` parses ``git diff`` output into files and
+hunks, then:
+
+* drops binary files, lockfiles and generated/minified/build output;
+* drops hunks whose changes are whitespace only;
+* ranks the remaining hunks by signal (changed lines with content, extra
+  weight for definitions, less for pure deletions and for every further
+  hunk of the same file) and packs the best ones into ``max_chars``; no
+  hunk gets more than a third of the room, and the last one is cut short
+  rather than leaving room unused;
+* renders the chosen hunks in their original order under a minimal
+  ``--- / +++`` header per file, with a one-line note of what was left out.
+
+Budgets too small for that (under about 360 characters) get the single
+best hunk cut at ``max_chars``, with no note.
+
+Text that is not a unified diff (no ``@@`` hunks) is cut at ``max_chars`` as
+before. The budget is in characters, like the ``max_chars`` the routes
+accept; at roughly four characters per token that is the prompt budget.
+"""
+import re
+
+LOCK_FILES = {
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml", "bun.lockb",
+    "poetry.lock", "Pipfile.lock", "uv.lock", "Cargo.lock", "composer.lock", "Gemfile.lock",
+    "go.sum", "packages.lock.json", "pubspec.lock", "mix.lock", "flake.lock",
+}
+GENERATED_PATH = re.compile(
+    r"(^|/)(node_modules|dist|build|out|coverage|vendor|__pycache__|\.next|\.venv)/"
+    r"|\.(min\.js|min\.css|map|pyc|snap|lock)$"
+    r"|(_pb2(_grpc)?\.py|\.pb\.go|\.g\.dart|\.designer\.cs)$"
+)
+GENERATED_MARKER = re.compile(r"@generated|DO NOT EDIT|auto-generated|autogenerated", re.I)
+DEFINITION = re.compile(
+    r"^\s*(export\s+)?(async\s+)?(def|class|function|interface|type|enum|struct|fn|func|public|private|protected|const|let|var)\b"
+)
+# Left for the "... omitted" note and the cut marker
+FOOTER_RESERVE = 160
+# A hunk is only cut to fit when at least this much room is left
+MIN_PARTIAL_CHARS = 200
+
+_HUNK_HEADER = re.compile(r"^@@ -\d+(,(\d+))? \+\d+(,(\d+))? @@")
+
+
+def _truncate(diff, max_chars):
+    return diff if len(diff) <= max_chars else diff[:max_chars] + "\n... (truncated)"
+
+
+class Hunk:
+    def __init__(self, file, header, order):
+        self.file = file
+        self.header = header
+        self.lines = []
+        self.order = order
+
+    @property
+    def added(self):
+        return [line[1:] for line in self.lines if line.startswith("+")]
+
+    @property
+    def removed(self):
+        return [line[1:] for line in self.lines if line.startswith("-")]
+
+    def whitespace_only(self) -> bool:
+        squash = lambda lines: "".join("".join(lines).split())
+        return squash(self.added) == squash(self.removed)
+
+    def score(self) -> float:
+        changed = [l for l in self.added + self.removed if l.strip()]
+        definitions = sum(1 for l in changed if DEFINITION.match(l))
+        score = len(changed) + 3 * definitions
+        if not self.added:
+            score *= 0.5  # pure deletions say less about what was done
+        return score
+
+    def text(self) -> str:
+        return "\n".join([self.header] + self.lines)
+
+
+class FileDiff:
+    def __init__(self, header_lines):
+        self.header_lines = header_lines
+        self.hunks = []
+        self.path = self._path()
+
+    def _path(self):
+        for line in self.header_lines:
+            if line.startswith("+++ ") and not line.startswith("+++ /dev/null"):
+                return _strip_prefix(line[4:])
+        for line in self.header_lines:
+            if line.startswith("--- ") and not line.startswith("--- /dev/null"):
+                return _strip_prefix(line[4:])
+        for line in self.header_lines:
+            if line.startswith("diff --git "):
+                return _strip_prefix(line.rsplit(" ", 1)[-1])
+        return "(unknown file)"
+
+    def skip_reason(self):
+        if any(l.startswith("Binary files ") or l == "GIT binary patch" for l in self.header_lines):
+            return "binary"
+        name = self.path.rsplit("/", 1)[-1]
+        if name in LOCK_FILES:
+            return "lockfile"
+        if GENERATED_PATH.search(self.path):
+            return "generated"
+        head = [l for h in self.hunks[:1] for l in h.lines[:10]]
+        if any(GENERATED_MARKER.search(l) for l in head):
+            return "generated"
+        return None
+
+    def header(self) -> str:
+        return f"--- a/{self.path}\n+++ b/{self.path}"
+
+
+def _strip_prefix(path):
+    path = path.strip().split("\t")[0].strip('"')
+    return path[2:] if path[:2] in ("a/", "b/") else path
+
+
+def parse_diff(diff):
+    """Unified diff text -> [FileDiff]; hunks keep their original order."""
+    files, current, hunk, order = [], None, None, 0
+    old_left = new_left = 0
+    for line in diff.split("\n"):
+        if hunk is not None and (old_left > 0 or new_left > 0):
+            # Inside a hunk the header's line counts decide, so "--- x" can be a removed line
+            if line == "":
+                line = " "  # blank context line whose leading space was stripped
+            kind = line[:1]
+            if kind in (" ", "-"):
+                old_left -= 1
+            if kind in (" ", "+"):
+                new_left -= 1
+            if kind in (" ", "+", "-", "\\"):
+                hunk.lines.append(line)
+                continue
+            old_left = new_left = 0  # malformed hunk: treat the line as a header
+        elif hunk is not None and line.startswith("\\"):
+            hunk.lines.append(line)  # "\ No newline at end of file"
+            continue
+        match = _HUNK_HEADER.match(line)
+        if line.startswith("diff --git ") or (line.startswith("--- ") and (current is None or current.hunks)):
+            current, hunk = FileDiff([line]), None
+            files.append(current)
+        elif match:
+            if current is None:
+                current = FileDiff([])
+                files.append(current)
+            hunk = Hunk(current, line, order)
+            order += 1
+            current.hunks.append(hunk)
+            old_left = int(match.group(2)) if match.group(2) else 1
+            new_left = int(match.group(4)) if match.group(4) else 1
+        elif current is not None:
+            hunk = None
+            current.header_lines.append(line)
+    for f in files:
+        f.path = f._path()
+    return files
+
+
+def _cut(text, limit):
+    marker = "\n... (hunk truncated)"
+    return text[:max(0, limit - len(marker))].rsplit("\n", 1)[0] + marker
+
+
+def _by_signal(hunks):
+    """Hunks best first; each further hunk from the same file counts for less,
+    so one heavily edited file does not crowd the others out."""
+    queues = {}
+    for h in sorted(hunks, key=lambda h: (-h.score(), h.order)):
+        queues.setdefault(h.file, []).append(h)
+    taken = {f: 0 for f in queues}
+    while queues:
+        best = max(queues, key=lambda f: (queues[f][0].score() / (1 + taken[f]), -queues[f][0].order))
+        yield queues[best].pop(0)
+        taken[best] += 1
+        if not queues[best]:
+            del queues[best]
+
+
+def compact_diff(diff: str, max_chars: int) -> str:
+    """The most informative part of ``diff`` in at most about ``max_chars`` characters."""
+    diff = (diff or "").replace("\r\n", "\n")
+    files = parse_diff(diff)
+    hunks = [h for f in files for h in f.hunks]
+    if not hunks:
+        return _truncate(diff, max_chars)
+
+    skipped = {}
+    candidates = []
+    for f in files:
+        reason = f.skip_reason()
+        if reason:
+            skipped.setdefault(reason, []).append(f.path)
+            continue
+        for h in f.hunks:
+            if h.whitespace_only():
+                skipped.setdefault("whitespace-only", []).append(f.path)
+            else:
+                candidates.append(h)
+
+    budget = max(0, max_chars - FOOTER_RESERVE)
+    if budget < MIN_PARTIAL_CHARS and candidates:
+        # Too small to pack hunks and a note: cut the best hunk to fit instead of sending no code
+        best = next(_by_signal(candidates))
+        return _truncate(best.file.header() + "\n" + best.text(), max_chars)
+    # No single hunk (e.g. a whole new file) may take more than a third of the room
+    hunk_max = max(2 * MIN_PARTIAL_CHARS, budget // 3)
+    chosen, headers, used, cut = {}, set(), 0, 0
+    for h in _by_signal(candidates):
+        text = h.text()
+        if len(text) > hunk_max:
+            text = _cut(text, hunk_max)
+        header_cost = 0 if h.file in headers else len(h.file.header()) + 1
+        if used + header_cost + len(text) + 1 > budget:
+            room = budget - used - header_cost - 1
+            if room < MIN_PARTIAL_CHARS:
+                cut += 1
+                continue
+            text = _cut(text, room)
+        chosen[h.order] = text
+        headers.add(h.file)
+        used += header_cost + len(text) + 1
+
+    out, last_file = [], None
+    for h in sorted(candidates, key=lambda h: h.order):
+        if h.order not in chosen:
+            continue
+        if h.file is not last_file:
+            out.append(h.file.header())
+            last_file = h.file
+        out.append(chosen[h.order])
+
+    notes = []
+    if cut:
+        notes.append(f"{cut} lower-signal hunk{'s' if cut != 1 else ''}")
+    for reason, paths in skipped.items():
+        names = sorted(set(paths))
+        shown = ", ".join(names[:3]) + (f" and {len(names) - 3} more" if len(names) > 3 else "")
+        notes.append(f"{reason} changes in {shown}")
+    if notes:
+        out.append(("... (omitted: " + "; ".join(notes))[:FOOTER_RESERVE - 1] + ")")
+    return "\n".join(out)
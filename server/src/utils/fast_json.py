@@ -0,0 +1,69 @@
+# backend/fast_json.py
+"""Fast JSON encode/decode backed by orjson, with a stdlib fallback.
+
+orjson is optional: without it every helper here behaves like the stdlib
+``json`` module, so the server still runs from a bare install. Set
+FAST_JSON=0 to force the stdlib path (useful when comparing outputs).
+"""
+import json, os
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+ENABLED = orjson is not None and (os.getenv("FAST_JSON") or "1") != "0"
+BACKEND = "orjson" if ENABLED else "json"
+
+
+def loads(data):
+    """Decode JSON from bytes or str; bytes go straight to the parser without a str copy."""
+    if ENABLED:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_bytes(obj, default=None, sort_keys=False, indent=False) -> bytes:
+    """Encode to UTF-8 JSON bytes."""
+    if ENABLED:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except TypeError:
+            pass  # e.g. ints wider than 64 bits; the stdlib copes
+    return json.dumps(
+        obj, default=default, sort_keys=sort_keys, ensure_ascii=False,
+        indent=2 if indent else None, separators=None if indent else (",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson when it is installed.
+
+    Keeps Flask's conventions (sorted keys, HTTP-date datetimes via ``default``,
+    indented output in debug mode) but emits UTF-8 instead of ASCII escapes.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if not ENABLED or set(kwargs) - {"indent", "separators"}:
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj, self.default, self.sort_keys, bool(kwargs.get("indent"))).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if not ENABLED or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if not ENABLED:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        # Hand Flask bytes directly so the body is never round-tripped through str
+        body = dumps_bytes(obj, self.default, self.sort_keys, indent) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
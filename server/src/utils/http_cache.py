@@ -0,0 +1,27 @@
+# backend/http_cache.py
+"""ETag helpers for conditional GETs (If-None-Match -> 304 Not Modified)."""
+import hashlib
+from flask import request
+
+from .fast_json import dumps_bytes
+
+
+def content_etag(obj) -> str:
+    """Stable hash of a JSON-serializable value."""
+    return hashlib.sha256(dumps_bytes(obj, default=str, sort_keys=True)).hexdigest()[:32]
+
+
+def client_has(etag: str) -> bool:
+    """True if the request's If-None-Match already names this ETag (weak comparison, per RFC 9110)."""
+    return bool(request.if_none_match) and request.if_none_match.contains_weak(etag)
+
+
+def conditional(response, etag: str = None, weak: bool = False):
+    """Tag a GET response (with ``etag`` or a hash of its body) and turn it into a 304 if the client has it."""
+    if response.status_code != 200:
+        return response
+    if etag is None:
+        response.add_etag()
+    else:
+        response.set_etag(etag, weak=weak)
+    return response.make_conditional(request)
@@ -0,0 +1,84 @@
+# backend/snapshot_codec.py
+"""Optional compressed encoding for file_snapshots.changes / .snapshot.
+
+Encoded values are still text, so the columns keep their type:
+
+    cz:v1:<codec>:<base64 of the compressed UTF-8 text>
+
+with ``<codec>`` ``zstd`` (when zstandard is installed) or ``zlib``. Writers
+call ``encode_text``; readers call ``decode_text``, which returns legacy
+plain-text values (and anything that fails to decode) unchanged.
+
+Off by default: anything reading file_snapshots straight from Supabase (the
+summary edge function, SQL consoles) sees the encoded form, so only turn on
+SNAPSHOT_COMPRESSION once those readers decode it too. Values shorter than
+SNAPSHOT_COMPRESSION_MIN_CHARS, or that would not shrink, are stored as-is.
+"""
+import base64, os, zlib
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+MARKER = "cz:v1:"
+# "" / "0": off, "1": best available, or an explicit codec name
+_MODE = (os.getenv("SNAPSHOT_COMPRESSION") or "0").lower()
+MIN_CHARS = int(os.getenv("SNAPSHOT_COMPRESSION_MIN_CHARS") or 1024)
+
+
+def _zstd_compress(data):
+    return zstandard.ZstdCompressor(level=9).compress(data)
+
+
+def _zstd_decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+# codec -> (compress, decompress)
+CODECS = {"zlib": (lambda data: zlib.compress(data, 9), zlib.decompress)}
+if zstandard is not None:
+    CODECS["zstd"] = (_zstd_compress, _zstd_decompress)
+
+
+def _write_codec():
+    if _MODE in ("", "0", "off", "false"):
+        return None
+    if _MODE in ("1", "on", "true"):
+        return "zstd" if "zstd" in CODECS else "zlib"
+    if _MODE not in CODECS:
+        print(f"[snapshot_codec] Unknown SNAPSHOT_COMPRESSION={_MODE!r}; storing plain text")
+        return None
+    return _MODE
+
+
+WRITE_CODEC = _write_codec()
+
+
+def is_encoded(value) -> bool:
+    return isinstance(value, str) and value.startswith(MARKER)
+
+
+def encode_text(text, codec=None):
+    """Compressed form of ``text`` when enabled and worthwhile, else ``text`` itself."""
+    codec = codec or WRITE_CODEC
+    if codec is None or not isinstance(text, str) or len(text) < MIN_CHARS or is_encoded(text):
+        return text
+    packed = base64.b64encode(CODECS[codec][0](text.encode("utf-8"))).decode("ascii")
+    encoded = f"{MARKER}{codec}:{packed}"
+    return encoded if len(encoded) < len(text) else text
+
+
+def decode_text(value):
+    """Plain text for a stored value, encoded or legacy."""
+    if not is_encoded(value):
+        return value
+    codec, _, packed = value[len(MARKER):].partition(":")
+    if codec not in CODECS:
+        return value
+    try:
+        return CODECS[codec][1](base64.b64decode(packed, validate=True)).decode("utf-8")
+    except Exception as e:  # binascii/zlib/zstd errors, bad UTF-8
+        print(f"[snapshot_codec] Could not decode {codec} value, returning it as stored: {e}")
+        return value
+
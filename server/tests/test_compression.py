@@ -0,0 +1,156 @@
+import unittest
+from unittest.mock import patch
+import gzip
+import os
+
+os.environ['SUPABASE_URL'] = 'https://test.supabase.co'
+os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test-service-key'
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from flask import Flask, Response, jsonify
+from werkzeug.datastructures import Accept
+
+from src.utils import compression
+from src.utils.compression import init_compression, choose_encoding, compress_response
+from src.utils.http_cache import conditional
+
+
+def make_app():
+    app = Flask(__name__)
+    init_compression(app)
+    big = [{"id": i, "changes": "+ added line of code\n" * 20} for i in range(20)]
+
+    @app.get("/big")
+    def big_json():
+        return conditional(jsonify(big))
+
+    @app.get("/small")
+    def small_json():
+        return jsonify({"ok": True})
+
+    @app.get("/stream")
+    def stream():
+        return Response((b"line %d\n" % i * 50 for i in range(100)), mimetype="text/plain")
+
+    @app.get("/events")
+    def events():
+        return Response(iter([b"data: x\n\n" * 500]), mimetype="text/event-stream")
+
+    return app, big
+
+
+class CompressionTestCase(unittest.TestCase):
+    """Test cases for negotiated response compression"""
+
+    def setUp(self):
+        self.app, self.rows = make_app()
+        self.client = self.app.test_client()
+
+    def test_main_app_compresses(self):
+        """Test the Flask app registers the hook"""
+        from src.app import app
+        self.assertIn(compress_response, app.after_request_funcs[None])
+
+    def test_large_json_gzipped(self):
+        """Test a large body is gzipped with a length, Vary and a weak ETag"""
+        response = self.client.get('/big', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+        self.assertTrue(response.headers['ETag'].startswith('W/'))
+        self.assertEqual(self.app.json.loads(gzip.decompress(response.data)), self.rows)
+
+    def test_revalidation_after_compression(self):
+        """Test the weakened ETag still yields 304"""
+        etag = self.client.get('/big', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+
+        response = self.client.get('/big', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_small_body_untouched(self):
+        """Test bodies under the threshold are sent as-is"""
+        response = self.client.get('/small', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.json, {"ok": True})
+
+    def test_no_accept_encoding(self):
+        """Test clients that do not ask for compression get plain bodies"""
+        for header in ({}, {'Accept-Encoding': 'identity'}, {'Accept-Encoding': 'gzip;q=0'}):
+            response = self.client.get('/big', headers=header)
+            self.assertNotIn('Content-Encoding', response.headers)
+            self.assertEqual(response.json, self.rows)
+
+    def test_streamed_body_compressed_incrementally(self):
+        """Test streamed responses are compressed chunk by chunk without a length"""
+        response = self.client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        self.assertEqual(gzip.decompress(response.data), b"".join(b"line %d\n" % i * 50 for i in range(100)))
+
+    @patch('src.utils.compression.BUFFER_MAX_BYTES', 1024)
+    def test_large_buffered_body_streams(self):
+        """Test bodies over the buffer limit take the streaming path"""
+        response = self.client.get('/big', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertNotIn('Content-Length', response.headers)
+        self.assertEqual(self.app.json.loads(gzip.decompress(response.data)), self.rows)
+
+    def test_event_stream_untouched(self):
+        """Test server-sent events are never compressed"""
+        response = self.client.get('/events', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    @unittest.skipIf(brotli is None, "brotli not installed")
+    def test_brotli_round_trip(self):
+        """Test br bodies, buffered and streamed, decode to the original"""
+        response = self.client.get('/big', headers={'Accept-Encoding': 'br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(self.app.json.loads(brotli.decompress(response.data)), self.rows)
+
+        response = self.client.get('/stream', headers={'Accept-Encoding': 'br'})
+        self.assertEqual(brotli.decompress(response.data), b"".join(b"line %d\n" % i * 50 for i in range(100)))
+
+    @unittest.skipIf(zstandard is None, "zstandard not installed")
+    def test_zstd_round_trip(self):
+        """Test zstd bodies, buffered and streamed, decode to the original"""
+        decode = lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data)
+        response = self.client.get('/big', headers={'Accept-Encoding': 'zstd'})
+        self.assertEqual(response.headers['Content-Encoding'], 'zstd')
+        self.assertEqual(self.app.json.loads(decode(response.data)), self.rows)
+
+        response = self.client.get('/stream', headers={'Accept-Encoding': 'zstd'})
+        self.assertEqual(decode(response.data), b"".join(b"line %d\n" % i * 50 for i in range(100)))
+
+    def test_choose_encoding_prefers_best(self):
+        """Test client quality wins, then zstd > br > gzip"""
+        codecs = {"zstd": object, "br": object, "gzip": object}
+        with patch.dict(compression.CODECS, codecs, clear=True):
+            self.assertEqual(choose_encoding(Accept([("gzip", 1), ("br", 1)])), "br")
+            self.assertEqual(choose_encoding(Accept([("gzip", 1), ("br", 0.5)])), "gzip")
+            self.assertEqual(choose_encoding(Accept([("zstd", 1), ("gzip", 1)])), "zstd")
+            self.assertIsNone(choose_encoding(Accept([("deflate", 1)])))
+
+    def test_metrics_count_bytes(self):
+        """Test input/output byte counters move"""
+        before = compression.BYTES_IN.value(encoding="gzip") or 0
+        response = self.client.get('/big', headers={'Accept-Encoding': 'gzip'})
+
+        self.assertGreater(compression.BYTES_IN.value(encoding="gzip") - before, len(response.data))
+
+
+if __name__ == '__main__':
+    unittest.main()
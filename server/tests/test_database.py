@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import os
 import requests
 
@@ -7,6 +7,7 @@ import requests
 os.environ['SUPABASE_URL'] = 'https://test.supabase.co'
 os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test-service-key'
 
+from src.database import db
 from src.database.db import sb_select, sb_insert, sb_update, sb_delete, _check_config, _handle
 
 
@@ -18,12 +19,14 @@ class DatabaseTestCase(unittest.TestCase):
         os.environ['SUPABASE_URL'] = 'https://test.supabase.co'
         os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test-service-key'
 
-    @patch('src.database.db.requests.get')
-    def test_sb_select_success(self, mock_get):
+    @patch('src.database.db._http')
+    def test_sb_select_success(self, mock_http):
         """Test sb_select with successful response"""
+        mock_get = mock_http.return_value.get
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.text = '[{"id": "1", "name": "test"}]'
+        mock_response.content = b'[{"id": "1", "name": "test"}]'
         mock_response.json.return_value = [{"id": "1", "name": "test"}]
         mock_get.return_value = mock_response
 
@@ -33,12 +36,14 @@ class DatabaseTestCase(unittest.TestCase):
         self.assertEqual(result[0]["name"], "test")
         mock_get.assert_called_once()
 
-    @patch('src.database.db.requests.get')
-    def test_sb_select_empty_result(self, mock_get):
+    @patch('src.database.db._http')
+    def test_sb_select_empty_result(self, mock_http):
         """Test sb_select with empty result"""
+        mock_get = mock_http.return_value.get
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.text = '[]'
+        mock_response.content = b'[]'
         mock_response.json.return_value = []
         mock_get.return_value = mock_response
 
@@ -46,12 +51,14 @@ class DatabaseTestCase(unittest.TestCase):
         
         self.assertEqual(result, [])
 
-    @patch('src.database.db.requests.post')
-    def test_sb_insert_success(self, mock_post):
+    @patch('src.database.db._http')
+    def test_sb_insert_success(self, mock_http):
         """Test sb_insert with successful insertion"""
+        mock_post = mock_http.return_value.post
         mock_response = MagicMock()
         mock_response.status_code = 201
         mock_response.text = '[{"id": "new-id", "title": "Test Note"}]'
+        mock_response.content = b'[{"id": "new-id", "title": "Test Note"}]'
         mock_response.json.return_value = [{"id": "new-id", "title": "Test Note"}]
         mock_post.return_value = mock_response
 
@@ -61,12 +68,28 @@ class DatabaseTestCase(unittest.TestCase):
         self.assertEqual(result[0]["title"], "Test Note")
         mock_post.assert_called_once()
 
-    @patch('src.database.db.requests.patch')
-    def test_sb_update_success(self, mock_patch):
+    @patch('src.database.db._http')
+    def test_sb_insert_on_conflict_ignores_duplicates(self, mock_http):
+        """Test on_conflict turns the insert into an upsert that skips existing keys"""
+        mock_post = mock_http.return_value.post
+        mock_post.return_value = MagicMock(status_code=201, content=b'[]')
+
+        result = sb_insert("ai_summary_cache", {"key": "k1", "summary": "s"}, on_conflict="key")
+
+        self.assertEqual(result, [])
+        kwargs = mock_post.call_args.kwargs
+        self.assertEqual(kwargs["params"], {"on_conflict": "key"})
+        self.assertEqual(kwargs["headers"]["Prefer"], "resolution=ignore-duplicates,return=representation")
+        self.assertEqual(kwargs["headers"]["apikey"], db.HEADERS["apikey"])
+
+    @patch('src.database.db._http')
+    def test_sb_update_success(self, mock_http):
         """Test sb_update with successful update"""
+        mock_patch = mock_http.return_value.patch
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.text = '[{"id": "1", "name": "Updated Name"}]'
+        mock_response.content = b'[{"id": "1", "name": "Updated Name"}]'
         mock_response.json.return_value = [{"id": "1", "name": "Updated Name"}]
         mock_patch.return_value = mock_response
 
@@ -76,12 +99,14 @@ class DatabaseTestCase(unittest.TestCase):
         self.assertEqual(result[0]["name"], "Updated Name")
         mock_patch.assert_called_once()
 
-    @patch('src.database.db.requests.delete')
-    def test_sb_delete_success(self, mock_delete):
+    @patch('src.database.db._http')
+    def test_sb_delete_success(self, mock_http):
         """Test sb_delete with successful deletion"""
+        mock_delete = mock_http.return_value.delete
         mock_response = MagicMock()
         mock_response.status_code = 204
         mock_response.text = ''
+        mock_response.content = b''
         mock_delete.return_value = mock_response
 
         result = sb_delete("notes", {"id": "eq.1"})
@@ -89,9 +114,10 @@ class DatabaseTestCase(unittest.TestCase):
         self.assertEqual(result, [])
         mock_delete.assert_called_once()
 
-    @patch('src.database.db.requests.get')
-    def test_sb_select_http_error(self, mock_get):
+    @patch('src.database.db._http')
+    def test_sb_select_http_error(self, mock_http):
         """Test sb_select with HTTP error"""
+        mock_get = mock_http.return_value.get
         mock_response = MagicMock()
         mock_response.status_code = 400
         mock_response.text = 'Bad Request'
@@ -103,26 +129,264 @@ class DatabaseTestCase(unittest.TestCase):
         
         self.assertIn("Supabase REST", str(context.exception))
 
-    @patch('src.database.db.requests.get')
-    def test_sb_select_timeout(self, mock_get):
+    @patch('src.database.db._http')
+    def test_sb_select_timeout(self, mock_http):
         """Test sb_select handles timeout properly"""
+        mock_get = mock_http.return_value.get
         mock_get.side_effect = requests.Timeout("Connection timeout")
         
         with self.assertRaises(requests.Timeout):
             sb_select("test_table", {})
 
-    @patch('src.database.db.requests.post')
-    def test_sb_insert_with_empty_response(self, mock_post):
+    @patch('src.database.db._http')
+    def test_sb_insert_with_empty_response(self, mock_http):
         """Test sb_insert with empty response text"""
+        mock_post = mock_http.return_value.post
         mock_response = MagicMock()
         mock_response.status_code = 201
         mock_response.text = ''
+        mock_response.content = b''
         mock_post.return_value = mock_response
 
         result = sb_insert("test_table", {"data": "test"})
         
         self.assertEqual(result, [])
 
+    def test_http_session_is_reused_within_process(self):
+        """Test _http returns the same pooled session on repeated calls"""
+        self.assertIs(db._http(), db._http())
+
+    def test_http_session_recreated_after_fork(self):
+        """Test _http builds a fresh session when the worker pid changes"""
+        first = db._http()
+        db._reset_session()
+        second = db._http()
+        self.assertIsNot(first, second)
+
+    def test_reset_session_drops_hedge_executor(self):
+        """Test the hedging thread pool is rebuilt after fork rather than inherited"""
+        pool = db._hedger._pool()
+        db._reset_session()
+        self.assertIsNot(db._hedger._pool(), pool)
+
+    def test_http_session_uses_configured_pool_size(self):
+        """Test the mounted adapter is sized from SUPABASE_POOL_SIZE"""
+        adapter = db._http().get_adapter("https://test.supabase.co/rest/v1/notes")
+        self.assertEqual(adapter._pool_maxsize, db.POOL_SIZE)
+
+    def test_pool_stats_counts_reused_connections(self):
+        """Test pool_stats reports hits as requests served on already-open sockets"""
+        pool = MagicMock(num_requests=5, num_connections=2)
+        adapter = db._http().get_adapter("https://test.supabase.co")
+        with patch.object(adapter.poolmanager, "pools", {"k": pool}):
+            stats = db.pool_stats()
+
+        self.assertEqual(stats["requests"], 5)
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["hits"], 3)
+        self.assertAlmostEqual(stats["hit_ratio"], 0.6)
+
+    @patch('src.database.db._http')
+    def test_sb_auth_get_uses_user_token(self, mock_http):
+        """Test sb_auth_get calls /auth/v1 through the pool with the caller's token"""
+        db.sb_auth_get("/user", token="user-token")
+
+        args, kwargs = mock_http.return_value.get.call_args
+        self.assertTrue(args[0].endswith("/auth/v1/user"))
+        self.assertEqual(kwargs["headers"]["Authorization"], "Bearer user-token")
+
+    @patch('src.database.db._http')
+    def test_sb_auth_delete_uses_service_key(self, mock_http):
+        """Test sb_auth_delete authenticates with the service role key"""
+        db.sb_auth_delete("/admin/users/user-id")
+
+        args, kwargs = mock_http.return_value.delete.call_args
+        self.assertTrue(args[0].endswith("/auth/v1/admin/users/user-id"))
+        self.assertEqual(kwargs["headers"]["Authorization"], f"Bearer {db.SERVICE_KEY}")
+
+
+    @patch('src.database.db._http')
+    def test_sb_insert_many_single_request(self, mock_http):
+        """Test sb_insert_many posts all rows as one JSON array"""
+        mock_response = MagicMock()
+        mock_response.status_code = 201
+        mock_response.text = '[{"id": "1"}, {"id": "2"}]'
+        mock_response.content = b'[{"id": "1"}, {"id": "2"}]'
+        mock_response.json.return_value = [{"id": "1"}, {"id": "2"}]
+        mock_http.return_value.post.return_value = mock_response
+
+        inserted, errors = db.sb_insert_many("notes", [{"title": "a"}, {"title": "b"}])
+
+        self.assertEqual(len(inserted), 2)
+        self.assertEqual(errors, [])
+        mock_http.return_value.post.assert_called_once()
+        self.assertEqual(mock_http.return_value.post.call_args.kwargs["json"], [{"title": "a"}, {"title": "b"}])
+
+    @patch('src.database.db._http')
+    def test_sb_insert_many_chunks(self, mock_http):
+        """Test sb_insert_many splits large batches by chunk_size"""
+        mock_response = MagicMock()
+        mock_response.status_code = 201
+        mock_response.text = '[]'
+        mock_response.content = b'[]'
+        mock_response.json.return_value = []
+        mock_http.return_value.post.return_value = mock_response
+
+        db.sb_insert_many("notes", [{"title": str(i)} for i in range(5)], chunk_size=2)
+
+        sizes = [len(c.kwargs["json"]) for c in mock_http.return_value.post.call_args_list]
+        self.assertEqual(sizes, [2, 2, 1])
+
+    @patch('src.database.db._http')
+    def test_sb_insert_many_reports_failing_rows(self, mock_http):
+        """Test a failed chunk is retried row by row to report the bad rows"""
+        def post(url, headers, json, timeout):
+            response = MagicMock()
+            bad = isinstance(json, list) or json.get("title") == "bad"
+            response.status_code = 400 if bad else 201
+            response.text = 'violates constraint' if bad else '[{"id": "ok"}]'
+            response.content = response.text.encode()
+            response.json.return_value = [{"id": "ok"}]
+            if bad:
+                response.raise_for_status.side_effect = requests.HTTPError()
+            return response
+        mock_http.return_value.post.side_effect = post
+
+        inserted, errors = db.sb_insert_many("notes", [{"title": "good"}, {"title": "bad"}])
+
+        self.assertEqual(inserted, [{"id": "ok"}])
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0]["index"], 1)
+        self.assertIn("violates constraint", errors[0]["error"])
+
+    @patch('src.database.db._http')
+    def test_sb_insert_many_ambiguous_failure_not_retried(self, mock_http):
+        """Test a timeout or 5xx fails the whole chunk without per-row retries"""
+        server_error = MagicMock(status_code=503, text='upstream timeout')
+        server_error.raise_for_status.side_effect = requests.HTTPError()
+        for failure in (requests.Timeout("read timed out"), server_error):
+            mock_http.return_value.post.reset_mock()
+            if isinstance(failure, Exception):
+                mock_http.return_value.post.side_effect = failure
+            else:
+                mock_http.return_value.post.side_effect = None
+                mock_http.return_value.post.return_value = failure
+
+            inserted, errors = db.sb_insert_many("notes", [{"title": "a"}, {"title": "b"}])
+
+            self.assertEqual(inserted, [])
+            self.assertEqual([e["index"] for e in errors], [0, 1])
+            mock_http.return_value.post.assert_called_once()
+
+    def test_sb_insert_many_empty(self):
+        """Test sb_insert_many with no rows makes no request"""
+        with patch('src.database.db._http') as mock_http:
+            self.assertEqual(db.sb_insert_many("notes", []), ([], []))
+            mock_http.assert_not_called()
+
+
+    @patch('src.database.db.sb_select')
+    def test_sb_select_iter_offset_pages(self, mock_select):
+        """Test sb_select_iter walks limit/offset pages until a short page"""
+        pages = [[{"id": 1}, {"id": 2}], [{"id": 3}, {"id": 4}], [{"id": 5}]]
+        mock_select.side_effect = lambda table, params, cache: pages[int(params.get("offset", 0)) // 2]
+
+        rows = list(db.sb_select_iter("team_membership", {"select": "id", "order": "id.asc"}, page_size=2))
+
+        self.assertEqual([r["id"] for r in rows], [1, 2, 3, 4, 5])
+        offsets = [c.args[1].get("offset") for c in mock_select.call_args_list]
+        self.assertEqual(offsets, [None, "2", "4"])
+        self.assertTrue(all(c.kwargs["cache"] is False for c in mock_select.call_args_list))
+
+    @patch('src.database.db.sb_select')
+    def test_sb_select_iter_keyset_pages(self, mock_select):
+        """Test keyset mode filters on the last seen key instead of an offset"""
+        mock_select.side_effect = [[{"id": "a"}, {"id": "b"}], []]
+
+        rows = list(db.sb_select_iter("file_snapshots", {"select": "file_path", "and": "(user_id.eq.u1)"},
+                                      page_size=2, keyset="id"))
+
+        self.assertEqual(len(rows), 2)
+        first, second = [c.args[1] for c in mock_select.call_args_list]
+        self.assertEqual(first["order"], "id.asc")
+        self.assertEqual(first["select"], "file_path,id")
+        self.assertNotIn("offset", second)
+        self.assertEqual(second["and"], '(user_id.eq.u1,id.gt."b")')
+
+    @patch('src.database.db.sb_select')
+    def test_sb_select_iter_respects_limit(self, mock_select):
+        """Test a limit param caps the total rows yielded"""
+        mock_select.side_effect = lambda table, params, cache: [{"id": i} for i in range(int(params["limit"]))]
+
+        rows = list(db.sb_select_iter("team_activity_feed", {"limit": "5"}, page_size=3))
+
+        self.assertEqual(len(rows), 5)
+        self.assertEqual([c.args[1]["limit"] for c in mock_select.call_args_list], ["3", "2"])
+
+    @patch('src.database.db.sb_select')
+    def test_sb_select_iter_is_lazy(self, mock_select):
+        """Test no request is made until the generator is consumed"""
+        mock_select.return_value = [{"id": 1}]
+        rows = db.sb_select_iter("team_activity_feed", {}, page_size=10)
+        mock_select.assert_not_called()
+        self.assertEqual(next(rows), {"id": 1})
+
+
+class AsyncDatabaseTestCase(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the asyncio flavor of the database helpers"""
+
+    def _response(self, status_code, text, payload=None):
+        response = MagicMock()
+        response.status_code = status_code
+        response.is_error = status_code >= 400
+        response.text = text
+        response.content = text.encode()
+        response.json.return_value = payload
+        return response
+
+    @patch('src.database.db._ahttp')
+    async def test_sb_select_async_success(self, mock_ahttp):
+        """Test sb_select_async returns decoded rows"""
+        mock_ahttp.return_value.get = AsyncMock(return_value=self._response(200, '[{"id": "1"}]', [{"id": "1"}]))
+
+        result = await db.sb_select_async("test_table", {"select": "id"})
+
+        self.assertEqual(result, [{"id": "1"}])
+        self.assertEqual(mock_ahttp.return_value.get.call_args.kwargs["params"], {"select": "id"})
+
+    @patch('src.database.db._ahttp')
+    async def test_sb_insert_async_empty_response(self, mock_ahttp):
+        """Test sb_insert_async with empty response text"""
+        mock_ahttp.return_value.post = AsyncMock(return_value=self._response(201, ''))
+
+        self.assertEqual(await db.sb_insert_async("notes", {"title": "t"}), [])
+
+    @patch('src.database.db._ahttp')
+    async def test_sb_update_async_http_error(self, mock_ahttp):
+        """Test sb_update_async surfaces the upstream error body"""
+        mock_ahttp.return_value.patch = AsyncMock(return_value=self._response(400, 'Bad Request'))
+
+        with self.assertRaises(db.SupabaseHTTPError) as context:
+            await db.sb_update_async("notes", {"id": "eq.1"}, {"title": "t"})
+
+        self.assertIn("Supabase REST 400", str(context.exception))
+        self.assertEqual(context.exception.status_code, 400)
+
+    @patch('src.database.db._ahttp')
+    async def test_sb_delete_async_success(self, mock_ahttp):
+        """Test sb_delete_async passes the filter as query params"""
+        mock_ahttp.return_value.delete = AsyncMock(return_value=self._response(204, ''))
+
+        self.assertEqual(await db.sb_delete_async("notes", {"id": "eq.1"}), [])
+        self.assertEqual(mock_ahttp.return_value.delete.call_args.kwargs["params"], {"id": "eq.1"})
+
+    async def test_async_client_is_shared_per_loop(self):
+        """Test _ahttp reuses one pooled client within an event loop"""
+        client = db._ahttp()
+        self.assertIs(client, db._ahttp())
+        await db.aclose_async_client()
+        self.assertTrue(client.is_closed)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+
+from src.utils.diff_compaction import compact_diff, parse_diff
+
+
+def file_diff(path, *hunks):
+    parts = [f"diff --git a/{path} b/{path}", "index 1111111..2222222 100644", f"--- a/{path}", f"+++ b/{path}"]
+    for start, lines in hunks:
+        old = sum(1 for l in lines if l[:1] in (" ", "-"))
+        new = sum(1 for l in lines if l[:1] in (" ", "+"))
+        parts.append(f"@@ -{start},{old} +{start},{new} @@")
+        parts.extend(lines)
+    return "\n".join(parts)
+
+
+CODE = file_diff("src/app.py", (10, [" import os", "-x = 1", "+def handler(event):", "+    return event", " "]))
+LOCK = file_diff("package-lock.json", (1, ['-    "version": "1.0.0",', '+    "version": "1.0.1",']))
+WHITESPACE = file_diff("src/util.py", (3, ["-def f():", "-  return 1", "+def f():", "+    return 1"]))
+BINARY = "diff --git a/logo.png b/logo.png\nindex 1..2 100644\nBinary files a/logo.png and b/logo.png differ"
+
+
+class DiffCompactionTestCase(unittest.TestCase):
+    """Test cases for hunk-aware diff compaction"""
+
+    def test_parse_files_and_hunks(self):
+        """Test files, paths and hunk lines are recovered"""
+        files = parse_diff(CODE + "\n" + LOCK)
+
+        self.assertEqual([f.path for f in files], ["src/app.py", "package-lock.json"])
+        self.assertEqual(len(files[0].hunks[0].lines), 5)
+
+    def test_removed_line_looking_like_header(self):
+        """Test a removed '-- comment' line stays inside its hunk"""
+        diff = file_diff("schema.sql", (1, ["--- old comment", "+-- new comment", " select 1;"]))
+        files = parse_diff(diff)
+
+        self.assertEqual(len(files), 1)
+        self.assertEqual(files[0].hunks[0].removed, ["-- old comment"])
+
+    def test_noise_dropped(self):
+        """Test lockfile, binary and whitespace-only changes are left out but noted"""
+        out = compact_diff("\n".join([LOCK, BINARY, WHITESPACE, CODE]), 4000)
+
+        self.assertIn("+def handler(event):", out)
+        self.assertNotIn("1.0.1", out)
+        self.assertNotIn("return 1", out)
+        self.assertIn("lockfile changes in package-lock.json", out)
+        self.assertIn("binary changes in logo.png", out)
+        self.assertIn("whitespace-only changes in src/util.py", out)
+
+    def test_generated_files_dropped(self):
+        """Test build output and marked generated files are skipped"""
+        bundle = file_diff("dist/app.min.js", (1, ["-a()", "+b()"]))
+        marked = file_diff("src/api_pb.ts", (1, ["+// @generated by protoc", "+export const x = 1"]))
+
+        out = compact_diff("\n".join([bundle, marked, CODE]), 4000)
+
+        self.assertNotIn("b()", out)
+        self.assertNotIn("export const x", out)
+        self.assertIn("def handler", out)
+
+    def test_budget_prefers_signal_over_position(self):
+        """Test a small budget keeps the meaningful hunk, not the first one"""
+        filler = file_diff("README.md", (1, ["+" + "x" * 30 for _ in range(3)]))
+        big = file_diff("src/core.py", (1, [f"+def step_{n}(): return {n}" for n in range(60)]))
+
+        out = compact_diff(filler + "\n" + big, 1200)
+
+        self.assertLessEqual(len(out), 1200)
+        self.assertIn("def step_0", out)
+        self.assertIn("hunk truncated", out)
+
+    def test_spreads_budget_across_files(self):
+        """Test one large file does not crowd out the others"""
+        big = file_diff("src/big.py", *[(n * 100, [f"+value_{n}_{i} = {i}" for i in range(20)]) for n in range(10)])
+        out = compact_diff(big + "\n" + CODE, 2500)
+
+        self.assertIn("+++ b/src/app.py", out)
+        self.assertIn("lower-signal hunks", out)
+
+    def test_original_order_kept(self):
+        """Test chosen hunks are rendered in diff order"""
+        second = file_diff("src/z.py", (1, ["+class Zed:", "+    pass"]))
+        out = compact_diff(CODE + "\n" + second, 4000)
+
+        self.assertLess(out.index("src/app.py"), out.index("src/z.py"))
+
+    def test_small_budget_keeps_code(self):
+        """Test a budget too small for packing still shows the best hunk"""
+        big = file_diff("src/core.py", (1, [f"+def step_{n}(): return {n}" for n in range(60)]))
+
+        out = compact_diff(LOCK + "\n" + big, 100)
+
+        self.assertTrue(out.startswith("--- a/src/core.py\n+++ b/src/core.py\n@@"))
+        self.assertIn("+def step_0", out)
+        self.assertNotIn("omitted", out)
+        self.assertLessEqual(len(out), 100 + len("\n... (truncated)"))
+
+    def test_plain_text_truncated(self):
+        """Test text without hunks falls back to plain truncation"""
+        self.assertEqual(compact_diff("Added new function", 4000), "Added new function")
+        self.assertEqual(compact_diff("y" * 50, 10), "y" * 10 + "\n... (truncated)")
+
+
+if __name__ == '__main__':
+    unittest.main()
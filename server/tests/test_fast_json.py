@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import patch
+import os
+import uuid
+from datetime import datetime, timezone
+
+from flask.json.provider import DefaultJSONProvider
+from src.app import app
+from src.utils import fast_json
+
+
+class FastJSONTestCase(unittest.TestCase):
+    """Test cases for the fast JSON provider and helpers"""
+
+    def setUp(self):
+        self.app = app.test_client()
+        self.app.testing = True
+
+    def test_app_uses_fast_provider(self):
+        """Test the Flask app is wired to the fast provider"""
+        self.assertIsInstance(app.json, fast_json.FastJSONProvider)
+
+    def test_loads_accepts_bytes_and_str(self):
+        """Test decoding works directly from bytes"""
+        self.assertEqual(fast_json.loads(b'[{"a": 1}]'), [{"a": 1}])
+        self.assertEqual(fast_json.loads('{"b": "\\u00e9"}'), {"b": "é"})
+
+    def test_dumps_matches_flask_conventions(self):
+        """Test sorted keys, HTTP-date datetimes and UUID strings match the stdlib provider"""
+        payload = {"b": 1, "a": datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc), "id": uuid.UUID(int=1)}
+        with app.app_context():
+            fast = fast_json.loads(app.json.dumps(payload))
+            stdlib = fast_json.loads(DefaultJSONProvider(app).dumps(payload))
+        self.assertEqual(fast, stdlib)
+        self.assertEqual(list(fast), ["a", "b", "id"])
+
+    def test_falls_back_for_huge_ints(self):
+        """Test values orjson rejects are still encoded"""
+        self.assertEqual(fast_json.loads(fast_json.dumps_bytes({"n": 2 ** 70})), {"n": 2 ** 70})
+
+    def test_jsonify_response_body(self):
+        """Test jsonify responses decode to the same data"""
+        response = self.app.get('/health')
+        self.assertEqual(response.json, {'status': 'healthy', 'service': 'collab-agent-backend'})
+        self.assertTrue(response.data.endswith(b"\n"))
+
+    def test_stdlib_fallback(self):
+        """Test FAST_JSON=0 behaviour (or a missing orjson) uses the stdlib"""
+        with patch.object(fast_json, "ENABLED", False):
+            self.assertEqual(fast_json.dumps_bytes({"a": "é"}), '{"a":"é"}'.encode())
+            with app.app_context():
+                self.assertEqual(app.json.loads('{"x": 1}'), {"x": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
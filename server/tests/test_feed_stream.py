@@ -0,0 +1,246 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import time
+
+os.environ['SUPABASE_URL'] = 'https://test.supabase.co'
+os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test-service-key'
+os.environ['GEMINI_API_KEY'] = 'test-gemini-key'
+os.environ['SIMPLE_MODEL'] = 'gemini-1.5-flash'
+os.environ['ADVANCE_MODEL'] = 'gemini-1.5-pro'
+
+from src.app import app
+from src.database import db
+from src.services import feed_stream
+from src.services.feed_stream import FeedBroker, event_id, parse_event_id, feed_broker
+
+
+def row(row_id, team_id="t1", created_at="2025-01-01T00:00:00+00:00"):
+    return {"id": row_id, "team_id": team_id, "created_at": created_at, "summary": f"row {row_id}"}
+
+
+class FakeFeed:
+    """fetch(team_id, position) over an in-memory list, like select_after."""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.calls = []
+
+    def __call__(self, team_id, position):
+        self.calls.append((team_id, position))
+        rows = sorted((r for r in self.rows if r["team_id"] == team_id), key=lambda r: (r["created_at"], r["id"]))
+        if position is None:
+            return rows[-1:]
+        return [r for r in rows if (r["created_at"], r["id"]) > (position["c"], position["i"])]
+
+
+class FeedBrokerTestCase(unittest.TestCase):
+    """Test cases for the activity feed event broker"""
+
+    def test_local_insert_reaches_team_subscribers(self):
+        """Test rows inserted by this worker are pushed to that team's streams only"""
+        broker = FeedBroker(fetch=FakeFeed(), poll_interval=0)
+        mine, other = broker.subscribe("t1"), broker.subscribe("t2")
+
+        broker.on_write("team_activity_feed", "insert", [row("a")])
+
+        self.assertEqual(mine.get(0)["id"], "a")
+        self.assertIsNone(other.get(0))
+
+    def test_other_writes_ignored(self):
+        """Test updates and other tables are not streamed"""
+        broker = FeedBroker(fetch=FakeFeed(), poll_interval=0)
+        sub = broker.subscribe("t1")
+
+        broker.on_write("team_activity_feed", "update", [row("a")])
+        broker.on_write("notes", "insert", [row("b")])
+
+        self.assertIsNone(sub.get(0))
+
+    def test_poll_picks_up_external_rows_once(self):
+        """Test the poller delivers rows from other writers and skips ones already pushed"""
+        feed = FakeFeed([row("a", created_at="2025-01-01T00:00:00+00:00")])
+        broker = FeedBroker(fetch=feed, poll_interval=0)
+        sub = broker.subscribe("t1")
+        self.assertEqual(feed.calls, [("t1", None)])
+
+        pushed = row("b", created_at="2025-01-01T00:00:01+00:00")
+        broker.on_write("team_activity_feed", "insert", [pushed])
+        feed.rows += [pushed, row("c", created_at="2025-01-01T00:00:02+00:00")]
+        broker.poll_once()
+        broker.poll_once()
+
+        self.assertEqual([sub.get(0)["id"], sub.get(0)["id"]], ["b", "c"])
+        self.assertIsNone(sub.get(0))
+        self.assertEqual(feed.calls[-1][1], {"c": "2025-01-01T00:00:02+00:00", "i": "c"})
+
+    def test_empty_team_streams_first_row(self):
+        """Test a team with no rows yet treats its first external row as new"""
+        feed = FakeFeed()
+        broker = FeedBroker(fetch=feed, poll_interval=0)
+        sub = broker.subscribe("t1")
+
+        feed.rows.append(row("a"))
+        broker.poll_once()
+
+        self.assertEqual(sub.get(0)["id"], "a")
+
+    def test_unsubscribe_forgets_team(self):
+        """Test the last stream leaving stops the team from being polled"""
+        feed = FakeFeed()
+        broker = FeedBroker(fetch=feed, poll_interval=0)
+        sub = broker.subscribe("t1")
+        broker.unsubscribe(sub)
+        broker.poll_once()
+
+        self.assertEqual(feed.calls, [("t1", None)])
+        self.assertEqual(broker.stats()["teams"], 0)
+
+    def test_background_poller(self):
+        """Test the poller thread runs while a team is watched"""
+        feed = FakeFeed()
+        broker = FeedBroker(fetch=feed, poll_interval=0.01)
+        sub = broker.subscribe("t1")
+        feed.rows.append(row("a"))
+
+        self.assertEqual(sub.get(2)["id"], "a")
+        broker.unsubscribe(sub)
+
+    def test_slow_subscriber_overflows(self):
+        """Test a full queue marks the subscriber and ends its stream"""
+        broker = FeedBroker(fetch=FakeFeed(), poll_interval=0, queue_size=1)
+        stream = broker.stream("t1", heartbeat=0.01, max_seconds=5)
+        next(stream)  # subscribes
+
+        broker.on_write("team_activity_feed", "insert", [row("a"), row("b")])
+
+        self.assertEqual(list(stream), [])
+        self.assertEqual(broker.stats()["dropped"], 1)
+        self.assertEqual(broker.stats()["subscribers"], 0)
+
+    def test_stream_events_and_heartbeat(self):
+        """Test the stream sends retry, heartbeats when idle and one event per row"""
+        broker = FeedBroker(fetch=FakeFeed(), poll_interval=0)
+        stream = broker.stream("t1", heartbeat=0.01, max_seconds=5)
+
+        self.assertEqual(next(stream), b"retry: 3000\n\n")
+        self.assertEqual(next(stream), b": keep-alive\n\n")
+        broker.on_write("team_activity_feed", "insert", [row("a")])
+        event = next(stream).decode()
+
+        self.assertIn(f"id: {event_id(row('a'))}\n", event)
+        self.assertIn("event: activity\n", event)
+        self.assertIn('"summary":"row a"', event)
+        stream.close()
+        self.assertEqual(broker.stats()["subscribers"], 0)
+
+    def test_stream_resume_replays_missed_rows(self):
+        """Test Last-Event-ID replays rows written after it"""
+        first = row("a", created_at="2025-01-01T00:00:00+00:00")
+        feed = FakeFeed([first, row("b", created_at="2025-01-01T00:00:01+00:00")])
+        broker = FeedBroker(fetch=feed, poll_interval=0)
+        stream = broker.stream("t1", last_event_id=event_id(first), heartbeat=0.01, max_seconds=5)
+
+        next(stream)
+        replayed = next(stream).decode()
+        self.assertIn('"id":"b"', replayed)
+        self.assertEqual(next(stream), b": keep-alive\n\n")
+        stream.close()
+
+    def test_stream_ends_at_max_seconds(self):
+        """Test streams close after max_seconds so clients reconnect"""
+        broker = FeedBroker(fetch=FakeFeed(), poll_interval=0)
+        started = time.monotonic()
+        chunks = list(broker.stream("t1", heartbeat=0.01, max_seconds=0.05))
+
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(chunks[0], b"retry: 3000\n\n")
+
+    def test_streaming_available(self):
+        """Test streams need cooperative workers unless FEED_STREAM_ON_SYNC is set"""
+        with patch('src.services.feed_stream.cooperative_workers', return_value=False):
+            self.assertFalse(feed_stream.streaming_available())
+            with patch.object(feed_stream, "ON_SYNC", True):
+                self.assertTrue(feed_stream.streaming_available())
+        with patch('src.services.feed_stream.cooperative_workers', return_value=True):
+            self.assertTrue(feed_stream.streaming_available())
+
+    def test_parse_event_id(self):
+        """Test event ids round-trip and junk is rejected"""
+        self.assertEqual(parse_event_id(event_id(row("a"))), {"c": "2025-01-01T00:00:00+00:00", "i": "a"})
+        with self.assertRaises(ValueError):
+            parse_event_id("not-an-id")
+
+
+class WriteListenerTestCase(unittest.TestCase):
+    """Test cases for the db write-listener hook"""
+
+    @patch('src.database.db._send')
+    def test_insert_notifies_listener(self, mock_send):
+        """Test sb_insert hands the returned rows to listeners"""
+        mock_send.return_value = b'[{"id": "r1", "team_id": "t1"}]'
+        listener = MagicMock()
+        db.add_write_listener(listener)
+        try:
+            db.sb_insert("team_activity_feed", {"team_id": "t1"})
+        finally:
+            db.remove_write_listener(listener)
+
+        listener.assert_called_once_with("team_activity_feed", "insert", [{"id": "r1", "team_id": "t1"}])
+
+    @patch('src.database.db._send')
+    def test_failing_listener_does_not_fail_write(self, mock_send):
+        """Test a listener exception is swallowed"""
+        mock_send.return_value = b'[{"id": "r1"}]'
+        listener = MagicMock(side_effect=RuntimeError("boom"))
+        db.add_write_listener(listener)
+        try:
+            self.assertEqual(db.sb_update("notes", {"id": "eq.r1"}, {"title": "x"}), [{"id": "r1"}])
+        finally:
+            db.remove_write_listener(listener)
+
+
+class FeedStreamRouteTestCase(unittest.TestCase):
+    """Test cases for GET /api/ai/feed/stream"""
+
+    def setUp(self):
+        self.app = app.test_client()
+
+    def test_missing_team_id(self):
+        response = self.app.get('/api/ai/feed/stream')
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_last_event_id(self):
+        response = self.app.get('/api/ai/feed/stream?team_id=t1', headers={"Last-Event-ID": "junk"})
+        self.assertEqual(response.status_code, 400)
+
+    @patch('src.routes.api_route.streaming_available', return_value=False)
+    def test_sync_workers_get_retry_after(self, mock_available):
+        """Test sync workers refuse the stream so clients keep polling /feed"""
+        response = self.app.get('/api/ai/feed/stream?team_id=t1')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "30")
+        self.assertEqual(feed_broker.stats()["subscribers"], 0)
+
+    @patch('src.routes.api_route.streaming_available', return_value=True)
+    @patch('src.services.feed_stream.sb_select', return_value=[])
+    def test_stream_pushes_inserted_rows(self, mock_sb_select, mock_available):
+        """Test a row inserted through the db layer arrives on an open stream"""
+        with patch.object(feed_broker, "poll_interval", 0):
+            response = self.app.get('/api/ai/feed/stream?team_id=t1', buffered=False)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, "text/event-stream")
+            self.assertEqual(response.headers["Cache-Control"], "no-cache")
+            chunks = iter(response.response)
+            self.assertEqual(next(chunks), b"retry: 3000\n\n")
+
+            with patch('src.database.db._send', return_value=b'[{"id": "r1", "team_id": "t1", "created_at": "2025-01-01T00:00:00+00:00"}]'):
+                db.sb_insert("team_activity_feed", {"team_id": "t1"})
+            self.assertIn(b'"id":"r1"', next(chunks))
+            response.close()
+
+        self.assertEqual(feed_broker.stats()["subscribers"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
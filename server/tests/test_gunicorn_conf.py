@@ -0,0 +1,34 @@
+import unittest
+from unittest.mock import patch
+import os
+import runpy
+
+CONF_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "gunicorn.conf.py")
+
+
+class GunicornConfTestCase(unittest.TestCase):
+    """Test cases for the gunicorn execution modes"""
+
+    def test_default_mode_is_sync(self):
+        """Test the config keeps sync workers unless WORKER_MODE is set"""
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("WORKER_MODE", None)
+            conf = runpy.run_path(CONF_PATH)
+
+        self.assertEqual(conf["worker_class"], "sync")
+        self.assertEqual(conf["timeout"], 120)
+
+    def test_gevent_mode(self):
+        """Test WORKER_MODE=gevent selects cooperative workers and REST transport for Gemini"""
+        with patch.dict(os.environ, {"WORKER_MODE": "gevent", "WORKER_CONNECTIONS": "300"}):
+            os.environ.pop("GEMINI_TRANSPORT", None)
+            conf = runpy.run_path(CONF_PATH)
+            transport = os.environ.get("GEMINI_TRANSPORT")
+
+        self.assertEqual(conf["worker_class"], "gevent")
+        self.assertEqual(conf["worker_connections"], 300)
+        self.assertEqual(transport, "rest")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import threading
+import time
+
+os.environ['SUPABASE_URL'] = 'https://test.supabase.co'
+os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test-service-key'
+
+from src.database import db
+from src.database import hedging
+from src.database.hedging import Hedger, HedgeBudget, LatencyTracker
+
+
+def seeded_hedger(key="t:GET", latency=0.01, samples=50, ratio=1.0):
+    tracker = LatencyTracker()
+    for _ in range(samples):
+        tracker.record(key, latency)
+    budget = HedgeBudget(ratio=ratio)
+    return Hedger(tracker, budget, max_workers=4)
+
+
+class HedgingTestCase(unittest.TestCase):
+    """Test cases for adaptive timeouts and hedged requests"""
+
+    def test_timeout_defaults_until_enough_samples(self):
+        """Test the static timeout is used before the latency window fills"""
+        hedger = Hedger(LatencyTracker())
+        self.assertEqual(hedger.timeout_for("t:GET"), hedging.TIMEOUT_DEFAULT)
+        self.assertIsNone(hedger.hedge_delay("t:GET"))
+
+    def test_timeout_adapts_and_is_clamped(self):
+        """Test the timeout follows p99 within the configured bounds"""
+        self.assertEqual(seeded_hedger(latency=1.0).timeout_for("t:GET"), 1.0 * hedging.TIMEOUT_MULTIPLIER)
+        self.assertEqual(seeded_hedger(latency=0.001).timeout_for("t:GET"), hedging.TIMEOUT_MIN)
+        self.assertEqual(seeded_hedger(latency=60).timeout_for("t:GET"), hedging.TIMEOUT_MAX)
+
+    def test_budget_never_exceeds_primary_count(self):
+        """Test the hedge budget ratio is capped so hedges can at most double load"""
+        budget = HedgeBudget(ratio=5.0, burst=100)
+        granted = 0
+        for _ in range(20):
+            budget.earn()
+            granted += budget.take()
+        self.assertLessEqual(granted, 20)
+        self.assertEqual(budget.ratio, 1.0)
+
+    def test_fast_call_is_not_hedged(self):
+        """Test a call answering before the hedge delay sends one request"""
+        hedger = seeded_hedger(latency=0.5)
+        fn = MagicMock(return_value="rows")
+        self.assertEqual(hedger.call("t:GET", fn), "rows")
+        self.assertEqual(fn.call_count, 1)
+        self.assertEqual(hedger.stats()["hedges"], 0)
+
+    def test_slow_primary_is_hedged_and_backup_wins(self):
+        """Test a straggling primary is raced by a duplicate and the first answer wins"""
+        hedger = seeded_hedger(latency=0.01)
+        release = threading.Event()
+        calls = []
+
+        def fn(timeout):
+            calls.append(timeout)
+            if len(calls) == 1:
+                release.wait(2)
+                return "slow"
+            return "fast"
+
+        self.assertEqual(hedger.call("t:GET", fn), "fast")
+        release.set()
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(hedger.stats()["hedge_wins"], 1)
+
+    def test_no_hedge_without_budget(self):
+        """Test hedging stops when the budget is exhausted"""
+        hedger = seeded_hedger(latency=0.01, ratio=0.0)
+        fn = MagicMock(side_effect=lambda timeout: time.sleep(0.1) or "rows")
+        self.assertEqual(hedger.call("t:GET", fn), "rows")
+        self.assertEqual(fn.call_count, 1)
+        self.assertEqual(hedger.stats()["budget_denied"], 1)
+
+    def test_failed_first_response_does_not_win(self):
+        """Test an error from one copy falls back to the other copy's result"""
+        hedger = seeded_hedger(latency=0.01)
+        calls = []
+
+        def fn(timeout):
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.1)
+                return "primary"
+            raise RuntimeError("Supabase REST 503")
+
+        self.assertEqual(hedger.call("t:GET", fn), "primary")
+
+    def test_unhedged_call_records_latency(self):
+        """Test hedge=False still feeds the latency window"""
+        hedger = Hedger(LatencyTracker())
+        hedger.call("t:POST", lambda timeout: None, hedge=False)
+        self.assertIn("t:POST", hedger.stats()["latency"])
+
+
+class TailLatencyModeTestCase(unittest.TestCase):
+    """Test cases for db.py in tail-latency mode"""
+
+    def setUp(self):
+        for name, value in (("TAIL_LATENCY_MODE", True), ("_hedger", seeded_hedger("notes:GET", 0.5))):
+            patcher = patch.object(db, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @patch('src.database.db._http')
+    def test_select_uses_adaptive_timeout(self, mock_http):
+        """Test reads pass the per-table adaptive timeout to the session"""
+        mock_http.return_value.get.return_value = MagicMock(status_code=200, text='[]', content=b'[]')
+        db.sb_select("notes", {"select": "id"})
+        self.assertEqual(mock_http.return_value.get.call_args.kwargs["timeout"], 2.0)
+
+    @patch('src.database.db._http')
+    def test_writes_are_not_hedged_by_default(self, mock_http):
+        """Test inserts never race a duplicate request"""
+        with patch.object(db._hedger, "call", wraps=db._hedger.call) as mock_call:
+            mock_http.return_value.post.return_value = MagicMock(status_code=201, text='[]', content=b'[]')
+            db.sb_insert("notes", {"title": "t"})
+            self.assertFalse(mock_call.call_args.kwargs["hedge"])
+
+    @patch('src.database.db._http')
+    def test_idempotent_update_may_hedge(self, mock_http):
+        """Test updates marked idempotent are eligible for hedging"""
+        with patch.object(db._hedger, "call", wraps=db._hedger.call) as mock_call:
+            mock_http.return_value.patch.return_value = MagicMock(status_code=200, text='[]', content=b'[]')
+            db.sb_update("notes", {"id": "eq.1"}, {"title": "t"}, idempotent=True)
+            self.assertTrue(mock_call.call_args.kwargs["hedge"])
+
+
+if __name__ == '__main__':
+    unittest.main()
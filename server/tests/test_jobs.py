@@ -0,0 +1,210 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import time
+
+os.environ['SUPABASE_URL'] = 'https://test.supabase.co'
+os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test-service-key'
+os.environ['GEMINI_API_KEY'] = 'test-gemini-key'
+os.environ['SIMPLE_MODEL'] = 'gemini-1.5-flash'
+os.environ['ADVANCE_MODEL'] = 'gemini-1.5-pro'
+
+from src.app import app
+from src.services import jobs
+from src.services.jobs import JobQueue, QueueFull
+from src.services.summary_cache import summary_cache
+
+
+class FakeStore:
+    def __init__(self):
+        self.rows = {}
+        self.calls = []
+
+    def create(self, job):
+        self.calls.append(("create", job.status))
+        self.rows[job.id] = job.to_dict()
+
+    def update(self, job):
+        self.calls.append(("update", job.status))
+        self.rows[job.id] = job.to_dict()
+
+    def get(self, job_id):
+        return self.rows.get(job_id)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class JobQueueTestCase(unittest.TestCase):
+    """Test cases for the in-process AI job queue"""
+
+    def make_queue(self, **kwargs):
+        q = JobQueue(**kwargs)
+        q._ensure_workers = lambda: None  # jobs are run by hand with run_one
+        return q
+
+    def test_run_records_result(self):
+        """Test a job moves queued -> succeeded with the handler's body and status"""
+        q = self.make_queue()
+        job = q.submit("process_snapshot", lambda: ({"summary": "Added"}, 201))
+        self.assertEqual(q.get(job.id)["status"], "queued")
+
+        q.run_one(q._queue.get_nowait())
+
+        self.assertEqual(q.get(job.id)["status"], "succeeded")
+        self.assertEqual(q.get(job.id)["result"], {"summary": "Added"})
+        self.assertEqual(q.get(job.id)["status_code"], 201)
+        self.assertEqual(q.stats()["succeeded"], 1)
+
+    def test_error_statuses_and_exceptions_fail(self):
+        """Test 4xx/5xx answers and exceptions mark the job failed"""
+        q = self.make_queue()
+        bad = q.submit("process_snapshot", lambda: ({"error": "snapshot not found"}, 404))
+        boom = q.submit("process_snapshot", lambda: 1 / 0)
+        q.run_one(q._queue.get_nowait())
+        q.run_one(q._queue.get_nowait())
+
+        self.assertEqual(q.get(bad.id)["status"], "failed")
+        self.assertEqual(q.get(bad.id)["status_code"], 404)
+        self.assertEqual(q.get(boom.id)["status_code"], 500)
+        self.assertIn("division", q.get(boom.id)["error"])
+
+    def test_queue_full(self):
+        """Test submissions past the queue size are rejected"""
+        q = self.make_queue(queue_size=1)
+        q.submit("task_recommendations", lambda: ({}, 201))
+
+        with self.assertRaises(QueueFull):
+            q.submit("task_recommendations", lambda: ({}, 201))
+        self.assertEqual(q.stats()["rejected"], 1)
+        self.assertEqual(q.stats()["queued"], 1)
+
+    def test_finished_jobs_expire(self):
+        """Test finished jobs are dropped after the result TTL"""
+        clock = Clock()
+        q = self.make_queue(result_ttl=60, clock=clock)
+        job = q.submit("process_snapshot", lambda: ({}, 201))
+        q.run_one(q._queue.get_nowait())
+
+        clock.now += 61
+        q.submit("process_snapshot", lambda: ({}, 201))
+
+        self.assertIsNone(q.get(job.id))
+
+    def test_store_mirrors_and_answers(self):
+        """Test the shared store sees every transition and serves unknown ids"""
+        store = FakeStore()
+        q = self.make_queue(store=store)
+        job = q.submit("process_snapshot", lambda: ({"ok": True}, 201))
+        q.run_one(q._queue.get_nowait())
+
+        self.assertEqual(store.calls, [("create", "queued"), ("update", "running"), ("update", "succeeded")])
+        other = self.make_queue(store=store)
+        self.assertEqual(other.get(job.id)["result"], {"ok": True})
+        self.assertIsNone(other.get("unknown"))
+
+    def test_wait_and_run_metrics(self):
+        """Test wait and run time histograms are observed per kind"""
+        q = self.make_queue()
+        q.submit("metrics_test", lambda: ({}, 201))
+        q.run_one(q._queue.get_nowait())
+
+        self.assertEqual(jobs.WAIT_SECONDS.value(kind="metrics_test")["count"], 1)
+        self.assertEqual(jobs.RUN_SECONDS.value(kind="metrics_test", status="succeeded")["count"], 1)
+
+
+class AsyncRouteTestCase(unittest.TestCase):
+    """Test cases for Prefer: respond-async on the AI endpoints"""
+
+    def setUp(self):
+        self.app = app.test_client()
+        summary_cache.invalidate()
+        # One worker: jobs can be polled without the shared store
+        workers = patch('src.services.jobs.WEB_WORKERS', 1)
+        workers.start()
+        self.addCleanup(workers.stop)
+
+    def wait_for(self, location):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            job = self.app.get(location).json
+            if job["status"] not in ("queued", "running"):
+                return job
+            time.sleep(0.01)
+        self.fail("job did not finish")
+
+    @patch('src.routes.api_route.sb_select')
+    @patch('src.routes.api_route.sb_insert')
+    @patch('src.routes.api_route.simple_model.generate_content')
+    def test_process_snapshot_async(self, mock_generate, mock_sb_insert, mock_sb_select):
+        """Test 202 with a job id, then the job reports the usual 201 body"""
+        mock_sb_select.return_value = [{"id": "snap-1", "user_id": "u1", "file_path": "src/a.py", "changes": "+ a"}]
+        mock_generate.return_value = MagicMock(text="Added a")
+        mock_sb_insert.return_value = [{"id": "feed-id"}]
+
+        response = self.app.post('/api/ai/process_snapshot', json={"snapshot_id": "snap-1", "team_id": "t1"},
+                                 headers={"Prefer": "respond-async"})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.headers["Preference-Applied"], "respond-async")
+        self.assertEqual(response.headers["Location"], f"/api/ai/jobs/{response.json['id']}")
+        job = self.wait_for(response.headers["Location"])
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["status_code"], 201)
+        self.assertEqual(job["result"]["summary"], "Added a")
+
+    def test_async_validation_error(self):
+        """Test a request the sync route would reject ends as a failed job"""
+        response = self.app.post('/api/ai/process_snapshot', json={}, headers={"Prefer": "respond-async"})
+
+        job = self.wait_for(response.headers["Location"])
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["status_code"], 400)
+
+    def test_without_prefer_stays_sync(self):
+        """Test clients that do not ask for async get the direct answer"""
+        response = self.app.post('/api/ai/process_snapshot', json={})
+
+        self.assertEqual(response.status_code, 400)
+
+    @patch('src.services.jobs.job_queue.submit')
+    def test_several_workers_without_store_stay_sync(self, mock_submit):
+        """Test respond-async is ignored when another worker could get the poll"""
+        with patch('src.services.jobs.WEB_WORKERS', 4), patch.object(jobs.job_queue, 'store', None):
+            response = self.app.post('/api/ai/process_snapshot', json={}, headers={"Prefer": "respond-async"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("Preference-Applied", response.headers)
+        mock_submit.assert_not_called()
+
+    @patch('src.services.jobs.job_queue.submit', side_effect=QueueFull("full"))
+    def test_several_workers_with_store_go_async(self, mock_submit):
+        """Test the shared store lets several workers accept async calls"""
+        with patch('src.services.jobs.WEB_WORKERS', 4), patch.object(jobs.job_queue, 'store', FakeStore()):
+            response = self.app.post('/api/ai/process_snapshot', json={}, headers={"Prefer": "respond-async"})
+
+        self.assertEqual(response.status_code, 503)
+        mock_submit.assert_called_once()
+
+    @patch('src.services.jobs.job_queue.submit', side_effect=QueueFull("full"))
+    def test_queue_full_is_503(self, mock_submit):
+        """Test a full queue answers 503 with Retry-After"""
+        response = self.app.post('/api/ai/task_recommendations', json={}, headers={"Prefer": "respond-async"})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response.headers)
+
+    def test_unknown_job(self):
+        """Test GET /api/ai/jobs/<id> for an unknown id"""
+        response = self.app.get('/api/ai/jobs/nope')
+
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
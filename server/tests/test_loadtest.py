@@ -0,0 +1,183 @@
+import unittest
+from unittest.mock import patch
+import os
+import asyncio
+import httpx
+import requests
+
+os.environ['SUPABASE_URL'] = 'https://test.supabase.co'
+os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test-service-key'
+
+from src.database import db
+from loadtest.fake_supabase import FakeSupabase, installed, seed
+from loadtest import driver
+
+
+class FakeSupabaseTestCase(unittest.TestCase):
+    """Test cases for the in-process PostgREST/auth stand-in, driven through db.py"""
+
+    def setUp(self):
+        self.fake = FakeSupabase()
+        self.session = requests.Session()
+        self.http = patch('src.database.db._http', return_value=self.session)
+        self.http.start()
+        self.mount = installed(self.fake, self.session)
+        self.mount.__enter__()
+
+    def tearDown(self):
+        self.mount.__exit__(None, None, None)
+        self.http.stop()
+
+    def test_filters_order_and_limit(self):
+        """Test eq/in filters, nullslast ordering and limit"""
+        self.fake.insert("team_activity_feed", [
+            {"team_id": "t1", "summary": "old", "pinned": None, "created_at": "2025-01-01T00:00:00+00:00"},
+            {"team_id": "t1", "summary": "pinned", "pinned": True, "created_at": "2025-01-02T00:00:00+00:00"},
+            {"team_id": "t1", "summary": "new", "pinned": False, "created_at": "2025-01-03T00:00:00+00:00"},
+            {"team_id": "t2", "summary": "other team", "pinned": True, "created_at": "2025-01-04T00:00:00+00:00"},
+        ])
+
+        rows = db.sb_select("team_activity_feed", {
+            "select": "summary",
+            "team_id": "in.(t1)",
+            "order": "pinned.desc.nullslast,created_at.desc",
+            "limit": "2",
+        })
+
+        self.assertEqual([r["summary"] for r in rows], ["pinned", "new"])
+
+    def test_embedded_file_snapshots(self):
+        """Test many-to-one embedding of file_snapshots"""
+        snap = self.fake.insert("file_snapshots", {"changes": "+x", "snapshot": "x"})[0]
+        self.fake.insert("team_activity_feed", [
+            {"team_id": "t1", "source_snapshot_id": snap["id"]},
+            {"team_id": "t1", "source_snapshot_id": None},
+        ])
+
+        rows = db.sb_select("team_activity_feed", {"select": "id,file_snapshots(changes)", "team_id": "eq.t1"})
+
+        self.assertEqual(rows[0]["file_snapshots"], {"changes": "+x"})
+        self.assertIsNone(rows[1]["file_snapshots"])
+
+    def test_writes_return_representation(self):
+        """Test insert/update/delete round-trip with return=representation"""
+        inserted = db.sb_insert("notes", {"title": "a"})
+        self.assertTrue(inserted[0]["id"])
+
+        updated = db.sb_update("notes", {"id": f"eq.{inserted[0]['id']}"}, {"title": "b"})
+        self.assertEqual(updated[0]["title"], "b")
+
+        db.sb_delete("notes", {"id": f"eq.{inserted[0]['id']}"})
+        self.assertEqual(self.fake.rows("notes"), [])
+
+    def test_unknown_table_raises(self):
+        """Test missing tables surface as Supabase REST errors"""
+        with self.assertRaises(RuntimeError):
+            db.sb_select("nope", {"select": "*"})
+
+    def test_auth_endpoints(self):
+        """Test /auth/v1/user by token and admin user deletion"""
+        user_id, token = self.fake.add_user(email="dev@example.com")
+
+        self.assertEqual(db.sb_auth_get("/user", token=token).json()["email"], "dev@example.com")
+        self.assertEqual(db.sb_auth_get("/user", token="bogus").status_code, 401)
+        self.assertEqual(db.sb_auth_delete(f"/admin/users/{user_id}").status_code, 200)
+        self.assertEqual(db.sb_auth_get("/user", token=token).status_code, 401)
+
+    def test_httpx_transport(self):
+        """Test the httpx transport serves async clients"""
+        self.fake.insert("notes", {"title": "async"})
+
+        async def fetch():
+            async with httpx.AsyncClient(transport=self.fake.httpx_transport()) as client:
+                resp = await client.get(f"{db.REST}/notes", params={"select": "title"}, headers=db.HEADERS)
+                return resp.json()
+
+        self.assertEqual(asyncio.run(fetch()), [{"title": "async"}])
+
+    def test_injected_latency(self):
+        """Test every request waits at least the configured latency"""
+        self.fake.latency = 0.05
+        with patch('loadtest.fake_supabase.time.sleep') as mock_sleep:
+            db.sb_select("notes", {"select": "*"}, cache=False)
+        mock_sleep.assert_called_once_with(0.05)
+
+
+    @patch('src.routes.api_route.lookup_users', return_value={})
+    def test_feed_cursor_walk_matches_full_listing(self, mock_lookup_users):
+        """Test walking /api/ai/feed by cursor visits every row once, in order"""
+        from src.app import app
+        for i in range(10):
+            self.fake.insert("team_activity_feed", {
+                "team_id": "t1", "pinned": [True, False, None][i % 3],
+                "created_at": f"2025-01-0{1 + i // 4}T00:00:00+00:00",  # ties on created_at
+            })
+        client = app.test_client()
+
+        full = [r["id"] for r in client.get('/api/ai/feed?team_id=t1&limit=50').json]
+        walked, cursor = [], ""
+        while cursor is not None:
+            page = client.get(f'/api/ai/feed?team_id=t1&limit=3&cursor={cursor}').json
+            walked.extend(r["id"] for r in page["items"])
+            cursor = page["next_cursor"]
+
+        self.assertEqual(len(full), 10)
+        self.assertEqual(walked, full)
+
+
+    @patch('src.routes.api_route.lookup_users', return_value={})
+    def test_feed_etag_changes_after_write(self, mock_lookup_users):
+        """Test the feed revalidates to 304 until a row changes"""
+        from src.app import app
+        row = self.fake.insert("team_activity_feed", {"team_id": "t1", "summary": "a", "pinned": True})[0]
+        client = app.test_client()
+
+        etag = client.get('/api/ai/feed?team_id=t1').headers['ETag']
+        self.assertEqual(client.get('/api/ai/feed?team_id=t1', headers={'If-None-Match': etag}).status_code, 304)
+
+        db.sb_update("team_activity_feed", {"id": f"eq.{row['id']}"}, {"pinned": False})
+        changed = client.get('/api/ai/feed?team_id=t1', headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+
+
+    @patch('src.routes.api_route.lookup_users', return_value={})
+    def test_feed_since_returns_only_changes(self, mock_lookup_users):
+        """Test since= polls return new and unpinned rows once, then 204"""
+        from src.app import app
+        pinned = self.fake.insert("team_activity_feed", {"team_id": "t1", "summary": "started", "pinned": True})[0]
+        client = app.test_client()
+
+        first = client.get('/api/ai/feed?team_id=t1&since=2000-01-01T00:00:00Z')
+        self.assertEqual([r["id"] for r in first.json], [pinned["id"]])
+        watermark = first.headers['X-Feed-Watermark']
+
+        idle = client.get(f'/api/ai/feed?team_id=t1&since={watermark}')
+        self.assertEqual(idle.status_code, 204)
+        self.assertEqual(idle.data, b"")
+        self.assertEqual(idle.headers['X-Feed-Watermark'], watermark)
+
+        db.sb_update("team_activity_feed", {"id": f"eq.{pinned['id']}"}, {"pinned": False})
+        added = self.fake.insert("team_activity_feed", {"team_id": "t1", "summary": "new", "pinned": False})[0]
+        delta = client.get(f'/api/ai/feed?team_id=t1&since={watermark}')
+        self.assertEqual([(r["id"], r["pinned"]) for r in delta.json], [(pinned["id"], False), (added["id"], False)])
+
+        again = client.get(f"/api/ai/feed?team_id=t1&since={delta.headers['X-Feed-Watermark']}")
+        self.assertEqual(again.status_code, 204)
+
+
+class LoadDriverTestCase(unittest.TestCase):
+    """Smoke test for the end-to-end load driver"""
+
+    def test_every_route_succeeds(self):
+        """Test one pass over every route returns no server errors"""
+        report = driver.run(iterations=1, concurrency=2, latency=0, model_latency=0, teams=1, feed_rows=5)
+
+        self.assertEqual(report["requests"], len(report["routes"]))
+        for label, stats in report["routes"].items():
+            self.assertEqual(stats["errors"], 0, f"{label}: {stats['statuses']}")
+        self.assertIn("GET /rest/v1/team_activity_feed", report["upstream_calls"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import requests
+
+os.environ['SUPABASE_URL'] = 'https://test.supabase.co'
+os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test-service-key'
+
+from src.database import db
+from src.utils.metrics import Registry, Counter, Gauge, Histogram
+
+
+class MetricsTestCase(unittest.TestCase):
+    """Test cases for the metric types and text exposition"""
+
+    def test_counter_renders_labels(self):
+        """Test counters accumulate per label set"""
+        registry = Registry()
+        counter = Counter("calls_total", "Calls.", ("table",), registry=registry)
+        counter.inc(table="notes")
+        counter.inc(2, table="notes")
+
+        text = registry.render()
+        self.assertIn("# TYPE calls_total counter", text)
+        self.assertIn('calls_total{table="notes"} 3', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram buckets, sum and count"""
+        registry = Registry()
+        hist = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+        hist.observe(0.05)
+        hist.observe(0.5)
+        hist.observe(5)
+
+        text = registry.render()
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{le="1"} 2', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("latency_seconds_count 3", text)
+
+    def test_gauge_function_is_read_at_scrape(self):
+        """Test set_function gauges are computed on render and tolerate errors"""
+        registry = Registry()
+        Gauge("pool", "Pool.", ("kind",), registry=registry).set_function(lambda: {("hits",): 4})
+        Gauge("broken", "Broken.", registry=registry).set_function(lambda: 1 / 0)
+
+        text = registry.render()
+        self.assertIn('pool{kind="hits"} 4', text)
+        self.assertIn("# TYPE broken gauge", text)
+
+    def test_duplicate_name_rejected(self):
+        """Test registering the same metric name twice raises"""
+        registry = Registry()
+        Counter("dup_total", "Dup.", registry=registry)
+        with self.assertRaises(ValueError):
+            Counter("dup_total", "Dup.", registry=registry)
+
+
+class SupabaseInstrumentationTestCase(unittest.TestCase):
+    """Test cases for per-table Supabase call metrics"""
+
+    def setUp(self):
+        db.SB_REQUESTS.clear()
+        db.SB_LATENCY.clear()
+        db.SB_RESPONSE_BYTES.clear()
+
+    @patch('src.database.db._http')
+    def test_select_records_status_latency_and_size(self, mock_http):
+        """Test a select is counted by table, operation and status"""
+        mock_response = MagicMock(status_code=200, content=b'[{"id": 1}]')
+        mock_http.return_value.get.return_value = mock_response
+
+        db.sb_select("notes", {"select": "*"}, cache=False)
+
+        self.assertEqual(db.SB_REQUESTS.value(table="notes", operation="select", status="200"), 1)
+        self.assertEqual(db.SB_LATENCY.value(table="notes", operation="select")["count"], 1)
+        self.assertEqual(db.SB_RESPONSE_BYTES.value(table="notes", operation="select")["sum"], 11)
+
+    @patch('src.database.db._http')
+    def test_transport_error_counted_as_error(self, mock_http):
+        """Test calls that never got a response are labelled status=error"""
+        mock_http.return_value.post.side_effect = requests.exceptions.ConnectionError()
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            db.sb_insert("notes", {"title": "x"})
+
+        self.assertEqual(db.SB_REQUESTS.value(table="notes", operation="insert", status="error"), 1)
+
+    @patch('src.database.db._http')
+    def test_auth_calls_labelled_by_route_template(self, mock_http):
+        """Test auth admin calls do not put user ids in labels"""
+        mock_http.return_value.delete.return_value = MagicMock(status_code=204, content=b"")
+
+        db.sb_auth_delete("/admin/users/123e4567-e89b-12d3-a456-426614174000")
+
+        self.assertEqual(db.SB_REQUESTS.value(table="auth/admin/users/:id", operation="delete", status="204"), 1)
+
+    def test_metrics_endpoint(self):
+        """Test /metrics serves Prometheus text"""
+        from src.app import app
+        response = app.test_client().get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        self.assertIn(b"# TYPE supabase_requests_total counter", response.data)
+        self.assertIn(b"supabase_pool_connections", response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
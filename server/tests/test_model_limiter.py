@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import MagicMock
+import os
+import threading
+
+os.environ['SUPABASE_URL'] = 'https://test.supabase.co'
+os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test-service-key'
+
+from src.services.model_limiter import ModelLimiter, ModelBusy, ModelDeadlineExceeded
+
+
+class DeadlineExceeded(Exception):
+    """Stands in for google.api_core.exceptions.DeadlineExceeded"""
+
+
+class BlockingModel:
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def generate_content(self, prompt, **kwargs):
+        self.started.set()
+        self.release.wait(2)
+        return MagicMock(text="done")
+
+
+class ModelLimiterTestCase(unittest.TestCase):
+    """Test cases for the Gemini concurrency limiter"""
+
+    def hold_slot(self, limiter, model):
+        thread = threading.Thread(target=limiter.generate, args=(model, "p"))
+        thread.start()
+        model.started.wait(2)
+        return thread
+
+    def test_passes_deadline_as_timeout(self):
+        """Test the call gets the remaining deadline as its request timeout"""
+        model = MagicMock()
+        limiter = ModelLimiter(deadline=12)
+
+        limiter.generate(model, "prompt")
+
+        options = model.generate_content.call_args[1]["request_options"]
+        self.assertGreater(options["timeout"], 11)
+        self.assertLessEqual(options["timeout"], 12)
+        self.assertEqual(limiter.stats()["in_flight"], 0)
+
+    def test_no_waiting_room_fails_fast(self):
+        """Test a call with every slot taken and no queue is turned away at once"""
+        limiter = ModelLimiter(max_in_flight=1, max_waiting=0)
+        model = BlockingModel()
+        thread = self.hold_slot(limiter, model)
+
+        with self.assertRaises(ModelBusy):
+            limiter.generate(MagicMock(), "p")
+        model.release.set()
+        thread.join(2)
+        self.assertEqual(limiter.stats()["busy"], 1)
+
+    def test_wait_timeout(self):
+        """Test a queued call gives up after the wait timeout"""
+        limiter = ModelLimiter(max_in_flight=1, max_waiting=1, wait_timeout=0.05)
+        model = BlockingModel()
+        thread = self.hold_slot(limiter, model)
+
+        with self.assertRaises(ModelBusy):
+            limiter.generate(MagicMock(), "p")
+        model.release.set()
+        thread.join(2)
+        self.assertEqual(limiter.stats()["wait_timeout"], 1)
+        self.assertEqual(limiter.stats()["waiting"], 0)
+
+    def test_queued_call_runs_when_slot_frees(self):
+        """Test a waiting call proceeds once the running one finishes"""
+        limiter = ModelLimiter(max_in_flight=1, max_waiting=1, wait_timeout=2)
+        model = BlockingModel()
+        thread = self.hold_slot(limiter, model)
+        threading.Timer(0.05, model.release.set).start()
+
+        resp = limiter.generate(MagicMock(generate_content=MagicMock(return_value="ok")), "p")
+
+        self.assertEqual(resp, "ok")
+        thread.join(2)
+
+    def test_transport_timeout_is_deadline(self):
+        """Test a client timeout surfaces as ModelDeadlineExceeded and frees the slot"""
+        limiter = ModelLimiter(max_in_flight=1)
+        model = MagicMock()
+        model.generate_content.side_effect = DeadlineExceeded("504")
+
+        with self.assertRaises(ModelDeadlineExceeded):
+            limiter.generate(model, "p")
+        self.assertEqual(limiter.stats()["deadline"], 1)
+        self.assertEqual(limiter.stats()["in_flight"], 0)
+
+    def test_other_errors_propagate(self):
+        """Test non-timeout errors are passed through unchanged"""
+        limiter = ModelLimiter()
+        model = MagicMock()
+        model.generate_content.side_effect = ValueError("blocked prompt")
+
+        with self.assertRaises(ValueError):
+            limiter.generate(model, "p")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+
+os.environ['SUPABASE_URL'] = 'https://test.supabase.co'
+os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test-service-key'
+os.environ['GEMINI_API_KEY'] = 'test-gemini-key'
+os.environ['SIMPLE_MODEL'] = 'gemini-1.5-flash'
+os.environ['ADVANCE_MODEL'] = 'gemini-1.5-pro'
+
+from flask import Flask, jsonify
+
+from src.app import app
+from src.routes.api_route import SIMPLE_MODEL
+from src.services import model_usage
+from src.services.model_limiter import ModelBusy
+from src.services.model_usage import generate_content, add_usage_header, estimate_tokens
+from src.services.summary_cache import summary_cache
+
+
+def make_app():
+    test_app = Flask(__name__)
+    test_app.after_request(add_usage_header)
+
+    @test_app.get("/summarize")
+    def summarize():
+        model = MagicMock()
+        model.generate_content.return_value = MagicMock(text="Added a helper", usage_metadata=None)
+        generate_content(model, "p" * 400, "test-model", team_id="t-header")
+        return jsonify({"ok": True})
+
+    @test_app.get("/plain")
+    def plain():
+        return jsonify({"ok": True})
+
+    return test_app
+
+
+class ModelUsageTestCase(unittest.TestCase):
+    """Test cases for Gemini call accounting"""
+
+    def test_estimates_tokens_without_metadata(self):
+        """Test prompt and answer sizes are estimated from characters"""
+        model = MagicMock()
+        model.generate_content.return_value = MagicMock(text="x" * 40, usage_metadata=None)
+        before = model_usage.INPUT_TOKENS.value(endpoint="background", model="est-model", team="t1") or 0
+
+        generate_content(model, "y" * 1000, "est-model", team_id="t1")
+
+        self.assertEqual(model_usage.INPUT_TOKENS.value(endpoint="background", model="est-model", team="t1") - before, 250)
+        self.assertEqual(model_usage.OUTPUT_CHARS.value(endpoint="background", model="est-model", team="t1"), 40)
+        self.assertEqual(model_usage.CALLS.value(endpoint="background", model="est-model", team="t1", outcome="ok"), 1)
+        self.assertEqual(model_usage.LATENCY.value(endpoint="background", model="est-model")["count"], 1)
+
+    def test_prefers_reported_usage(self):
+        """Test Gemini's usage_metadata wins over the estimate"""
+        model = MagicMock()
+        usage = MagicMock(prompt_token_count=321, candidates_token_count=12)
+        model.generate_content.return_value = MagicMock(text="short", usage_metadata=usage)
+
+        generate_content(model, "prompt", "reported-model", team_id="t2")
+
+        self.assertEqual(model_usage.INPUT_TOKENS.value(endpoint="background", model="reported-model", team="t2"), 321)
+        self.assertEqual(model_usage.OUTPUT_TOKENS.value(endpoint="background", model="reported-model", team="t2"), 12)
+
+    @patch('src.services.model_limiter.model_limiter.generate', side_effect=ModelBusy("full"))
+    def test_rejected_calls_counted_without_tokens(self, mock_generate):
+        """Test limiter rejections are counted but send no tokens"""
+        with self.assertRaises(ModelBusy):
+            generate_content(MagicMock(), "prompt", "busy-model", team_id="t3")
+
+        self.assertEqual(model_usage.CALLS.value(endpoint="background", model="busy-model", team="t3", outcome="rejected"), 1)
+        self.assertIsNone(model_usage.INPUT_TOKENS.value(endpoint="background", model="busy-model", team="t3"))
+
+    def test_debug_header(self):
+        """Test responses that called the model carry X-Model-Usage"""
+        client = make_app().test_client()
+
+        response = client.get('/summarize')
+
+        self.assertEqual(response.headers["X-Model-Usage"].split(";")[:4],
+                         ["test-model", f"in={estimate_tokens('p' * 400)}", "out=4", "chars=14"])
+        self.assertTrue(response.headers["X-Model-Usage"].endswith(";ok"))
+        self.assertNotIn("X-Model-Usage", client.get('/plain').headers)
+        self.assertEqual(model_usage.CALLS.value(endpoint="summarize", model="test-model", team="t-header", outcome="ok"), 1)
+
+    @patch('src.routes.api_route.sb_select')
+    @patch('src.routes.api_route.sb_insert')
+    @patch('src.routes.api_route.simple_model.generate_content')
+    def test_process_snapshot_accounted_per_endpoint_and_team(self, mock_generate, mock_sb_insert, mock_sb_select):
+        """Test the route's model call lands under its endpoint and team"""
+        summary_cache.invalidate()
+        mock_sb_select.return_value = [{"id": "snap-u", "user_id": "u1", "file_path": "src/u.py", "changes": "+ usage"}]
+        mock_generate.return_value = MagicMock(text="Added usage", usage_metadata=None)
+        mock_sb_insert.return_value = [{"id": "feed-id"}]
+
+        app.test_client().post('/api/ai/process_snapshot', json={"snapshot_id": "snap-u", "team_id": "team-usage"})
+
+        self.assertEqual(model_usage.CALLS.value(endpoint="process_snapshot", model=SIMPLE_MODEL,
+                                                 team="team-usage", outcome="ok"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
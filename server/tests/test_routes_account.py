@@ -33,7 +33,7 @@ class AccountRouteTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 401)
         self.assertIn('error', response.json)
 
-    @patch('src.routes.account_route.requests.get')
+    @patch('src.routes.account_route.sb_auth_get')
     def test_delete_account_invalid_token(self, mock_requests_get):
         """Test DELETE /api/account/delete with invalid token"""
         mock_response = MagicMock()
@@ -49,8 +49,8 @@ class AccountRouteTestCase(unittest.TestCase):
 
     @patch('src.routes.account_route.sb_select')
     @patch('src.routes.account_route.sb_delete')
-    @patch('src.routes.account_route.requests.get')
-    @patch('src.routes.account_route.requests.delete')
+    @patch('src.routes.account_route.sb_auth_get')
+    @patch('src.routes.account_route.sb_auth_delete')
     def test_delete_account_no_teams(self, mock_req_delete, mock_req_get, 
                                      mock_sb_delete, mock_sb_select):
         """Test DELETE /api/account/delete when user has no team memberships"""
@@ -76,8 +76,8 @@ class AccountRouteTestCase(unittest.TestCase):
 
     @patch('src.routes.account_route.sb_select')
     @patch('src.routes.account_route.sb_delete')
-    @patch('src.routes.account_route.requests.get')
-    @patch('src.routes.account_route.requests.delete')
+    @patch('src.routes.account_route.sb_auth_get')
+    @patch('src.routes.account_route.sb_auth_delete')
     @patch('src.routes.account_route.get_user_display_name')
     def test_delete_account_delete_empty_team(self, mock_get_name, mock_req_delete, 
                                                mock_req_get, mock_sb_delete, mock_sb_select):
@@ -120,8 +120,8 @@ class AccountRouteTestCase(unittest.TestCase):
     @patch('src.routes.account_route.sb_update')
     @patch('src.routes.account_route.sb_delete')
     @patch('src.routes.account_route.sb_insert')
-    @patch('src.routes.account_route.requests.get')
-    @patch('src.routes.account_route.requests.delete')
+    @patch('src.routes.account_route.sb_auth_get')
+    @patch('src.routes.account_route.sb_auth_delete')
     @patch('src.routes.account_route.get_user_display_name')
     def test_delete_account_transfer_ownership(self, mock_get_name, mock_req_delete, 
                                                 mock_req_get, mock_sb_insert, mock_sb_delete, 
@@ -172,8 +172,8 @@ class AccountRouteTestCase(unittest.TestCase):
     @patch('src.routes.account_route.sb_update')
     @patch('src.routes.account_route.sb_delete')
     @patch('src.routes.account_route.sb_insert')
-    @patch('src.routes.account_route.requests.get')
-    @patch('src.routes.account_route.requests.delete')
+    @patch('src.routes.account_route.sb_auth_get')
+    @patch('src.routes.account_route.sb_auth_delete')
     @patch('src.routes.account_route.get_user_display_name')
     def test_delete_account_transfer_to_existing_admin(self, mock_get_name, mock_req_delete, 
                                                         mock_req_get, mock_sb_insert, mock_sb_delete,
@@ -218,8 +218,8 @@ class AccountRouteTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue(response.json['success'])
 
-    @patch('src.routes.account_route.requests.get')
-    @patch('src.routes.account_route.requests.delete')
+    @patch('src.routes.account_route.sb_auth_get')
+    @patch('src.routes.account_route.sb_auth_delete')
     @patch('src.routes.account_route.sb_select')
     def test_delete_account_auth_deletion_fails(self, mock_sb_select, mock_req_delete, mock_req_get):
         """Test DELETE /api/account/delete handles auth deletion failure"""
@@ -10,6 +10,9 @@ os.environ['SIMPLE_MODEL'] = 'gemini-1.5-flash'
 os.environ['ADVANCE_MODEL'] = 'gemini-1.5-pro'
 
 from src.app import app
+from src.services.summary_cache import summary_cache, summary_key
+from src.routes.api_route import SIMPLE_MODEL, SNAPSHOT_PROMPT_VERSION
+from src.services.model_limiter import ModelBusy, ModelDeadlineExceeded
 
 
 class AIRouteTestCase(unittest.TestCase):
@@ -19,6 +22,7 @@ class AIRouteTestCase(unittest.TestCase):
         """Set up test client"""
         self.app = app.test_client()
         self.app.testing = True
+        summary_cache.invalidate()
 
     # ===== process_snapshot tests =====
     def test_process_snapshot_missing_snapshot_id(self):
@@ -75,6 +79,160 @@ class AIRouteTestCase(unittest.TestCase):
         self.assertIn('inserted', response.json)
         self.assertIn('summary', response.json)
 
+    @patch('src.routes.api_route.sb_select')
+    @patch('src.routes.api_route.sb_insert')
+    @patch('src.routes.api_route.simple_model.generate_content')
+    def test_process_snapshot_reuses_cached_summary(self, mock_generate, mock_sb_insert, mock_sb_select):
+        """Test the same diff is summarized once and later answers say cached"""
+        mock_sb_select.side_effect = [
+            [{"id": "snap-1", "user_id": "user-id", "file_path": "src/a.py", "changes": "+ x = 1\n"}],
+            [{"id": "snap-2", "user_id": "user-id", "file_path": "src/a.py", "changes": "+ x = 1   \r\n"}],
+        ]
+        mock_generate.return_value = MagicMock(text="Set x in src/a.py")
+        mock_sb_insert.return_value = [{"id": "feed-id"}]
+
+        first = self.app.post('/api/ai/process_snapshot', json={"snapshot_id": "snap-1", "team_id": "team-id"})
+        second = self.app.post('/api/ai/process_snapshot', json={"snapshot_id": "snap-2", "team_id": "team-id"})
+
+        self.assertEqual(mock_generate.call_count, 1)
+        self.assertFalse(first.json['cached'])
+        self.assertTrue(second.json['cached'])
+        self.assertEqual(second.json['summary'], "Set x in src/a.py")
+        self.assertEqual(mock_sb_insert.call_count, 2)
+
+    @patch('src.routes.api_route.sb_select')
+    @patch('src.routes.api_route.sb_insert')
+    @patch('src.routes.api_route.simple_model.generate_content')
+    def test_process_snapshot_fallback_not_cached(self, mock_generate, mock_sb_insert, mock_sb_select):
+        """Test a failed model call is retried on the next request"""
+        mock_sb_select.return_value = [{"id": "snap-1", "user_id": "user-id", "file_path": "src/a.py", "changes": "+ y"}]
+        mock_generate.side_effect = [RuntimeError("quota"), MagicMock(text="Added y")]
+        mock_sb_insert.return_value = [{"id": "feed-id"}]
+
+        first = self.app.post('/api/ai/process_snapshot', json={"snapshot_id": "snap-1", "team_id": "team-id"})
+        second = self.app.post('/api/ai/process_snapshot', json={"snapshot_id": "snap-1", "team_id": "team-id"})
+
+        self.assertIn("AI unavailable", first.json['summary'])
+        self.assertEqual(second.json['summary'], "Added y")
+        self.assertFalse(second.json['cached'])
+
+    @patch('src.routes.api_route.sb_select')
+    @patch('src.routes.api_route.sb_insert')
+    @patch('src.services.model_limiter.model_limiter.generate', side_effect=ModelBusy("full"))
+    def test_process_snapshot_limiter_fallback(self, mock_limited, mock_sb_insert, mock_sb_select):
+        """Test a saturated Gemini limiter yields the deterministic summary"""
+        mock_sb_select.return_value = [{"id": "snap-1", "user_id": "user-id", "file_path": "src/a.py", "changes": "+ z"}]
+        mock_sb_insert.return_value = [{"id": "feed-id"}]
+
+        response = self.app.post('/api/ai/process_snapshot', json={"snapshot_id": "snap-1", "team_id": "team-id"})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json['summary'], "Updated src/a.py (AI unavailable)")
+
+    @patch('src.routes.api_route.sb_select')
+    @patch('src.routes.api_route.sb_insert')
+    @patch('src.routes.api_route.simple_model.generate_content')
+    def test_process_snapshot_prompt_skips_lockfile(self, mock_generate, mock_sb_insert, mock_sb_select):
+        """Test the prompt carries the code hunk, not the lockfile noise before it"""
+        lock = "\n".join(["diff --git a/yarn.lock b/yarn.lock", "--- a/yarn.lock", "+++ b/yarn.lock",
+                          "@@ -1,200 +1,200 @@"] +
+                         [line for n in range(200) for line in (f"-dep{n}@1.0.0", f"+dep{n}@1.0.1")])
+        code = "\n".join(["diff --git a/src/auth.py b/src/auth.py", "--- a/src/auth.py", "+++ b/src/auth.py",
+                          "@@ -1,0 +1,2 @@", "+def login(user):", "+    return issue_token(user)"])
+        mock_sb_select.return_value = [{"id": "snap-1", "user_id": "user-id", "file_path": "src/auth.py",
+                                        "changes": lock + "\n" + code}]
+        mock_generate.return_value = MagicMock(text="Added login")
+        mock_sb_insert.return_value = [{"id": "feed-id"}]
+
+        self.app.post('/api/ai/process_snapshot', json={"snapshot_id": "snap-1", "team_id": "team-id", "max_chars": 1000})
+
+        prompt = mock_generate.call_args[0][0]
+        self.assertIn("+def login(user):", prompt)
+        self.assertNotIn("dep1@", prompt)
+
+    # ===== process_snapshots tests =====
+    def test_process_snapshots_requires_list(self):
+        """Test POST /api/ai/process_snapshots rejects a missing or empty list"""
+        for body in ({}, {"snapshot_ids": []}, {"snapshot_ids": "snap-1"}):
+            response = self.app.post('/api/ai/process_snapshots', json=body)
+            self.assertEqual(response.status_code, 400)
+
+    @patch('src.routes.api_route.BATCH_MAX_SNAPSHOTS', 2)
+    def test_process_snapshots_too_many(self):
+        """Test POST /api/ai/process_snapshots caps the batch size"""
+        response = self.app.post('/api/ai/process_snapshots', json={"snapshot_ids": ["a", "b", "c"]})
+
+        self.assertEqual(response.status_code, 400)
+
+    @patch('src.routes.api_route.sb_insert_many')
+    @patch('src.routes.api_route.sb_select')
+    @patch('src.routes.api_route.simple_model.generate_content')
+    def test_process_snapshots_one_call_each(self, mock_generate, mock_sb_select, mock_insert_many):
+        """Test a batch is one select, one packed model call and one insert"""
+        mock_sb_select.return_value = [
+            {"id": "s2", "user_id": "u1", "file_path": "src/b.py", "changes": "+ b"},
+            {"id": "s1", "user_id": "u1", "file_path": "src/a.py", "changes": "+ a"},
+        ]
+        mock_generate.return_value = MagicMock(text="[[1]] Added a in src/a.py\n[[2]] Added b in src/b.py\n")
+        mock_insert_many.side_effect = lambda table, rows: (rows, [])
+
+        response = self.app.post('/api/ai/process_snapshots', json={
+            "snapshot_ids": ["s1", "s2", "s3"], "team_id": "team-id"
+        })
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(mock_sb_select.call_count, 1)
+        self.assertEqual(mock_sb_select.call_args[0][1]["id"], 'in.("s1","s2","s3")')
+        self.assertEqual(mock_generate.call_count, 1)
+        self.assertIn("=== DIFF 2 ===", mock_generate.call_args[0][0])
+        table, rows = mock_insert_many.call_args[0]
+        self.assertEqual(table, "team_activity_feed")
+        self.assertEqual([r["summary"] for r in rows], ["Added a in src/a.py", "Added b in src/b.py"])
+        self.assertEqual([r["source_snapshot_id"] for r in rows], ["s1", "s2"])
+        self.assertEqual(response.json["missing"], ["s3"])
+        self.assertEqual(response.json["model_calls"], 1)
+
+    @patch('src.routes.api_route.sb_insert_many', side_effect=lambda table, rows: (rows, []))
+    @patch('src.routes.api_route.sb_select')
+    @patch('src.routes.api_route.simple_model.generate_content')
+    def test_process_snapshots_partial_answer_and_cache(self, mock_generate, mock_sb_select, mock_insert_many):
+        """Test unparsed lines fall back per file and cached diffs skip the model"""
+        summary_cache.put(summary_key(SIMPLE_MODEL, SNAPSHOT_PROMPT_VERSION, "src/c.py", "+ c"), "Added c")
+        mock_sb_select.return_value = [
+            {"id": "s1", "user_id": "u1", "file_path": "src/a.py", "changes": "+ a"},
+            {"id": "s2", "user_id": "u1", "file_path": "src/b.py", "changes": "+ b"},
+            {"id": "s3", "user_id": "u1", "file_path": "src/c.py", "changes": "+ c"},
+        ]
+        mock_generate.return_value = MagicMock(text="Sure! Here you go:\n[[2]] Added b")
+
+        response = self.app.post('/api/ai/process_snapshots', json={
+            "snapshot_ids": ["s1", "s2", "s3"], "team_id": "team-id"
+        })
+
+        self.assertNotIn("src/c.py", mock_generate.call_args[0][0])
+        self.assertEqual([s["summary"] for s in response.json["summaries"]],
+                         ["Updated src/a.py", "Added b", "Added c"])
+        self.assertEqual([s["cached"] for s in response.json["summaries"]], [False, False, True])
+
+    @patch('src.routes.api_route.BATCH_PACK_FILES', 2)
+    @patch('src.routes.api_route.sb_insert_many', side_effect=lambda table, rows: (rows, []))
+    @patch('src.routes.api_route.sb_select')
+    @patch('src.routes.api_route.simple_model.generate_content')
+    def test_process_snapshots_packs_and_fallback(self, mock_generate, mock_sb_select, mock_insert_many):
+        """Test large batches are split and a failed pack falls back"""
+        mock_sb_select.return_value = [
+            {"id": f"s{n}", "user_id": "u1", "file_path": f"src/{n}.py", "changes": f"+ {n}"} for n in range(3)
+        ]
+        mock_generate.side_effect = [MagicMock(text="[[1]] One\n[[2]] Two"), RuntimeError("quota")]
+
+        response = self.app.post('/api/ai/process_snapshots', json={
+            "snapshot_ids": ["s0", "s1", "s2"], "team_id": "team-id"
+        })
+
+        self.assertEqual(mock_generate.call_count, 2)
+        self.assertEqual([s["summary"] for s in response.json["summaries"]],
+                         ["One", "Two", "Updated src/2.py (AI unavailable)"])
+
     # ===== get_feed tests =====
     def test_get_feed_missing_team_id(self):
         """Test GET /api/ai/feed without team_id"""
@@ -83,8 +241,9 @@ class AIRouteTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertIn('error', response.json)
 
+    @patch('src.routes.api_route.lookup_users', return_value={})
     @patch('src.routes.api_route.sb_select')
-    def test_get_feed_success(self, mock_sb_select):
+    def test_get_feed_success(self, mock_sb_select, mock_lookup_users):
         """Test GET /api/ai/feed returns activity feed"""
         mock_sb_select.return_value = [
             {
@@ -108,8 +267,9 @@ class AIRouteTestCase(unittest.TestCase):
         self.assertIn('changes', data[0])
         self.assertIn('snapshot', data[0])
 
+    @patch('src.routes.api_route.lookup_users', return_value={})
     @patch('src.routes.api_route.sb_select')
-    def test_get_feed_with_limit(self, mock_sb_select):
+    def test_get_feed_with_limit(self, mock_sb_select, mock_lookup_users):
         """Test GET /api/ai/feed respects limit parameter"""
         mock_sb_select.return_value = []
 
@@ -119,6 +279,216 @@ class AIRouteTestCase(unittest.TestCase):
         call_params = mock_sb_select.call_args[0][1]
         self.assertEqual(call_params['limit'], '10')
 
+    @patch('src.routes.api_route.lookup_users')
+    @patch('src.routes.api_route.sb_select')
+    def test_get_feed_falls_back_to_email(self, mock_sb_select, mock_lookup_users):
+        """Test GET /api/ai/feed looks each distinct user up once"""
+        mock_sb_select.return_value = [
+            {"id": "feed-1", "user_id": "user-id-1", "file_snapshots": None},
+            {"id": "feed-2", "user_id": "user-id-1", "file_snapshots": None},
+        ]
+        mock_lookup_users.return_value = {"user-id-1": {"name": None, "email": "dev@example.com"}}
+
+        response = self.app.get('/api/ai/feed?team_id=team-id')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_sb_select.call_count, 1)
+        self.assertEqual(mock_lookup_users.call_args[0][0], ["user-id-1"])
+        self.assertEqual([r["display_name"] for r in response.json], ["dev@example.com"] * 2)
+
+    @patch('src.routes.api_route.lookup_users', return_value={})
+    @patch('src.routes.api_route.sb_select')
+    def test_get_feed_cursor_envelope(self, mock_sb_select, mock_lookup_users):
+        """Test ?cursor= returns items and next_cursor, and the cursor filters the next page"""
+        mock_sb_select.side_effect = [
+            [{"id": "b", "pinned": False, "created_at": "2024-01-02", "file_snapshots": None},
+             {"id": "a", "pinned": False, "created_at": "2024-01-01", "file_snapshots": None}],
+            [],
+        ]
+
+        first = self.app.get('/api/ai/feed?team_id=team-id&limit=2&cursor=')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([r["id"] for r in first.json["items"]], ["b", "a"])
+        self.assertTrue(first.json["next_cursor"])
+
+        second = self.app.get(f'/api/ai/feed?team_id=team-id&limit=2&cursor={first.json["next_cursor"]}')
+        self.assertEqual(second.json, {"items": [], "next_cursor": None})
+        self.assertIn('id.lt."a"', mock_sb_select.call_args[0][1]["or"])
+
+    @patch('src.routes.api_route.lookup_users', return_value={})
+    @patch('src.routes.api_route.sb_select')
+    def test_get_feed_legacy_array_sets_cursor_header(self, mock_sb_select, mock_lookup_users):
+        """Test the bare-array response carries the cursor in X-Next-Cursor"""
+        mock_sb_select.return_value = [{"id": "a", "pinned": None, "created_at": "2024-01-01", "file_snapshots": None}]
+
+        response = self.app.get('/api/ai/feed?team_id=team-id&limit=1')
+
+        self.assertIsInstance(response.json, list)
+        self.assertTrue(response.headers.get("X-Next-Cursor"))
+
+    def test_get_feed_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        response = self.app.get('/api/ai/feed?team_id=team-id&cursor=not-a-cursor')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_feed_invalid_since(self):
+        """Test a since value that is neither a watermark nor a timestamp is rejected"""
+        response = self.app.get('/api/ai/feed?team_id=team-id&since=yesterday')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_feed_since_with_cursor(self):
+        """Test since and cursor cannot be combined"""
+        response = self.app.get('/api/ai/feed?team_id=team-id&since=2025-01-01T00:00:00Z&cursor=')
+
+        self.assertEqual(response.status_code, 400)
+
+    @patch('src.routes.api_route.sb_select')
+    def test_get_feed_since_unchanged(self, mock_sb_select):
+        """Test a poll with nothing new is an empty 204 that keeps the watermark"""
+        mock_sb_select.return_value = []
+
+        response = self.app.get('/api/ai/feed?team_id=team-id&since=2025-01-01T00:00:00+00:00')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response.data, b"")
+        self.assertEqual(response.headers['X-Feed-Watermark'], '2025-01-01T00:00:00+00:00')
+        params = mock_sb_select.call_args[0][1]
+        self.assertEqual(params['updated_at'], 'gt.2025-01-01T00:00:00+00:00')
+        self.assertEqual(params['order'], 'updated_at.asc,id.asc')
+
+    @patch('src.routes.api_route.lookup_users', return_value={})
+    @patch('src.routes.api_route.sb_select')
+    def test_get_feed_since_advances_watermark(self, mock_sb_select, mock_lookup_users):
+        """Test changed rows come back with a watermark after the last one"""
+        from src.utils.cursor import decode_cursor, encode_cursor
+        mock_sb_select.return_value = [
+            {"id": "feed-2", "pinned": False, "updated_at": "2025-01-02T00:00:00+00:00"},
+        ]
+        since = encode_cursor({"u": "2025-01-01T00:00:00+00:00", "i": "feed-1"})
+
+        response = self.app.get(f'/api/ai/feed?team_id=team-id&since={since}&fields=id,pinned')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, [{"id": "feed-2", "pinned": False, "updated_at": "2025-01-02T00:00:00+00:00"}])
+        self.assertEqual(decode_cursor(response.headers['X-Feed-Watermark']),
+                         {"u": "2025-01-02T00:00:00+00:00", "i": "feed-2"})
+        params = mock_sb_select.call_args[0][1]
+        self.assertIn('updated_at', params['select'])
+        self.assertIn('updated_at.gt."2025-01-01T00:00:00+00:00"', params['or'])
+
+    @patch('src.routes.api_route.lookup_users', return_value={})
+    @patch('src.routes.api_route.sb_select')
+    def test_get_feed_truncates_heavy_fields(self, mock_sb_select, mock_lookup_users):
+        """Test changes/snapshot are cut to a preview with truncation flags"""
+        from src.routes import api_route
+        big = "x" * (api_route.FEED_PREVIEW_CHARS + 10)
+        mock_sb_select.side_effect = lambda table, params: [
+            {"id": "feed-1", "user_id": "u1", "file_snapshots": {"changes": "small diff", "snapshot": big}}
+        ] if table == "team_activity_feed" else []
+
+        row = self.app.get('/api/ai/feed?team_id=team-id').json[0]
+
+        self.assertEqual(row["changes"], "small diff")
+        self.assertFalse(row["changes_truncated"])
+        self.assertEqual(len(row["snapshot"]), api_route.FEED_PREVIEW_CHARS)
+        self.assertTrue(row["snapshot_truncated"])
+
+        row = self.app.get('/api/ai/feed?team_id=team-id&full=1').json[0]
+        self.assertEqual(row["snapshot"], big)
+
+    @patch('src.routes.api_route.lookup_users', return_value={})
+    @patch('src.routes.api_route.sb_select')
+    def test_get_feed_decodes_compressed_snapshots(self, mock_sb_select, mock_lookup_users):
+        """Test compressed changes are decoded before the preview is cut"""
+        from src.utils.snapshot_codec import encode_text
+        diff = "+ line\n" * 500
+        mock_sb_select.return_value = [
+            {"id": "feed-1", "file_snapshots": {"changes": encode_text(diff, codec="zlib"), "snapshot": "plain"}}
+        ]
+
+        row = self.app.get('/api/ai/feed?team_id=team-id&full=1').json[0]
+
+        self.assertEqual(row["changes"], diff)
+        self.assertEqual(row["snapshot"], "plain")
+
+    @patch('src.routes.api_route.lookup_users')
+    @patch('src.routes.api_route.sb_select')
+    def test_get_feed_fields_projection(self, mock_sb_select, mock_lookup_users):
+        """Test fields= narrows the select, skips name lookups and trims the rows"""
+        mock_sb_select.return_value = [{"id": "feed-1", "summary": "Added feature", "pinned": False, "created_at": "2024-01-01"}]
+
+        response = self.app.get('/api/ai/feed?team_id=team-id&fields=id,summary')
+
+        self.assertEqual(response.json, [{"id": "feed-1", "summary": "Added feature"}])
+        select = mock_sb_select.call_args[0][1]["select"]
+        self.assertNotIn("file_snapshots", select)
+        self.assertEqual(mock_sb_select.call_count, 1)  # no user_profiles lookup
+        mock_lookup_users.assert_not_called()
+
+    @patch('src.routes.api_route.lookup_users', return_value={})
+    @patch('src.routes.api_route.sb_select')
+    def test_get_feed_not_modified_uses_light_probe(self, mock_sb_select, mock_lookup_users):
+        """Test a matching If-None-Match is answered from a probe without snapshots or lookups"""
+        mock_sb_select.side_effect = lambda table, params: [
+            {"id": "feed-1", "user_id": "u1", "summary": "Added feature", "pinned": False, "created_at": "2024-01-01",
+             "file_snapshots": {"changes": "diff", "snapshot": "file"}}
+        ] if table == "team_activity_feed" else []
+
+        first = self.app.get('/api/ai/feed?team_id=team-id')
+        mock_sb_select.reset_mock()
+        mock_lookup_users.reset_mock()
+        second = self.app.get('/api/ai/feed?team_id=team-id', headers={'If-None-Match': first.headers['ETag']})
+
+        self.assertTrue(first.headers['ETag'].startswith('W/'))
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(mock_sb_select.call_count, 1)
+        self.assertNotIn('file_snapshots', mock_sb_select.call_args[0][1]['select'])
+        mock_lookup_users.assert_not_called()
+
+    def test_get_feed_unknown_field(self):
+        """Test fields= rejects unknown names"""
+        response = self.app.get('/api/ai/feed?team_id=team-id&fields=id,password')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json['error'])
+
+    @patch('src.routes.api_route.sb_select')
+    def test_get_feed_snapshot(self, mock_sb_select):
+        """Test GET /api/ai/feed/<id>/snapshot returns the full payload"""
+        mock_sb_select.return_value = [
+            {"id": "feed-1", "source_snapshot_id": "snap-1", "file_snapshots": {"changes": "diff", "snapshot": "file"}}
+        ]
+
+        response = self.app.get('/api/ai/feed/feed-1/snapshot')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["changes"], "diff")
+        self.assertEqual(response.json["snapshot"], "file")
+        self.assertEqual(mock_sb_select.call_args[0][1]["id"], "eq.feed-1")
+
+    @patch('src.routes.api_route.sb_select')
+    def test_get_feed_snapshot_decodes_compressed(self, mock_sb_select):
+        """Test compressed snapshot text is returned decoded"""
+        from src.utils.snapshot_codec import encode_text
+        diff = "+ line\n" * 500
+        mock_sb_select.return_value = [
+            {"id": "feed-1", "file_snapshots": {"changes": encode_text(diff, codec="zlib"), "snapshot": "file"}}
+        ]
+
+        response = self.app.get('/api/ai/feed/feed-1/snapshot')
+
+        self.assertEqual(response.json["changes"], diff)
+        self.assertEqual(response.json["snapshot"], "file")
+
+    @patch('src.routes.api_route.sb_select', return_value=[])
+    def test_get_feed_snapshot_not_found(self, mock_sb_select):
+        """Test GET /api/ai/feed/<id>/snapshot for a missing row"""
+        response = self.app.get('/api/ai/feed/missing/snapshot')
+
+        self.assertEqual(response.status_code, 404)
+
     # ===== live_share_event tests =====
     def test_live_share_event_missing_fields(self):
         """Test POST /api/ai/live_share_event with missing required fields"""
@@ -196,14 +566,12 @@ class AIRouteTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertIn('error', response.json)
 
-    @patch('src.routes.api_route.sb_select')
+    @patch('src.routes.api_route.display_names')
     @patch('src.routes.api_route.sb_insert')
-    def test_participant_status_event_joined(self, mock_sb_insert, mock_sb_select):
+    def test_participant_status_event_joined(self, mock_sb_insert, mock_display_names):
         """Test POST /api/ai/participant_status_event with joined users"""
-        # Mock user profiles
-        mock_sb_select.return_value = [
-            {"user_id": "user1", "name": "User One"}
-        ]
+        # Mock user directory
+        mock_display_names.return_value = {"user1": "User One"}
         mock_sb_insert.return_value = [{"id": "feed-id"}]
 
         response = self.app.post('/api/ai/participant_status_event', json={
@@ -215,15 +583,13 @@ class AIRouteTestCase(unittest.TestCase):
         
         self.assertEqual(response.status_code, 201)
         self.assertIn('event_header', response.json)
-        self.assertIn('joined the team', response.json['event_header'])
+        self.assertEqual(response.json['event_header'], 'User One has joined the team')
 
-    @patch('src.routes.api_route.sb_select')
+    @patch('src.routes.api_route.display_names')
     @patch('src.routes.api_route.sb_insert')
-    def test_participant_status_event_left(self, mock_sb_insert, mock_sb_select):
+    def test_participant_status_event_left(self, mock_sb_insert, mock_display_names):
         """Test POST /api/ai/participant_status_event with left users"""
-        mock_sb_select.return_value = [
-            {"user_id": "user1", "name": "User One"}
-        ]
+        mock_display_names.return_value = {"user1": "User One"}
         mock_sb_insert.return_value = [{"id": "feed-id"}]
 
         response = self.app.post('/api/ai/participant_status_event', json={
@@ -234,7 +600,7 @@ class AIRouteTestCase(unittest.TestCase):
         })
         
         self.assertEqual(response.status_code, 201)
-        self.assertIn('left the team', response.json['event_header'])
+        self.assertEqual(response.json['event_header'], 'User One has left the team')
 
     # ===== live_share_update_link tests =====
     def test_live_share_update_link_missing_fields(self):
@@ -305,6 +671,23 @@ class AIRouteTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 201)
         self.assertIn('snapshot_id', response.json)
 
+    @patch('src.utils.snapshot_codec.WRITE_CODEC', 'zlib')
+    @patch('src.routes.api_route.sb_insert')
+    def test_live_share_summary_compresses_changes(self, mock_sb_insert):
+        """Test the stored diff is compressed when SNAPSHOT_COMPRESSION is on"""
+        from src.utils.snapshot_codec import decode_text
+        mock_sb_insert.return_value = [{"id": "snapshot-id"}]
+        diff = "diff --git a/x b/x\n" + "+ added\n" * 500
+
+        self.app.post('/api/ai/live_share_summary', json={
+            "session_id": "session-id", "team_id": "team-id", "user_id": "user-id", "changes": diff
+        })
+
+        stored = mock_sb_insert.call_args[0][1]["changes"]
+        self.assertTrue(stored.startswith("cz:v1:zlib:"))
+        self.assertLess(len(stored), len(diff))
+        self.assertEqual(decode_text(stored), diff)
+
     # ===== task_recommendations tests =====
     def test_task_recommendations_missing_team_id(self):
         """Test POST /api/ai/task_recommendations without team_id"""
@@ -351,9 +734,9 @@ class AIRouteTestCase(unittest.TestCase):
         self.assertIn('error', response.json)
 
     @patch('src.routes.api_route.sb_select')
-    @patch('src.routes.api_route.sb_insert')
+    @patch('src.routes.api_route.sb_insert_many')
     @patch('src.routes.api_route.advance_model.generate_content')
-    def test_task_recommendations_success(self, mock_generate, mock_sb_insert, mock_sb_select):
+    def test_task_recommendations_success(self, mock_generate, mock_sb_insert_many, mock_sb_select):
         """Test POST /api/ai/task_recommendations successfully creates recommendations"""
         # Mock team members and profiles
         def sb_select_side_effect(table, params):
@@ -376,7 +759,7 @@ class AIRouteTestCase(unittest.TestCase):
         mock_generate.return_value = mock_ai_response
 
         # Mock feed insertion
-        mock_sb_insert.return_value = [{"id": "feed-id"}]
+        mock_sb_insert_many.return_value = ([{"id": "feed-id"}], [])
 
         response = self.app.post('/api/ai/task_recommendations', json={
             "team_id": "team-id",
@@ -390,6 +773,56 @@ class AIRouteTestCase(unittest.TestCase):
         self.assertIn('recommendations_count', response.json)
         self.assertTrue(response.json['success'])
 
+    @patch('src.routes.api_route.sb_select')
+    @patch('src.routes.api_route.sb_insert_many')
+    @patch('src.services.model_limiter.model_limiter.generate', side_effect=ModelDeadlineExceeded("slow"))
+    def test_task_recommendations_model_unavailable(self, mock_limited, mock_sb_insert_many, mock_sb_select):
+        """Test a limiter rejection answers 503 with Retry-After instead of hanging"""
+        mock_sb_select.side_effect = lambda table, params: (
+            [{"user_id": "user1", "role": "member"}] if table == "team_membership"
+            else [{"user_id": "user1", "name": "Dev", "interests": ["Python"], "custom_skills": []}]
+        )
+
+        response = self.app.post('/api/ai/task_recommendations', json={
+            "team_id": "team-id",
+            "user_id": "admin-id",
+            "unassigned_tasks": [{"key": "PROJ-1", "summary": "Build it", "description": ""}]
+        })
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+        mock_sb_insert_many.assert_not_called()
+
+    @patch('src.routes.api_route.sb_select')
+    @patch('src.routes.api_route.sb_insert_many')
+    @patch('src.routes.api_route.advance_model.generate_content')
+    def test_task_recommendations_single_bulk_insert(self, mock_generate, mock_sb_insert_many, mock_sb_select):
+        """Test all parsed recommendations are written in one bulk insert"""
+        mock_sb_select.side_effect = lambda table, params: (
+            [{"user_id": "user1", "role": "member"}] if table == "team_membership"
+            else [{"user_id": "user1", "name": "Dev", "interests": ["Python"], "custom_skills": []}]
+        )
+        mock_ai_response = MagicMock()
+        mock_ai_response.text = "PROJ-1|Dev|Python\nPROJ-2|Dev|Python\nnot a recommendation"
+        mock_generate.return_value = mock_ai_response
+        mock_sb_insert_many.return_value = (
+            [{"id": "feed-1"}],
+            [{"index": 1, "row": {"file_path": "PROJ-2"}, "error": "Supabase REST 400"}]
+        )
+
+        response = self.app.post('/api/ai/task_recommendations', json={
+            "team_id": "team-id",
+            "user_id": "admin-id",
+            "unassigned_tasks": [{"key": "PROJ-1", "summary": "A"}, {"key": "PROJ-2", "summary": "B"}]
+        })
+
+        self.assertEqual(response.status_code, 201)
+        mock_sb_insert_many.assert_called_once()
+        table, rows = mock_sb_insert_many.call_args[0]
+        self.assertEqual(table, "team_activity_feed")
+        self.assertEqual([r["file_path"] for r in rows], ["PROJ-1", "PROJ-2"])
+        self.assertEqual(response.json['recommendations_count'], 1)
+
     @patch('src.routes.api_route.sb_select')
     def test_task_recommendations_no_skills(self, mock_sb_select):
         """Test POST /api/ai/task_recommendations when no members have skills"""
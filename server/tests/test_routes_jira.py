@@ -126,6 +126,21 @@ class JiraRouteTestCase(unittest.TestCase):
             call_args = mock_sb_insert.call_args[0][1]
             self.assertEqual(call_args['jira_url'], 'https://test.atlassian.net')
 
+    @patch('src.routes.jira_route.sb_select')
+    def test_get_jira_config_not_modified(self, mock_sb_select):
+        """Test GET /api/jira/config/<team_id> revalidates with ETags"""
+        mock_sb_select.return_value = [{"id": "config-id", "team_id": "team-id", "jira_project_key": "CA"}]
+
+        first = self.app.get('/api/jira/config/team-id')
+        second = self.app.get('/api/jira/config/team-id', headers={'If-None-Match': first.headers['ETag']})
+        mock_sb_select.return_value = [{"id": "config-id", "team_id": "team-id", "jira_project_key": "NEW"}]
+        third = self.app.get('/api/jira/config/team-id', headers={'If-None-Match': first.headers['ETag']})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(third.status_code, 200)
+        self.assertEqual(third.json['jira_project_key'], 'NEW')
+
     def test_get_jira_config_missing_team_id(self):
         """Test GET /api/jira/config/<team_id> without team_id"""
         response = self.app.get('/api/jira/config/')
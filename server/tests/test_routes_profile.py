@@ -63,6 +63,20 @@ class ProfileRouteTestCase(unittest.TestCase):
         self.assertEqual(data['profile']['name'], 'Test User')
         self.assertEqual(len(data['profile']['interests']), 2)
 
+    @patch('src.routes.profile_route.sb_select')
+    def test_get_profile_not_modified(self, mock_sb_select):
+        """Test GET /api/profile answers a matching If-None-Match with 304"""
+        mock_sb_select.return_value = [{"id": "profile-id", "user_id": "test-user-id", "name": "Test User"}]
+        headers = {'Authorization': 'Bearer test-token'}
+
+        first = self.app.get('/api/profile/?user_id=test-user-id', headers=headers)
+        etag = first.headers.get('ETag')
+        second = self.app.get('/api/profile/?user_id=test-user-id', headers=dict(headers, **{'If-None-Match': etag}))
+
+        self.assertTrue(etag)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.data, b'')
+
     @patch('src.routes.profile_route.sb_select')
     def test_get_profile_not_found(self, mock_sb_select):
         """Test GET /api/profile when profile doesn't exist"""
@@ -158,6 +172,21 @@ class ProfileRouteTestCase(unittest.TestCase):
         self.assertIn('profile', data)
         self.assertEqual(data['message'], 'Profile updated successfully')
 
+    @patch('src.routes.profile_route.user_directory')
+    @patch('src.routes.profile_route.sb_select')
+    @patch('src.routes.profile_route.sb_update')
+    def test_save_profile_invalidates_directory(self, mock_sb_update, mock_sb_select, mock_directory):
+        """Test POST /api/profile drops the cached display name for the user"""
+        mock_sb_select.return_value = [{"id": "existing-id"}]
+        mock_sb_update.return_value = [{"id": "existing-id", "user_id": "test-user", "name": "Renamed"}]
+
+        response = self.app.post('/api/profile/',
+                                json={"user_id": "test-user", "name": "Renamed"},
+                                headers={'Authorization': 'Bearer test-token'})
+
+        self.assertEqual(response.status_code, 200)
+        mock_directory.invalidate.assert_called_once_with("test-user")
+
     @patch('src.routes.profile_route.sb_select')
     @patch('src.routes.profile_route.sb_insert')
     def test_save_profile_with_empty_arrays(self, mock_sb_insert, mock_sb_select):
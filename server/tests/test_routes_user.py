@@ -17,7 +17,7 @@ class UserRouteTestCase(unittest.TestCase):
         self.app = app.test_client()
         self.app.testing = True
 
-    @patch('src.routes.user_route.requests.get')
+    @patch('src.routes.user_route.sb_auth_get')
     def test_get_user_success(self, mock_requests_get):
         """Test GET /users/<user_id> with valid token"""
         mock_response = MagicMock()
@@ -44,7 +44,7 @@ class UserRouteTestCase(unittest.TestCase):
         self.assertEqual(data['status'], 'ACTIVE')
         self.assertFalse(data['is_locked'])
 
-    @patch('src.routes.user_route.requests.get')
+    @patch('src.routes.user_route.sb_auth_get')
     def test_get_user_invalid_token(self, mock_requests_get):
         """Test GET /users/<user_id> with invalid token"""
         mock_response = MagicMock()
@@ -58,7 +58,7 @@ class UserRouteTestCase(unittest.TestCase):
         self.assertIn('error', response.json)
         self.assertEqual(response.json['error'], 'Invalid or expired token')
 
-    @patch('src.routes.user_route.requests.get')
+    @patch('src.routes.user_route.sb_auth_get')
     def test_get_user_with_full_name_only(self, mock_requests_get):
         """Test GET /users/<user_id> when only full_name is provided"""
         mock_response = MagicMock()
@@ -80,7 +80,7 @@ class UserRouteTestCase(unittest.TestCase):
         self.assertEqual(data['first_name'], 'Jane')
         self.assertEqual(data['last_name'], 'Smith')
 
-    @patch('src.routes.user_route.requests.get')
+    @patch('src.routes.user_route.sb_auth_get')
     def test_get_user_with_no_metadata(self, mock_requests_get):
         """Test GET /users/<user_id> when user_metadata is empty"""
         mock_response = MagicMock()
@@ -100,7 +100,7 @@ class UserRouteTestCase(unittest.TestCase):
         self.assertEqual(data['first_name'], 'User')
         self.assertEqual(data['last_name'], '')
 
-    @patch('src.routes.user_route.requests.get')
+    @patch('src.routes.user_route.sb_auth_get')
     def test_get_user_default_settings(self, mock_requests_get):
         """Test GET /users/<user_id> returns correct default settings"""
         mock_response = MagicMock()
@@ -126,7 +126,7 @@ class UserRouteTestCase(unittest.TestCase):
         self.assertEqual(settings['suspend_rate'], 0.3)
         self.assertFalse(settings['intervened'])
 
-    @patch('src.routes.user_route.requests.get')
+    @patch('src.routes.user_route.sb_auth_get')
     def test_get_user_missing_config(self, mock_requests_get):
         """Test GET /users/<user_id> when backend config is missing"""
         # Mock request to return 401 or error due to missing config
@@ -141,7 +141,7 @@ class UserRouteTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 401)
         self.assertIn('error', response.json)
 
-    @patch('src.routes.user_route.requests.get')
+    @patch('src.routes.user_route.sb_auth_get')
     def test_get_user_timeout(self, mock_requests_get):
         """Test GET /users/<user_id> handles timeout"""
         mock_requests_get.side_effect = Exception("Connection timeout")
@@ -151,7 +151,7 @@ class UserRouteTestCase(unittest.TestCase):
         self.assertEqual(response.status_code, 500)
         self.assertIn('error', response.json)
 
-    @patch('src.routes.user_route.requests.get')
+    @patch('src.routes.user_route.sb_auth_get')
     def test_get_user_with_single_word_name(self, mock_requests_get):
         """Test GET /users/<user_id> when full_name is a single word"""
         mock_response = MagicMock()
@@ -0,0 +1,156 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+
+os.environ['SUPABASE_URL'] = 'https://test.supabase.co'
+os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test-service-key'
+
+from src.database import db
+from src.database.cache import SelectCache, make_key, parse_ttls, write_constraints
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SelectCacheTestCase(unittest.TestCase):
+    """Test cases for the sb_select read-through cache"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = SelectCache({"user_profiles": 60, "team_activity_feed": 10}, max_entries=3, clock=self.clock)
+
+    def test_parse_ttls(self):
+        """Test SB_CACHE_TTLS parsing skips malformed items"""
+        self.assertEqual(parse_ttls("user_profiles=60, team_membership=30,bad,=5"),
+                         {"user_profiles": 60.0, "team_membership": 30.0})
+
+    def test_key_normalizes_param_order_and_in_lists(self):
+        """Test equivalent params map to the same cache key"""
+        a = make_key("user_profiles", {"select": "name", "user_id": "in.(b,a)"})
+        b = make_key("user_profiles", {"user_id": "in.(a,b)", "select": "name"})
+        self.assertEqual(a, b)
+
+    def test_hit_miss_and_ttl_expiry(self):
+        """Test entries are served until their table TTL elapses"""
+        params = {"user_id": "eq.u1"}
+        self.assertEqual(self.cache.get("user_profiles", params), (False, None))
+        self.cache.put("user_profiles", params, "[1]")
+        self.assertEqual(self.cache.get("user_profiles", params), (True, "[1]"))
+
+        self.clock.now = 61
+        self.assertEqual(self.cache.get("user_profiles", params), (False, None))
+        stats = self.cache.stats()["tables"]["user_profiles"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+        self.assertAlmostEqual(stats["hit_ratio"], 1 / 3)
+
+    def test_uncached_table_is_ignored(self):
+        """Test tables without a TTL are never stored"""
+        self.cache.put("notes", {}, "[]")
+        self.assertFalse(self.cache.enabled_for("notes"))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_lru_bound(self):
+        """Test the least recently used entry is evicted past max_entries"""
+        for i in range(3):
+            self.cache.put("user_profiles", {"user_id": f"eq.u{i}"}, str(i))
+        self.cache.get("user_profiles", {"user_id": "eq.u0"})
+        self.cache.put("user_profiles", {"user_id": "eq.u3"}, "3")
+
+        self.assertTrue(self.cache.get("user_profiles", {"user_id": "eq.u0"})[0])
+        self.assertFalse(self.cache.get("user_profiles", {"user_id": "eq.u1"})[0])
+        self.assertEqual(self.cache.stats()["tables"]["user_profiles"]["evictions"], 1)
+
+    def test_write_invalidates_only_overlapping_filters(self):
+        """Test a write keeps entries whose eq filter is disjoint from the written rows"""
+        self.cache.put("user_profiles", {"user_id": "eq.u1"}, "a")
+        self.cache.put("user_profiles", {"user_id": "eq.u2"}, "b")
+        self.cache.put("user_profiles", {"select": "name"}, "all")
+
+        dropped = self.cache.invalidate("user_profiles", write_constraints({"user_id": "eq.u1"}, {"name": "x"}))
+
+        self.assertEqual(dropped, 2)
+        self.assertTrue(self.cache.get("user_profiles", {"user_id": "eq.u2"})[0])
+        self.assertFalse(self.cache.get("user_profiles", {"user_id": "eq.u1"})[0])
+
+    def test_update_moving_rows_into_filter_invalidates(self):
+        """Test an update whose new value matches a cached filter drops that entry"""
+        self.cache.put("team_activity_feed", {"pinned": "eq.true"}, "pinned")
+        self.cache.invalidate("team_activity_feed",
+                              write_constraints({"pinned": "eq.false"}, {"pinned": True}))
+        self.assertFalse(self.cache.get("team_activity_feed", {"pinned": "eq.true"})[0])
+
+    def test_insert_invalidates_matching_rows(self):
+        """Test inserted rows are matched against cached filters"""
+        self.cache.put("team_activity_feed", {"team_id": "eq.t1"}, "t1")
+        self.cache.put("team_activity_feed", {"team_id": "eq.t2"}, "t2")
+        self.cache.invalidate("team_activity_feed", write_constraints(body=[{"team_id": "t1"}], insert=True))
+
+        self.assertFalse(self.cache.get("team_activity_feed", {"team_id": "eq.t1"})[0])
+        self.assertTrue(self.cache.get("team_activity_feed", {"team_id": "eq.t2"})[0])
+
+    def test_write_to_embedded_table_invalidates_parent_reads(self):
+        """Test reads that embed a resource are dropped when that resource changes"""
+        params = {"select": "id,file_snapshots(changes)", "team_id": "eq.t1"}
+        self.cache.put("team_activity_feed", params, "feed")
+        self.cache.invalidate("file_snapshots", write_constraints({"id": "eq.s1"}))
+        self.assertFalse(self.cache.get("team_activity_feed", params)[0])
+
+    def test_put_skipped_when_write_raced_the_read(self):
+        """Test a read that started before a write is not cached"""
+        params = {"user_id": "eq.u1"}
+        generation = self.cache.generation("user_profiles", params)
+        self.cache.invalidate("user_profiles", write_constraints({"user_id": "eq.u1"}))
+        self.cache.put("user_profiles", params, "stale", generation)
+        self.assertFalse(self.cache.get("user_profiles", params)[0])
+
+
+class CachedSelectTestCase(unittest.TestCase):
+    """Test cases for sb_select/sb_update cache integration"""
+
+    def setUp(self):
+        self.cache = SelectCache({"user_profiles": 60})
+        patcher = patch('src.database.db.select_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _response(self, text):
+        response = MagicMock()
+        response.status_code = 200
+        response.text = text
+        response.content = text.encode()
+        return response
+
+    @patch('src.database.db._http')
+    def test_select_served_from_cache_until_write(self, mock_http):
+        """Test repeated selects hit the cache and an update re-fetches"""
+        mock_http.return_value.get.return_value = self._response('[{"user_id": "u1", "name": "A"}]')
+        mock_http.return_value.patch.return_value = self._response('[]')
+        params = {"select": "user_id,name", "user_id": "eq.u1"}
+
+        first = db.sb_select("user_profiles", params)
+        first[0]["name"] = "mutated by caller"
+        second = db.sb_select("user_profiles", params)
+        self.assertEqual(second[0]["name"], "A")
+        self.assertEqual(mock_http.return_value.get.call_count, 1)
+
+        db.sb_update("user_profiles", {"user_id": "eq.u1"}, {"name": "B"})
+        db.sb_select("user_profiles", params)
+        self.assertEqual(mock_http.return_value.get.call_count, 2)
+        self.assertEqual(db.cache_stats()["tables"]["user_profiles"]["invalidations"], 1)
+
+    @patch('src.database.db._http')
+    def test_cache_bypass(self, mock_http):
+        """Test cache=False always goes upstream"""
+        mock_http.return_value.get.return_value = self._response('[]')
+        db.sb_select("user_profiles", {"user_id": "eq.u1"}, cache=False)
+        db.sb_select("user_profiles", {"user_id": "eq.u1"}, cache=False)
+        self.assertEqual(mock_http.return_value.get.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import threading
+import time
+
+os.environ['SUPABASE_URL'] = 'https://test.supabase.co'
+os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test-service-key'
+
+from src.database import db
+from src.database.singleflight import SingleFlight
+
+
+class SingleFlightTestCase(unittest.TestCase):
+    """Test cases for coalescing identical concurrent calls"""
+
+    def _run_concurrently(self, flight, key, fn, callers):
+        results, errors = [], []
+
+        def worker():
+            try:
+                results.append(flight.do(key, fn))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(callers)]
+        for t in threads:
+            t.start()
+        return threads, results, errors
+
+    def test_concurrent_callers_share_one_call(self):
+        """Test callers arriving while a call is in flight reuse its result"""
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            release.wait(2)
+            return "rows"
+
+        threads, results, _ = self._run_concurrently(flight, "k", fn, 5)
+        while flight.stats()["upstream_calls"] + flight.stats()["deduplicated"] < 5:
+            pass
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["rows"] * 5)
+        self.assertEqual(flight.stats()["deduplicated"], 4)
+        self.assertEqual(flight.stats()["in_flight"], 0)
+
+    def test_error_is_shared_with_waiters(self):
+        """Test every waiter sees the leader's exception"""
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def fn():
+            release.wait(2)
+            raise RuntimeError("Supabase REST 500")
+
+        threads, results, errors = self._run_concurrently(flight, "k", fn, 3)
+        while flight.stats()["upstream_calls"] + flight.stats()["deduplicated"] < 3:
+            pass
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 3)
+
+    def test_sequential_calls_are_not_cached(self):
+        """Test a finished call is forgotten"""
+        flight = SingleFlight()
+        fn = MagicMock(return_value=1)
+        flight.do("k", fn)
+        flight.do("k", fn)
+        self.assertEqual(fn.call_count, 2)
+
+
+class CoalescedSelectTestCase(unittest.TestCase):
+    """Test cases for sb_select request coalescing"""
+
+    @patch('src.database.db._http')
+    def test_each_caller_gets_its_own_rows(self, mock_http):
+        """Test shared responses are decoded per caller"""
+        release = threading.Event()
+
+        def get(*args, **kwargs):
+            release.wait(2)
+            response = MagicMock()
+            response.status_code = 200
+            response.text = '[{"id": "1"}]'
+            response.content = b'[{"id": "1"}]'
+            return response
+        mock_http.return_value.get.side_effect = get
+
+        before = db.coalesce_stats()["deduplicated"]
+        results, errors = [], []
+
+        def worker():
+            try:
+                results.append(db.sb_select("team_activity_feed", {"team_id": "eq.t"}))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for t in threads:
+            t.start()
+        deadline = time.monotonic() + 2
+        while db.coalesce_stats()["deduplicated"] < before + 2 and not errors and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join(2)
+
+        self.assertEqual(errors, [])
+        self.assertGreaterEqual(db.coalesce_stats()["deduplicated"], before + 2)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(mock_http.return_value.get.call_count, 1)
+        results[0][0]["id"] = "mutated"
+        self.assertEqual(results[1][0]["id"], "1")
+
+    @patch('src.database.db._http')
+    def test_write_starts_a_new_flight(self, mock_http):
+        """Test a read issued after a local write does not join an older flight"""
+        mock_http.return_value.delete.return_value = MagicMock(status_code=204, text='', content=b'')
+        key_before = db.select_cache.generation("notes", {})
+        db.sb_delete("notes", {"id": "eq.1"})
+        self.assertNotEqual(key_before, db.select_cache.generation("notes", {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from unittest.mock import patch
+import base64
+import random
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from src.utils import snapshot_codec
+from src.utils.snapshot_codec import encode_text, decode_text, is_encoded
+
+DIFF = "diff --git a/app.py b/app.py\n" + "+    return jsonify(rows)\n" * 200
+
+
+class SnapshotCodecTestCase(unittest.TestCase):
+    """Test cases for the compressed file_snapshots text encoding"""
+
+    def test_off_by_default(self):
+        """Test nothing is encoded unless SNAPSHOT_COMPRESSION is set"""
+        with patch.object(snapshot_codec, 'WRITE_CODEC', None):
+            self.assertEqual(encode_text(DIFF), DIFF)
+
+    def test_round_trip(self):
+        """Test every available codec round-trips and shrinks a diff"""
+        for codec in snapshot_codec.CODECS:
+            encoded = encode_text(DIFF, codec=codec)
+            self.assertTrue(encoded.startswith(f"cz:v1:{codec}:"))
+            self.assertLess(len(encoded), len(DIFF))
+            self.assertEqual(decode_text(encoded), DIFF)
+
+    def test_short_and_incompressible_text_stored_plain(self):
+        """Test small or non-shrinking values are left alone"""
+        self.assertEqual(encode_text("tiny", codec="zlib"), "tiny")
+        noise = base64.b64encode(random.Random(1).randbytes(3000)).decode()
+        self.assertEqual(encode_text(noise, codec="zlib"), noise)
+
+    def test_legacy_values_pass_through(self):
+        """Test plain text, None and non-strings decode to themselves"""
+        for value in (DIFF, "", None, 42):
+            self.assertEqual(decode_text(value), value)
+
+    def test_corrupt_or_unknown_values_pass_through(self):
+        """Test values that only look encoded are returned as stored"""
+        for value in ("cz:v1:zlib:not base64!", "cz:v1:lzma:AAAA",
+                      "cz:v1:zlib:" + base64.b64encode(b"not zlib").decode()):
+            self.assertEqual(decode_text(value), value)
+
+    def test_not_encoded_twice(self):
+        """Test an encoded value is not wrapped again"""
+        encoded = encode_text(DIFF, codec="zlib")
+        self.assertEqual(encode_text(encoded, codec="zlib"), encoded)
+        self.assertTrue(is_encoded(encoded))
+
+    def test_zlib_payload_format(self):
+        """Test the zlib form is plain base64 of zlib data, decodable by other readers"""
+        packed = encode_text(DIFF, codec="zlib")[len("cz:v1:zlib:"):]
+        self.assertEqual(zlib.decompress(base64.b64decode(packed)).decode(), DIFF)
+
+
+    @unittest.skipIf(zstandard is None, "zstandard not installed")
+    def test_zstd_round_trip(self):
+        """Test the zstd form round-trips and is a plain zstd frame in base64"""
+        encoded = encode_text(DIFF, codec="zstd")
+        self.assertTrue(encoded.startswith("cz:v1:zstd:"))
+        self.assertEqual(decode_text(encoded), DIFF)
+        packed = base64.b64decode(encoded[len("cz:v1:zstd:"):])
+        self.assertEqual(zstandard.ZstdDecompressor().decompress(packed).decode(), DIFF)
+
+    @unittest.skipIf(zstandard is None, "zstandard not installed")
+    def test_zstd_is_default_write_codec(self):
+        """Test SNAPSHOT_COMPRESSION=1 picks zstd when it is installed"""
+        with patch.object(snapshot_codec, '_MODE', "1"):
+            self.assertEqual(snapshot_codec._write_codec(), "zstd")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+from unittest.mock import patch
+import os
+import threading
+
+os.environ['SUPABASE_URL'] = 'https://test.supabase.co'
+os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test-service-key'
+
+from src.services.summary_cache import SummaryCache, SupabaseSummaryStore, normalize_diff, summary_key
+
+
+class FakeStore:
+    def __init__(self, rows=None, fail=False):
+        self.rows = dict(rows or {})
+        self.fail = fail
+
+    def get(self, key):
+        if self.fail:
+            raise RuntimeError("down")
+        return self.rows.get(key)
+
+    def put(self, key, summary, model=None):
+        if self.fail:
+            raise RuntimeError("down")
+        self.rows[key] = summary
+
+
+class SummaryCacheTestCase(unittest.TestCase):
+    """Test cases for the snapshot summary cache"""
+
+    def test_normalize_diff(self):
+        """Test line endings, trailing spaces and index lines do not change the key"""
+        a = "diff --git a/x b/x\nindex 1a2b3c4..5d6e7f8 100644\n+ x = 1\n"
+        b = "diff --git a/x b/x\r\nindex 9999999..0000000 100644\r\n+ x = 1   \r\n"
+        self.assertEqual(normalize_diff(a), normalize_diff(b))
+        self.assertEqual(summary_key("m", "1", "x", a), summary_key("m", "1", "x", b))
+
+    def test_key_covers_model_prompt_and_path(self):
+        """Test every key part changes the key"""
+        base = summary_key("m", "1", "x.py", "+ a")
+        self.assertNotEqual(base, summary_key("m2", "1", "x.py", "+ a"))
+        self.assertNotEqual(base, summary_key("m", "2", "x.py", "+ a"))
+        self.assertNotEqual(base, summary_key("m", "1", "y.py", "+ a"))
+        self.assertNotEqual(base, summary_key("m", "1", "x.py", "+ b"))
+
+    def test_get_or_create(self):
+        """Test the second call is a hit and empty answers are not cached"""
+        cache = SummaryCache()
+        self.assertEqual(cache.get_or_create("k", lambda: "Added a"), ("Added a", False))
+        self.assertEqual(cache.get_or_create("k", lambda: "other"), ("Added a", True))
+        self.assertEqual(cache.get_or_create("e", lambda: ""), ("", False))
+        self.assertIsNone(cache.get("e"))
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry goes first"""
+        cache = SummaryCache(max_entries=2)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        cache.get("a")
+        cache.put("c", "C")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "A")
+
+    def test_store_tier(self):
+        """Test the persistent tier serves misses and receives new summaries"""
+        store = FakeStore({"k": "From store"})
+        cache = SummaryCache(store=store)
+
+        self.assertEqual(cache.get_or_create("k", lambda: "unused"), ("From store", True))
+        cache.get_or_create("n", lambda: "New")
+        self.assertEqual(store.rows["n"], "New")
+        self.assertEqual(cache.stats()["store_hits"], 1)
+
+    def test_store_failure_degrades(self):
+        """Test a failing store never fails the summary"""
+        cache = SummaryCache(store=FakeStore(fail=True))
+        self.assertEqual(cache.get_or_create("k", lambda: "Added"), ("Added", False))
+        self.assertEqual(cache.get("k"), "Added")
+        self.assertEqual(cache.stats()["store_errors"], 2)
+
+    def test_concurrent_misses_share_one_call(self):
+        """Test simultaneous requests for one key run generate once"""
+        cache = SummaryCache()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def generate():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return "Added"
+
+        results = []
+        workers = [threading.Thread(target=lambda: results.append(cache.get_or_create("k", generate)))
+                   for _ in range(4)]
+        workers[0].start()
+        started.wait(2)
+        for w in workers[1:]:
+            w.start()
+        release.set()
+        for w in workers:
+            w.join(2)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([r[0] for r in results], ["Added"] * 4)
+
+    @patch('src.services.summary_cache.sb_insert')
+    @patch('src.services.summary_cache.sb_select')
+    def test_supabase_store(self, mock_sb_select, mock_sb_insert):
+        """Test the Supabase tier reads by key uncached and writes without failing on duplicates"""
+        mock_sb_select.return_value = [{"summary": "Stored"}]
+        store = SupabaseSummaryStore()
+
+        self.assertEqual(store.get("abc"), "Stored")
+        self.assertEqual(mock_sb_select.call_args[0][1]["key"], "eq.abc")
+        self.assertFalse(mock_sb_select.call_args[1]["cache"])
+        store.put("abc", "Stored", "gemini")
+        mock_sb_insert.assert_called_once_with("ai_summary_cache", {"key": "abc", "model": "gemini", "summary": "Stored"},
+                                              on_conflict="key")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+
+os.environ['SUPABASE_URL'] = 'https://test.supabase.co'
+os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test-service-key'
+
+from src.services.user_directory import UserDirectory, fetch_names
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class UserDirectoryTestCase(unittest.TestCase):
+    """Test cases for the shared user_id -> name/email directory"""
+
+    def make(self, names=None, clock=None):
+        fetch = MagicMock(side_effect=lambda ids: {uid: (names or {}).get(uid) for uid in ids})
+        emails = MagicMock()
+        emails.resolve.side_effect = lambda ids: {uid: f"{uid}@example.com" for uid in ids}
+        return UserDirectory(fetch=fetch, emails=emails, ttl=60, clock=clock or FakeClock()), fetch, emails
+
+    def test_batches_misses_and_caches(self):
+        """Test misses are fetched in one batch and a warm lookup makes no calls"""
+        directory, fetch, _ = self.make({"a": "Ann"})
+
+        self.assertEqual(directory.names(["a", "b", "a"]), {"a": "Ann", "b": None})
+        self.assertEqual(directory.names(["b", "a"]), {"a": "Ann", "b": None})
+
+        fetch.assert_called_once_with(["a", "b"])
+        self.assertEqual(directory.stats()["hits"], 2)
+
+    def test_lookup_combines_names_and_emails(self):
+        """Test lookup returns name and email per user"""
+        directory, _, _ = self.make({"a": "Ann"})
+
+        self.assertEqual(directory.lookup(["a", "b"]), {
+            "a": {"name": "Ann", "email": "a@example.com"},
+            "b": {"name": None, "email": "b@example.com"},
+        })
+
+    def test_display_names_fall_back_to_short_id(self):
+        """Test users without a profile name get a shortened id"""
+        directory, _, _ = self.make({"a": "Ann"})
+
+        self.assertEqual(directory.display_names(["a", "0123456789"]), {"a": "Ann", "0123456789": "01234567…"})
+
+    def test_invalidate_refetches(self):
+        """Test invalidate drops the user's name and email"""
+        directory, fetch, emails = self.make({"a": "Ann"})
+        directory.names(["a"])
+
+        directory.invalidate("a")
+        directory.names(["a"])
+
+        self.assertEqual(fetch.call_count, 2)
+        emails.invalidate.assert_called_once_with("a")
+
+    def test_entries_expire(self):
+        """Test names are refetched after the TTL"""
+        clock = FakeClock()
+        directory, fetch, _ = self.make({"a": "Ann"}, clock)
+        directory.names(["a"])
+        clock.now = 61
+        directory.names(["a"])
+
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_failed_fetch_not_cached(self):
+        """Test a failed profile query leaves ids out and is retried"""
+        fetch = MagicMock(side_effect=[RuntimeError("down"), {"a": "Ann"}])
+        directory = UserDirectory(fetch=fetch, emails=MagicMock(), ttl=60, clock=FakeClock())
+
+        self.assertEqual(directory.names(["a"]), {})
+        self.assertEqual(directory.names(["a"]), {"a": "Ann"})
+        self.assertEqual(directory.display_names(["a"]), {"a": "Ann"})
+
+    @patch('src.services.user_directory.BATCH_SIZE', 2)
+    @patch('src.services.user_directory.sb_select')
+    def test_fetch_names_batches_query(self, mock_sb_select):
+        """Test fetch_names issues one in.() query per batch"""
+        mock_sb_select.side_effect = [[{"user_id": "a", "name": "Ann"}], [{"user_id": "c", "name": ""}]]
+
+        self.assertEqual(fetch_names(["a", "b", "c"]), {"a": "Ann", "b": None, "c": None})
+        self.assertEqual([c[0][1]["user_id"] for c in mock_sb_select.call_args_list], ["in.(a,b)", "in.(c)"])
+
+
+if __name__ == '__main__':
+    unittest.main()
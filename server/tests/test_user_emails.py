@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import threading
+
+os.environ['SUPABASE_URL'] = 'https://test.supabase.co'
+os.environ['SUPABASE_SERVICE_ROLE_KEY'] = 'test-service-key'
+
+from src.services.user_emails import EmailResolver, fetch_email
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class EmailResolverTestCase(unittest.TestCase):
+    """Test cases for the TTL-cached, concurrent email resolver"""
+
+    def test_repeated_polls_hit_cache(self):
+        """Test a second resolve within the TTL makes no admin calls"""
+        fetch = MagicMock(side_effect=lambda uid: f"{uid}@example.com")
+        resolver = EmailResolver(fetch=fetch, ttl=60, clock=FakeClock())
+
+        first = resolver.resolve(["a", "b", "a"])
+        second = resolver.resolve(["b", "a"])
+
+        self.assertEqual(first, {"a": "a@example.com", "b": "b@example.com"})
+        self.assertEqual(second, first)
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(resolver.stats()["hits"], 2)
+
+    def test_entries_expire(self):
+        """Test entries are refetched after the TTL"""
+        clock = FakeClock()
+        fetch = MagicMock(return_value="a@example.com")
+        resolver = EmailResolver(fetch=fetch, ttl=60, clock=clock)
+
+        resolver.resolve(["a"])
+        clock.now = 61
+        resolver.resolve(["a"])
+
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_failures_not_cached(self):
+        """Test a failed lookup is skipped and retried next time"""
+        fetch = MagicMock(side_effect=[RuntimeError("boom"), "a@example.com"])
+        resolver = EmailResolver(fetch=fetch, ttl=60, clock=FakeClock())
+
+        self.assertEqual(resolver.resolve(["a"]), {})
+        self.assertEqual(resolver.resolve(["a"]), {"a": "a@example.com"})
+
+    def test_lookups_run_concurrently(self):
+        """Test distinct users are fetched in parallel on the bounded pool"""
+        barrier = threading.Barrier(3, timeout=2)
+
+        def fetch(uid):
+            barrier.wait()  # deadlocks (then raises) unless all three run at once
+            return uid
+
+        resolver = EmailResolver(fetch=fetch, ttl=60, max_workers=3, clock=FakeClock())
+
+        self.assertEqual(resolver.resolve(["a", "b", "c"]), {"a": "a", "b": "b", "c": "c"})
+
+    @patch('src.services.user_emails.sb_auth_get')
+    def test_fetch_email_uses_admin_endpoint(self, mock_auth_get):
+        """Test fetch_email reads the admin user and maps 404 to None"""
+        mock_auth_get.return_value = MagicMock(status_code=200, json=lambda: {"email": "dev@example.com"})
+        self.assertEqual(fetch_email("user-1"), "dev@example.com")
+        mock_auth_get.assert_called_once_with("/admin/users/user-1")
+
+        mock_auth_get.return_value = MagicMock(status_code=404)
+        self.assertIsNone(fetch_email("user-2"))
+
+        mock_auth_get.return_value = MagicMock(status_code=500, text="down")
+        with self.assertRaises(RuntimeError):
+            fetch_email("user-3")
+
+
+if __name__ == '__main__':
+    unittest.main()